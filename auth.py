@@ -0,0 +1,34 @@
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from services.token_service import verify_token
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_token_claims(credentials: HTTPAuthorizationCredentials | None = Depends(_bearer)):
+    """
+    Claims of the `Authorization: Bearer <token>` header issued by /user/login_user/,
+    or None for anonymous requests. An invalid or expired token is a 401.
+    """
+    if credentials is None:
+        return None
+    try:
+        return verify_token(credentials.credentials)
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+
+
+def get_optional_token_claims(credentials: HTTPAuthorizationCredentials | None = Depends(_bearer)):
+    """
+    Like get_token_claims for routes that only personalize their response: an
+    invalid or expired token (e.g. signed before a secret rotation) is treated
+    as anonymous instead of failing the request.
+    """
+    if credentials is None:
+        return None
+    try:
+        return verify_token(credentials.credentials)
+    except ValueError:
+        return None
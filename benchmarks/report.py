@@ -0,0 +1,68 @@
+"""
+Latency statistics of a benchmark run, the results table and the comparison
+against a baseline run.
+"""
+import math
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, duration):
+    """
+    samples: {name: [(latency seconds, status, query count or None)]} ->
+    {name: {"requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "queries_per_request"}},
+    with the whole mix under "total"
+    """
+    everything = [sample for name_samples in samples.values() for sample in name_samples]
+    results = {}
+    for name, name_samples in sorted(samples.items()) + [("total", everything)]:
+        latencies = sorted(latency * 1000 for latency, _, _ in name_samples)
+        query_counts = [queries for _, _, queries in name_samples if queries is not None]
+        results[name] = {
+            "requests": len(name_samples),
+            "errors": sum(1 for _, status, _ in name_samples if status >= 500),
+            "rps": round(len(name_samples) / duration, 2) if duration else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "queries_per_request": round(sum(query_counts) / len(query_counts), 2) if query_counts else None,
+        }
+    return results
+
+
+def format_table(results):
+    columns = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "queries_per_request")
+    headers = ("requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "queries")
+    width = max(len(name) for name in results)
+    lines = [f"{'endpoint':<{width}}  " + "  ".join(f"{header:>9}" for header in headers)]
+    for name, row in results.items():
+        values = ("-" if row[column] is None else row[column] for column in columns)
+        lines.append(f"{name:<{width}}  " + "  ".join(f"{value:>9}" for value in values))
+    return "\n".join(lines)
+
+
+def regressions(results, baseline, max_latency_increase):
+    """
+    Endpoints whose p95 got more than `max_latency_increase` (0.2 = 20 %) slower
+    than in the baseline, or that issue over 10 % more queries per request
+    (cache hits make the average vary a little between runs)
+    """
+    found = []
+    for name, row in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if before["p95_ms"] and row["p95_ms"] > before["p95_ms"] * (1 + max_latency_increase):
+            found.append(f"{name}: p95 {before['p95_ms']} -> {row['p95_ms']} ms")
+        # The total's average depends on the mix, only per-endpoint counts are compared
+        if name != "total" and before["queries_per_request"] is not None and row["queries_per_request"] is not None \
+                and row["queries_per_request"] > before["queries_per_request"] * 1.1:
+            found.append(f"{name}: queries per request {before['queries_per_request']} -> {row['queries_per_request']}")
+    return found
@@ -0,0 +1,117 @@
+"""
+The request mix the load benchmark drives: weighted endpoints with
+parameters sampled from the synthetic dataset (see scripts/synthetic_data.py).
+"""
+import random
+from dataclasses import dataclass
+
+from synthetic_data import TAG_WORDS
+
+
+@dataclass
+class Dataset:
+    """What the requests sample from"""
+    users: int
+    images: int
+    artist_ids: list
+
+    @classmethod
+    def from_sizes(cls, sizes, artist_ids):
+        return cls(users=sizes["users"], images=sizes["images"], artist_ids=artist_ids)
+
+
+def _skewed(rng, count):
+    # Same skew towards low ids as the generated data: popular images get most traffic
+    return 1 + int(rng.random() ** 2 * count)
+
+
+def _search_term(rng):
+    word = rng.choice(TAG_WORDS)
+    if rng.random() < 0.2:
+        # A typo, served by the trigram similarity match
+        position = rng.randrange(1, len(word))
+        word = word[:position] + word[position + 1:]
+    return word
+
+
+def feed_anonymous(rng, data):
+    return "GET", "/image/feed", {"limit": 20}
+
+
+def feed_user(rng, data):
+    return "GET", "/image/feed", {"limit": 20, "user_id": rng.randint(1, data.users)}
+
+
+def recommendations(rng, data):
+    return "GET", "/interaction/feed", {"limit": 20, "user_id": rng.randint(1, data.users)}
+
+
+def image_search(rng, data):
+    return "GET", "/image/feed", {"limit": 20, "search_term": _search_term(rng)}
+
+
+def user_search(rng, data):
+    return "GET", "/user/search", {"term": f"user{rng.randint(1, 999)}"}
+
+
+def gallery(rng, data):
+    return "GET", f"/image/images/{rng.choice(data.artist_ids)}", {"limit": 30}
+
+
+def interaction_stats(rng, data):
+    first = _skewed(rng, data.images - 20)
+    return "GET", "/interaction/images/stats", {"image_ids": list(range(first, first + 20)), "user_id": rng.randint(1, data.users)}
+
+
+def comments(rng, data):
+    return "GET", f"/comment/image/{_skewed(rng, data.images)}", {"limit": 20}
+
+
+def record_view(rng, data):
+    return "POST", "/interaction/record-interaction", {"image_id": _skewed(rng, data.images), "user_id": rng.randint(1, data.users), "interaction_type": "view"}
+
+
+def record_like(rng, data):
+    return "POST", "/interaction/record-interaction", {"image_id": _skewed(rng, data.images), "user_id": rng.randint(1, data.users), "interaction_type": "like"}
+
+
+# name: (relative weight, request factory)
+REQUEST_MIX = {
+    "feed_anonymous": (15, feed_anonymous),
+    "feed_user": (25, feed_user),
+    "recommendations": (10, recommendations),
+    "image_search": (10, image_search),
+    "user_search": (5, user_search),
+    "gallery": (8, gallery),
+    "interaction_stats": (10, interaction_stats),
+    "comments": (7, comments),
+    "record_view": (7, record_view),
+    "record_like": (3, record_like),
+}
+
+
+def parse_mix(spec):
+    """'feed_user=50,image_search=10' -> REQUEST_MIX restricted to and reweighted by the spec"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REQUEST_MIX:
+            raise ValueError(f"Unknown request {name!r}, expected one of {', '.join(REQUEST_MIX)}")
+        mix[name] = (float(weight) if weight else REQUEST_MIX[name][0], REQUEST_MIX[name][1])
+    return mix
+
+
+class RequestPicker:
+    def __init__(self, mix, data, seed=None):
+        self._names = list(mix)
+        self._weights = [weight for weight, _ in mix.values()]
+        self._factories = [factory for _, factory in mix.values()]
+        self._data = data
+        self._rng = random.Random(seed)
+
+    def next(self):
+        """(name, method, path, params)"""
+        index = self._rng.choices(range(len(self._names)), self._weights)[0]
+        method, path, params = self._factories[index](self._rng, self._data)
+        return self._names[index], method, path, params
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from report import summarize, format_table, regressions
+from request_mix import REQUEST_MIX, Dataset, RequestPicker, parse_mix
+
+# Load benchmark of the API against a synthetic dataset:
+#   python benchmarks/run.py --concurrency 32 --duration 60
+# The first run creates and seeds the schema (--schema, default "benchmark";
+# scripts/synthetic_data.py), later runs reuse it - --reseed starts over.
+# The app runs in this process behind httpx's ASGI transport, with the full
+# middleware stack and lifespan, so the numbers are the API's own latency
+# without network or server overhead (and include the client's share of the CPU).
+#
+# Per request type: requests, 5xx errors, throughput, p50/p95/p99/max latency
+# and SQL statements per request (the X-Query-Count header).
+#   --json results.json                 save the results
+#   --compare results.json              exit 1 on p95 or query count regressions
+
+
+def prepare_dataset(schema, sizes, reseed=False):
+    """Seed `schema` unless it already holds data; returns the sizes of what is in it"""
+    from sqlalchemy import text
+    from database import get_engine
+    from synthetic_data import create_schema, drop_schema, seed
+
+    with get_engine().connect() as connection:
+        exists = connection.execute(text("SELECT 1 FROM pg_namespace WHERE nspname = :schema"), {"schema": schema}).scalar()
+        if exists and reseed:
+            drop_schema(connection, schema)
+            exists = False
+        if not exists:
+            print(f"Seeding schema {schema}: " + ", ".join(f"{name}={count}" for name, count in sizes.items()), flush=True)
+            start = time.perf_counter()
+            create_schema(connection, schema)
+            seed(connection, sizes=sizes)
+            print(f"Seeded in {time.perf_counter() - start:.1f} s", flush=True)
+
+        connection.execute(text(f'SET search_path TO "{schema}"'))
+        sizes = dict(sizes,
+            users=connection.execute(text("SELECT count(*) FROM users")).scalar(),
+            images=connection.execute(text("SELECT count(*) FROM images")).scalar(),
+        )
+        artist_ids = connection.execute(text("SELECT DISTINCT user_id FROM images ORDER BY user_id")).scalars().all()
+        connection.rollback()
+    return Dataset.from_sizes(sizes, artist_ids)
+
+
+async def run_load(app, picker, concurrency, duration, warmup):
+    """Drive the app with `concurrency` clients; returns {name: [(latency, status, queries)]}"""
+    import httpx
+
+    samples = {}
+    deadline = time.perf_counter() + warmup + duration
+    measure_from = time.perf_counter() + warmup
+
+    async def client_loop(client):
+        while (now := time.perf_counter()) < deadline:
+            name, method, path, params = picker.next()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params)
+                status, queries = response.status_code, response.headers.get("X-Query-Count")
+            except Exception:
+                status, queries = 599, None
+            if now >= measure_from:
+                samples.setdefault(name, []).append((time.perf_counter() - start, status, int(queries) if queries else None))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return samples
+
+
+async def benchmark(args, dataset):
+    import main
+
+    picker = RequestPicker(parse_mix(args.mix) if args.mix else REQUEST_MIX, dataset, seed=args.seed)
+    async with main.app.router.lifespan_context(main.app):
+        return await run_load(main.app, picker, args.concurrency, args.duration, args.warmup)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark of the API on synthetic data")
+    parser.add_argument("--schema", default="benchmark", help="schema holding the synthetic dataset")
+    # 10k users, 100k images, 1M interactions by default
+    parser.add_argument("--scale", type=float, default=2.0, help="dataset size, see scripts/synthetic_data.py")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--images", type=int, default=100000)
+    parser.add_argument("--interactions", type=int, default=1000000)
+    parser.add_argument("--reseed", action="store_true", help="drop and seed the schema again")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--mix", help="request types and weights, e.g. feed_user=3,image_search=1 (default: all)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the request sequence")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of a baseline run")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 increase over the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Before database.py is imported: every connection of the app uses the synthetic schema
+    os.environ["DB_SEARCH_PATH"] = f"{args.schema}, public"
+    # No issued tokens to keep valid - a random signing secret will do
+    os.environ.setdefault("APP_ENV", "development")
+    from synthetic_data import dataset_sizes
+
+    sizes = dataset_sizes(args.scale, users=args.users, images=args.images, interactions=args.interactions)
+    dataset = prepare_dataset(args.schema, sizes, args.reseed)
+
+    print(f"Running {args.concurrency} clients for {args.warmup:g} + {args.duration:g} s", flush=True)
+    samples = asyncio.run(benchmark(args, dataset))
+    results = summarize(samples, args.duration)
+    print(format_table(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as results_file:
+            json.dump({"settings": vars(args), "results": results}, results_file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        found = regressions(results, baseline, args.max_regression)
+        for regression in found:
+            print(f"REGRESSION  {regression}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,274 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session, configure_mappers
+from sqlalchemy import create_engine, exc, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 from urllib.parse import urlparse
+import asyncio
+import threading
+import time
 import os
 
 
 from models import Base  # ensure all models are registered, incl. comments
+from metrics import record_db_statement, register_collector
 
 load_dotenv()
-configure_mappers()
 
 tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
 
-engine = create_engine(
-    f"postgresql+psycopg2://{tmpPostgres.username}:{tmpPostgres.password}@{tmpPostgres.hostname}{tmpPostgres.path}?sslmode=require",
-    echo=True
-)
 
-# Ensure tables exist (no-op if already present)
-Base.metadata.create_all(engine)
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Pool settings apply to each engine (sync and async) separately
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)  # seconds to wait for a free connection
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)  # seconds, -1 disables
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 30000)  # 0 disables
+DB_ECHO = _env_bool("DB_ECHO", False)
+# Schema(s) unqualified table names resolve to, e.g. a benchmark's synthetic schema
+DB_SEARCH_PATH = os.getenv("DB_SEARCH_PATH", "")
+# Connections the API opens at startup so the first requests don't pay for connecting
+DB_WARMUP_CONNECTIONS = _env_int("DB_WARMUP_CONNECTIONS", 2)
+# Compare the database's migration revision with the code's at API startup
+DB_SCHEMA_CHECK = _env_bool("DB_SCHEMA_CHECK", True)
+
+
+class PoolWaitStats:
+    """Checkout wait times of one pool class, shared across pool re-creation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.total_wait, 6),
+                "wait_seconds_avg": round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.max_wait, 6),
+            }
+
+
+class _TimedPoolMixin:
+    """Measures how long callers wait in pool.connect() (queueing + pre-ping)."""
+
+    wait_stats: PoolWaitStats
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    wait_stats = PoolWaitStats()
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    wait_stats = PoolWaitStats()
+
+
+def _server_settings():
+    """Per-connection settings, passed as startup parameters (no extra round trip)"""
+    settings = {}
+    if DB_STATEMENT_TIMEOUT_MS:
+        settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+    if DB_SEARCH_PATH:
+        settings["search_path"] = DB_SEARCH_PATH
+    return settings
+
+
+def _engine_kwargs(pool_class, connect_args):
+    return dict(
+        echo=DB_ECHO,
+        poolclass=pool_class,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self.duration = 0.0  # seconds spent executing them
+
+
+_query_counter = ContextVar("query_counter", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+        counter.statements.append(statement)
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _time_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.duration += elapsed
+    record_db_statement(elapsed)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute. Statements don't
+    # nest on a connection, so a pushed start time is the failed statement's
+    # (ExceptionContext.cursor is not populated, it can't tell)
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def _instrument(engine):
+    # The context is propagated into run_sync, so statements are attributed
+    # to the request (or count_queries block) that issued them
+    event.listen(engine, "before_cursor_execute", _count_query)
+    event.listen(engine, "after_cursor_execute", _time_query)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# Engines and session factories are created on first use, not at import, so
+# importing the app (workers, reloads, scripts that never query) costs no
+# database work; the API creates the async engine in its lifespan hook
+_engine = None
+_async_engine = None
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+# expire_on_commit=False: services commit internally and routers read the
+# returned objects afterwards, which must not trigger lazy IO on the event loop
+_async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False)
+_engines_lock = threading.Lock()
+
+
+def get_engine():
+    """The sync engine (scripts, the interaction buffer)"""
+    global _engine
+    if _engine is None:
+        with _engines_lock:
+            if _engine is None:
+                engine = create_engine(
+                    f"postgresql+psycopg2://{tmpPostgres.username}:{tmpPostgres.password}@{tmpPostgres.hostname}{tmpPostgres.path}?sslmode=require",
+                    **_engine_kwargs(
+                        TimedQueuePool,
+                        # libpq takes them as `options`, spaces escaped
+                        {"options": " ".join("-c " + f"{name}={value}".replace(" ", "\\ ") for name, value in _server_settings().items())},
+                    )
+                )
+                _instrument(engine)
+                _session_factory.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def get_async_engine():
+    """Async engine for the FastAPI routes"""
+    global _async_engine
+    if _async_engine is None:
+        with _engines_lock:
+            if _async_engine is None:
+                # asyncpg takes `ssl` instead of `sslmode`
+                async_engine = create_async_engine(
+                    f"postgresql+asyncpg://{tmpPostgres.username}:{tmpPostgres.password}@{tmpPostgres.hostname}{tmpPostgres.path}?ssl=require",
+                    **_engine_kwargs(
+                        TimedAsyncAdaptedQueuePool,
+                        {"server_settings": _server_settings()},
+                    )
+                )
+                _instrument(async_engine.sync_engine)
+                _async_session_factory.configure(bind=async_engine)
+                _async_engine = async_engine
+    return _async_engine
+
+
+def get_session_factory():
+    get_engine()
+    return _session_factory
+
+
+def get_async_session_factory():
+    get_async_engine()
+    return _async_session_factory
+
+
+async def warm_up(connections=DB_WARMUP_CONNECTIONS):
+    """Open `connections` pooled connections of the async engine concurrently"""
+    engine = get_async_engine()
+    connections = min(connections, DB_POOL_SIZE)
+
+    async def connect(opened):
+        connection = await engine.connect()
+        opened.append(connection)
+        await connection.exec_driver_sql("SELECT 1")
+
+    opened = []
+    try:
+        await asyncio.gather(*(connect(opened) for _ in range(connections)))
+    finally:
+        # Back into the pool, where they stay open for the first requests
+        for connection in opened:
+            await connection.close()
 
 
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements executed inside the block, on either engine.
+    Usage (e.g. to pin the query budget of a service in a test):
+        with count_queries() as counter:
+            get_feed_image_rows(db, image_ids)
+        assert counter.count == 1
+    """
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
 @contextmanager
 def get_db():
     """
@@ -32,7 +277,7 @@ def get_db():
         with get_db() as db:
             users = db.query(User).all()
     """
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
         db.commit()
@@ -51,8 +296,68 @@ def get_db_session():
         def get_users(db: Session = Depends(get_db_session)):
             return db.query(User).all()
     """
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# For async FastAPI routes
+async def get_async_db_session():
+    """
+    Async FastAPI dependency - queries don't block the event loop.
+    The services in `services/` take a sync Session, run them with run_sync:
+        @app.get("/users/{user_id}")
+        async def read_user(user_id: int, db: AsyncSession = Depends(get_async_db_session)):
+            return await db.run_sync(get_user, user_id)
+    """
+    async with get_async_session_factory()() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+
+def get_pool_stats():
+    """
+    Live pool usage for both engines, e.g. for the /metrics/db-pool endpoint.
+    idle = connections sitting in the pool, overflow = connections opened beyond
+    pool_size (negative while the pool itself is not yet full). Engines that
+    were not used yet in this process are left out.
+    """
+    stats = {}
+    engines = (("sync", _engine), ("async", _async_engine.sync_engine if _async_engine is not None else None))
+    for name, engine in engines:
+        if engine is None:
+            continue
+        pool = engine.pool
+        stats[name] = {
+            "pool_size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            **type(pool).wait_stats.snapshot(),
+        }
+    return stats
+
+
+def _pool_metrics():
+    """The pool stats of get_pool_stats as Prometheus gauges and counters, per engine"""
+    stats = get_pool_stats()
+    metrics = (
+        ("db_pool_checked_out", "gauge", "Connections in use", "checked_out"),
+        ("db_pool_idle", "gauge", "Connections sitting in the pool", "idle"),
+        ("db_pool_overflow", "gauge", "Connections opened beyond pool_size (negative while the pool is not full)", "overflow"),
+        ("db_pool_checkouts_total", "counter", "Connection checkouts", "checkouts"),
+        ("db_pool_checkout_timeouts_total", "counter", "Checkouts that timed out waiting for a connection", "timeouts"),
+        ("db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection", "wait_seconds_total"),
+    )
+    return [
+        (name, metric_type, documentation, [({"engine": engine}, pool[key]) for engine, pool in stats.items()])
+        for name, metric_type, documentation, key in metrics
+    ]
+
+
+register_collector(_pool_metrics)
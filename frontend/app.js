@@ -72,6 +72,24 @@ let touchStartY = 0;
 let touchEndY = 0;
 let suppressExploreAutoLoad = false; // prevents auto-loading explore content in special flows
 
+// Bearer token issued at login; expired tokens are not sent (the API falls back to user_id)
+function authHeaders() {
+    if (!currentUser || !currentUser.token) return {};
+    if (currentUser.tokenExpiresAt && currentUser.tokenExpiresAt * 1000 <= Date.now()) return {};
+    return { 'Authorization': `Bearer ${currentUser.token}` };
+}
+
+// A 401 for a request that sent the token means the API no longer accepts it
+// (expired, or signed with a rotated secret) - forget it, so later requests
+// stop sending it; returns true when a token was dropped
+function dropRejectedToken(response) {
+    if (response.status !== 401 || !currentUser || !currentUser.token) return false;
+    delete currentUser.token;
+    delete currentUser.tokenExpiresAt;
+    localStorage.setItem('user', JSON.stringify(currentUser));
+    return true;
+}
+
 // Initialize the application
 function initApp() {
     // Check for logged in user in localStorage
@@ -359,10 +377,14 @@ function loadForYouFeed() {
         .then(data => {
             loadingSpinner.style.display = 'none';
             if (data.status === 'success' && data.images.length > 0) {
+                const feedItems = {};
                 data.images.forEach(image => {
                     const feedItem = createFeedItem(image);
                     feedContainer.appendChild(feedItem);
+                    feedItems[image.id] = feedItem;
                 });
+                // Load interactions for all images with one request
+                loadFeedInteractions(feedItems);
             } else {
                 feedContainer.innerHTML = '<div class="no-content-message">No images found. Follow some artists to see their work!</div>';
             }
@@ -407,9 +429,6 @@ function createFeedItem(image) {
         </div>
     `;
     
-    // Load interactions for this image
-    loadImageInteractions(feedItem, image.id);
-    
     // Add click event to image to show details
     const feedImage = feedItem.querySelector('.feed-item-image');
     feedImage.addEventListener('click', () => {
@@ -486,41 +505,54 @@ function createFeedItem(image) {
     return feedItem;
 }
 
-// Load interactions for an image
-function loadImageInteractions(feedItem, imageId) {
-    const userId = isAuthenticated && currentUser ? currentUser.id : null;
-    const url = userId ? 
-        `${API_BASE_URL}/interaction/image/${imageId}?user_id=${userId}` :
-        `${API_BASE_URL}/interaction/image/${imageId}`;
+// Load interactions for many feed items ({imageId: feedItem}) with one batch request
+function loadFeedInteractions(feedItems) {
+    const imageIds = Object.keys(feedItems);
+    if (imageIds.length === 0) return;
+
+    const params = new URLSearchParams();
+    imageIds.forEach(id => params.append('image_ids', id));
+    if (isAuthenticated && currentUser) {
+        params.append('user_id', currentUser.id);
+    }
     
-    fetch(url)
+    fetch(`${API_BASE_URL}/interaction/images/stats?${params.toString()}`)
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                // Update counts
-                feedItem.querySelector('.like-count').textContent = data.likes;
-                feedItem.querySelector('.comment-count').textContent = data.comments;
-                feedItem.querySelector('.save-count').textContent = data.saves;
-                
-                // Update user interaction status
-                if (data.user_liked) {
-                    const likeIcon = feedItem.querySelector('.like-action i');
-                    likeIcon.classList.remove('far');
-                    likeIcon.classList.add('fas');
-                    likeIcon.style.color = 'var(--primary-color)';
-                }
-                
-                if (data.user_saved) {
-                    const saveIcon = feedItem.querySelector('.save-action i');
-                    saveIcon.classList.remove('far');
-                    saveIcon.classList.add('fas');
-                    saveIcon.style.color = 'var(--primary-color)';
-                }
+                Object.entries(data.images).forEach(([imageId, stats]) => {
+                    if (feedItems[imageId]) {
+                        applyImageInteractions(feedItems[imageId], stats);
+                    }
+                });
             }
         })
         .catch(error => console.error('Error loading interactions:', error));
 }
 
+// Update counts and the user's like/save status on a feed item
+function applyImageInteractions(feedItem, data) {
+    // Update counts
+    feedItem.querySelector('.like-count').textContent = data.likes;
+    feedItem.querySelector('.comment-count').textContent = data.comments;
+    feedItem.querySelector('.save-count').textContent = data.saves;
+    
+    // Update user interaction status
+    if (data.user_liked) {
+        const likeIcon = feedItem.querySelector('.like-action i');
+        likeIcon.classList.remove('far');
+        likeIcon.classList.add('fas');
+        likeIcon.style.color = 'var(--primary-color)';
+    }
+    
+    if (data.user_saved) {
+        const saveIcon = feedItem.querySelector('.save-action i');
+        saveIcon.classList.remove('far');
+        saveIcon.classList.add('fas');
+        saveIcon.style.color = 'var(--primary-color)';
+    }
+}
+
 // Load explore page content (default behavior when navigating to Explore)
 function loadExploreContent() {
     const exploreGrid = document.querySelector('.explore-grid');
@@ -558,34 +590,33 @@ function loadUserProfile() {
     const profileGallery = document.querySelector('.profile-gallery');
     profileGallery.innerHTML = '<div class="loading-message">Loading your images...</div>';
     
-    fetch(`${API_BASE_URL}/image/images/${currentUser.id}`)
-        .then(response => response.json())
+    const renderOwnImage = image => {
+        const galleryItem = document.createElement('div');
+        galleryItem.className = 'profile-gallery-item';
+        galleryItem.innerHTML = `
+            <img src="${image.url}" alt="${image.description || 'Your tattoo'}" loading="lazy">
+        `;
+        
+        // Add user info to image object for detail view
+        const imageWithUser = {
+            ...image,
+            user_id: currentUser.id,
+            username: currentUser.username,
+            user_type: currentUser.user_type
+        };
+        
+        galleryItem.addEventListener('click', () => {
+            showImageDetails(imageWithUser, true);
+        });
+        return galleryItem;
+    };
+
+    fetchGalleryPage(currentUser.id)
         .then(data => {
             profileGallery.innerHTML = '';
-            
-            if (data.status === 'success' && data.images.length > 0) {
-                data.images.forEach(image => {
-                    const galleryItem = document.createElement('div');
-                    galleryItem.className = 'profile-gallery-item';
-                    galleryItem.innerHTML = `
-                        <img src="${image.url}" alt="${image.description || 'Your tattoo'}" loading="lazy">
-                    `;
-                    
-                    // Add user info to image object for detail view
-                    const imageWithUser = {
-                        ...image,
-                        user_id: currentUser.id,
-                        username: currentUser.username,
-                        user_type: currentUser.user_type
-                    };
-                    
-                    galleryItem.addEventListener('click', () => {
-                        showImageDetails(imageWithUser, true);
-                    });
-                    
-                    profileGallery.appendChild(galleryItem);
-                });
-            } else {
+            // Also drops the previous load's "Load more" button
+            renderGalleryPage(profileGallery, currentUser.id, data, renderOwnImage);
+            if (data.images.length === 0) {
                 profileGallery.innerHTML = '<div class="no-content-message">You have not uploaded any images yet.</div>';
             }
         })
@@ -618,7 +649,7 @@ async function handleLogin(event) {
         
         if (data.status === 'success') {
             // Set authenticated user
-            currentUser = data.user;
+            currentUser = { ...data.user, token: data.token, tokenExpiresAt: data.expires_at };
             isAuthenticated = true;
             
             // Save to localStorage
@@ -719,11 +750,13 @@ async function handleImageUpload(event) {
         return;
     }
     
-    // Create form data
-    const formData = new FormData();
-    formData.append('file', file);
-    formData.append('description', description);
-    formData.append('user_id', currentUser.id);
+    // The file is sent as the raw request body and streamed to storage as it
+    // arrives (no multipart parsing or spooling on the server)
+    const params = new URLSearchParams({
+        filename: file.name,
+        user_id: currentUser.id,
+        description: description
+    });
     
     try {
         // Show loading state
@@ -731,9 +764,10 @@ async function handleImageUpload(event) {
         submitBtn.textContent = 'Uploading...';
         submitBtn.disabled = true;
         
-        const response = await fetch(`${API_BASE_URL}/image/upload?user_id=${currentUser.id}&description=${encodeURIComponent(description)}`, {
+        const response = await fetch(`${API_BASE_URL}/image/upload/stream?${params}`, {
             method: 'POST',
-            body: formData
+            headers: { 'Content-Type': file.type || 'application/octet-stream' },
+            body: file
         });
         
         const data = await response.json();
@@ -866,6 +900,46 @@ function searchAccounts(searchTerm) {
         });
 }
 
+const GALLERY_PAGE_SIZE = 60;
+
+// One page of a user's images, newest first: { images, next_cursor }
+async function fetchGalleryPage(userId, cursor = null) {
+    const params = new URLSearchParams({ limit: GALLERY_PAGE_SIZE });
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetch(`${API_BASE_URL}/image/images/${userId}?${params}`);
+    const data = await res.json();
+    if (!res.ok || data.status !== 'success') {
+        throw new Error(data.error || 'Failed to load images');
+    }
+    return data;
+}
+
+// Appends a page to `gallery` (renderImage builds each item) and, while the API
+// returns a next_cursor, a "Load more images" button below it
+function renderGalleryPage(gallery, userId, data, renderImage) {
+    const previousButton = gallery.nextElementSibling;
+    if (previousButton && previousButton.classList.contains('load-more-images')) {
+        previousButton.remove();
+    }
+    data.images.forEach(image => gallery.appendChild(renderImage(image)));
+    if (!data.next_cursor) return;
+
+    const moreBtn = document.createElement('button');
+    moreBtn.className = 'action-button load-more-images';
+    moreBtn.textContent = 'Load more images';
+    moreBtn.addEventListener('click', async () => {
+        moreBtn.disabled = true;
+        try {
+            renderGalleryPage(gallery, userId, await fetchGalleryPage(userId, data.next_cursor), renderImage);
+        } catch (error) {
+            console.error('Error loading more images:', error);
+            showNotification('Failed to load more images');
+            moreBtn.disabled = false;
+        }
+    });
+    gallery.after(moreBtn);
+}
+
 function viewUserProfile(userId, username = null) {
     // Navigate to explore page to show user's content without auto search
     suppressExploreAutoLoad = true;
@@ -881,12 +955,15 @@ function viewUserProfile(userId, username = null) {
 
     // Fetch user info and their images
     Promise.all([
-        fetch(`${API_BASE_URL}/user/user/${userId}${followerParam}`).then(r => r.json()),
-        fetch(`${API_BASE_URL}/image/images/${userId}`).then(r => r.json())
+        fetch(`${API_BASE_URL}/user/user/${userId}${followerParam}`, { headers: authHeaders() }).then(r => r.json()),
+        fetchGalleryPage(userId).catch(error => {
+            console.error('Error loading user images:', error);
+            return { images: [], next_cursor: null };
+        })
     ])
     .then(([userData, imagesData]) => {
         const user = userData.status === 'success' ? userData.user : null;
-        const images = imagesData.status === 'success' ? imagesData.images : [];
+        const images = imagesData.images;
 
         exploreGrid.innerHTML = '';
 
@@ -926,15 +1003,18 @@ function viewUserProfile(userId, username = null) {
         const gallery = document.createElement('div');
         gallery.className = 'profile-gallery';
 
-        if (images && images.length > 0) {
-            images.forEach(image => {
+        profileContainer.appendChild(gallery);
+        exploreGrid.appendChild(profileContainer);
+
+        if (images.length > 0) {
+            renderGalleryPage(gallery, userId, imagesData, image => {
                 const imgCard = document.createElement('div');
                 imgCard.className = 'profile-image-card';
                 imgCard.innerHTML = `<img src="${image.url}" alt="${image.description || 'Tattoo'}" loading="lazy">`;
                 imgCard.addEventListener('click', () => {
                     showImageDetails({ ...image, user_id: userId, username: user ? user.username : username || 'User ' + userId, user_type: user ? user.user_type : 'artist' }, false);
                 });
-                gallery.appendChild(imgCard);
+                return imgCard;
             });
         } else {
             const noImages = document.createElement('div');
@@ -942,9 +1022,6 @@ function viewUserProfile(userId, username = null) {
             noImages.textContent = 'This user has no images yet.';
             gallery.appendChild(noImages);
         }
-
-        profileContainer.appendChild(gallery);
-        exploreGrid.appendChild(profileContainer);
     })
     .catch(error => {
         console.error('Error loading user profile:', error);
@@ -1051,15 +1128,31 @@ function closeImageDetail() {
     imageDetailModal.style.display = 'none';
 }
 
-async function loadComments(imageId) {
+const COMMENTS_PAGE_SIZE = 30;
+
+async function loadComments(imageId, cursor = null) {
     const listEl = document.querySelector('.comment-list');
     if (!listEl) return;
-    listEl.innerHTML = '<div class="loading-message">Loading comments...</div>';
+    if (!cursor) {
+        listEl.innerHTML = '<div class="loading-message">Loading comments...</div>';
+    }
     try {
-        const res = await fetch(`${API_BASE_URL}/comment/image/${imageId}`);
+        const params = new URLSearchParams({ limit: COMMENTS_PAGE_SIZE, order: 'newest' });
+        if (cursor) params.set('cursor', cursor);
+        const res = await fetch(`${API_BASE_URL}/comment/image/${imageId}?${params}`);
         const data = await res.json();
         if (res.ok && data.status === 'success') {
-            renderComments(data.comments);
+            renderComments(data.comments, Boolean(cursor));
+            if (data.next_cursor) {
+                const moreBtn = document.createElement('button');
+                moreBtn.className = 'action-button load-more-comments';
+                moreBtn.textContent = 'Load more comments';
+                moreBtn.addEventListener('click', () => {
+                    moreBtn.remove();
+                    loadComments(imageId, data.next_cursor);
+                });
+                listEl.appendChild(moreBtn);
+            }
         } else {
             listEl.innerHTML = '<div class="error-message">Failed to load comments.</div>';
         }
@@ -1108,14 +1201,14 @@ async function deleteComment(commentId, imageId) {
     }
 }
 
-function renderComments(comments) {
+function renderComments(comments, append = false) {
     const listEl = document.querySelector('.comment-list');
     if (!listEl) return;
-    if (!comments || !comments.length) {
+    if (!append && (!comments || !comments.length)) {
         listEl.innerHTML = '<div class="no-content-message">No comments yet.</div>';
         return;
     }
-    listEl.innerHTML = '';
+    if (!append) listEl.innerHTML = '';
     comments.forEach(c => {
         const item = document.createElement('div');
         item.className = 'comment-item';
@@ -1170,11 +1263,16 @@ async function submitComment(imageId) {
         return;
     }
     try {
-        const res = await fetch(`${API_BASE_URL}/comment/add`, {
+        const postComment = () => fetch(`${API_BASE_URL}/comment/add`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', ...authHeaders() },
             body: JSON.stringify({ user_id: currentUser.id, image_id: imageId, content })
         });
+        let res = await postComment();
+        if (dropRejectedToken(res)) {
+            // Retried without the token, as the logged-in user_id
+            res = await postComment();
+        }
         const data = await res.json();
         if (res.ok && data.status === 'success') {
             commentInput.value = '';
@@ -1215,7 +1313,7 @@ function showImageDetails(image, isOwner = false, focusComment = false) {
     if (isAuthenticated && currentUser && currentUser.id !== image.user_id) {
         detailFollowBtn.style.display = 'inline-flex';
         // Load current follow state
-        fetch(`${API_BASE_URL}/user/user/${image.user_id}?follower_id=${currentUser.id}`)
+        fetch(`${API_BASE_URL}/user/user/${image.user_id}?follower_id=${currentUser.id}`, { headers: authHeaders() })
             .then(r => r.json())
             .then(data => {
                 const isFollowing = data?.user?.is_following || false;
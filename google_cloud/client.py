@@ -1,46 +1,19 @@
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
-import os
-from google.cloud import storage
-import shutil
-import uuid
-import pathlib
+from google_cloud.storage_backends import get_storage_backend, GCS_BUCKET_NAME
 
-# set key credentials file path
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "/Users/matela/zpo/tatau_app/google.json"
-BUCKET_NAME = 'tatau_app'
+# Legacy helpers, kept for existing callers: they go through the process-wide
+# backend (STORAGE_BACKEND, GCS_BUCKET_NAME), which owns the pooled client
+BUCKET_NAME = GCS_BUCKET_NAME
 
-def upload_cs_file(bucket_name, source_file_name, destination_file_name): 
-    storage_client = storage.Client()
-
-    bucket = storage_client.bucket(bucket_name)
-
-    blob = bucket.blob(destination_file_name)
-    blob.upload_from_filename(source_file_name)
+def _backend(bucket_name):
+    if bucket_name != BUCKET_NAME:
+        raise ValueError(f"Only the configured bucket {BUCKET_NAME} is supported, got {bucket_name}")
+    return get_storage_backend()
 
-    blob.make_public()
-    return blob.public_url
+def upload_cs_file(bucket_name, source_file_name, destination_file_name): 
+    return _backend(bucket_name).upload_file(source_file_name, destination_file_name)
 
 def download_cs_file(bucket_name, file_name, destination_file_name): 
-    storage_client = storage.Client()
-
-    bucket = storage_client.bucket(bucket_name)
-
-    blob = bucket.blob(file_name)
-    blob.download_to_filename(destination_file_name)
-
-    return True
+    return _backend(bucket_name).download_file(file_name, destination_file_name)
 
 def delete_cs_file(bucket_name, file_name): 
-    storage_client = storage.Client()
-
-    bucket = storage_client.bucket(bucket_name)
-
-    blob = bucket.blob(file_name)
-    blob.delete()
-
-    return True
-
-
-# upload_cs_file('tatau_app', "C:\\Users\\miche\\Downloads\\W4slpg-post.jpg", 'dupa.jpg')
-# download_cs_file('tatau_app', 'dupa.jpg', "C:\\Users\\miche\\Downloads\\dupa.jpg")
\ No newline at end of file
+    return _backend(bucket_name).delete_file(file_name)
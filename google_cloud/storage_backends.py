@@ -0,0 +1,246 @@
+"""
+Storage backends for uploaded images.
+
+STORAGE_BACKEND=gcs (default) keeps one long-lived, connection-pooled
+storage.Client per process; STORAGE_BACKEND=local writes to a directory
+served by the API itself, so the stack runs without cloud access.
+All methods are blocking - call them off the event loop.
+"""
+import abc
+import os
+import threading
+import uuid
+
+from metrics import storage_call
+
+# Resumable uploads send the body in parts of this size; it bounds the memory
+# held per upload and must be a multiple of 256 KiB
+_CHUNK_ALIGN = 256 * 1024
+UPLOAD_CHUNK_SIZE = max(_CHUNK_ALIGN, int(os.getenv("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)) // _CHUNK_ALIGN * _CHUNK_ALIGN)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs").lower()
+GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "tatau_app")
+GCS_HTTP_POOL_SIZE = int(os.getenv("GCS_HTTP_POOL_SIZE", 32))
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "media")
+LOCAL_STORAGE_BASE_URL = os.getenv("LOCAL_STORAGE_BASE_URL", "/media")
+
+
+class StorageBackend(abc.ABC):
+    """Interface shared by all backends. Object names look like `uploads/<uuid>_<file>`."""
+
+    @abc.abstractmethod
+    def open_writer(self, destination_file_name, content_type=None):
+        """Start an upload; returns a writer with write(bytes), commit() -> public URL and abort()"""
+
+    @abc.abstractmethod
+    def public_url(self, destination_file_name):
+        """URL the object gets once uploaded (no request is made)"""
+
+    def warm_up(self):
+        """Create clients / resolve credentials ahead of the first upload"""
+
+    def upload_file(self, source_file_name, destination_file_name, content_type=None):
+        with open(source_file_name, "rb") as source:
+            return self.upload_fileobj(source, destination_file_name, content_type)
+
+    def upload_fileobj(self, source, destination_file_name, content_type=None):
+        """Upload a binary file object from its current position, one UPLOAD_CHUNK_SIZE part in memory at a time"""
+        writer = self.open_writer(destination_file_name, content_type)
+        try:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                writer.write(chunk)
+        except Exception:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    @abc.abstractmethod
+    def download_file(self, file_name, destination_file_name):
+        """Copy the object to a local path"""
+
+    @abc.abstractmethod
+    def delete_file(self, file_name):
+        """Remove the object"""
+
+
+class _GCSWriter:
+    def __init__(self, blob, chunk_size, content_type):
+        self._blob = blob
+        self._writer = blob.open("wb", chunk_size=chunk_size, content_type=content_type, ignore_flush=True)
+
+    def write(self, data):
+        self._writer.write(data)
+
+    def commit(self):
+        self._writer.close()
+        self._blob.make_public()
+        return self._blob.public_url
+
+    def abort(self):
+        # An unfinished resumable session is never finalized and expires on its own
+        pass
+
+
+class GCSStorageBackend(StorageBackend):
+    def __init__(self, bucket_name=GCS_BUCKET_NAME, pool_size=GCS_HTTP_POOL_SIZE):
+        self.bucket_name = bucket_name
+        self.pool_size = pool_size
+        self._bucket = None
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        # Credentials are resolved once (GOOGLE_APPLICATION_CREDENTIALS or the
+        # metadata server) and the HTTP session is reused for every request
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    import google.auth
+                    from google.auth.transport.requests import AuthorizedSession
+                    from google.cloud import storage
+                    from requests.adapters import HTTPAdapter
+
+                    credentials, project = google.auth.default(
+                        scopes=["https://www.googleapis.com/auth/devstorage.full_control"]
+                    )
+                    session = AuthorizedSession(credentials)
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    client = storage.Client(project=project, credentials=credentials, _http=session)
+                    self._bucket = client.bucket(self.bucket_name)
+        return self._bucket
+
+    def warm_up(self):
+        self.bucket
+
+    def open_writer(self, destination_file_name, content_type=None):
+        return _GCSWriter(self.bucket.blob(destination_file_name), UPLOAD_CHUNK_SIZE, content_type)
+
+    def public_url(self, destination_file_name):
+        return self.bucket.blob(destination_file_name).public_url
+
+    def download_file(self, file_name, destination_file_name):
+        self.bucket.blob(file_name).download_to_filename(destination_file_name)
+        return True
+
+    def delete_file(self, file_name):
+        self.bucket.blob(file_name).delete()
+        return True
+
+
+class _LocalWriter:
+    def __init__(self, path, url):
+        self._path = path
+        self._url = url
+        self._tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, data):
+        self._file.write(data)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+        return self._url
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root=LOCAL_STORAGE_DIR, base_url=LOCAL_STORAGE_BASE_URL):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, file_name):
+        path = os.path.abspath(os.path.join(self.root, file_name))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Invalid storage path: {file_name}")
+        return path
+
+    def public_url(self, destination_file_name):
+        return f"{self.base_url}/{destination_file_name}"
+
+    def warm_up(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    def open_writer(self, destination_file_name, content_type=None):
+        return _LocalWriter(self._path(destination_file_name), self.public_url(destination_file_name))
+
+    def download_file(self, file_name, destination_file_name):
+        with open(self._path(file_name), "rb") as source, open(destination_file_name, "wb") as target:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                target.write(chunk)
+        return True
+
+    def delete_file(self, file_name):
+        os.remove(self._path(file_name))
+        return True
+
+
+class _TimedWriter:
+    def __init__(self, writer):
+        self._writer = writer
+
+    def write(self, data):
+        with storage_call("write"):
+            self._writer.write(data)
+
+    def commit(self):
+        with storage_call("commit"):
+            return self._writer.commit()
+
+    def abort(self):
+        with storage_call("abort"):
+            self._writer.abort()
+
+
+class InstrumentedStorageBackend(StorageBackend):
+    """Times every call of the wrapped backend into storage_call_duration_seconds (see metrics.py)"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def open_writer(self, destination_file_name, content_type=None):
+        with storage_call("open_writer"):
+            return _TimedWriter(self.backend.open_writer(destination_file_name, content_type))
+
+    def public_url(self, destination_file_name):
+        return self.backend.public_url(destination_file_name)
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+    def download_file(self, file_name, destination_file_name):
+        with storage_call("download"):
+            return self.backend.download_file(file_name, destination_file_name)
+
+    def delete_file(self, file_name):
+        with storage_call("delete"):
+            return self.backend.delete_file(file_name)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_storage_backend() -> StorageBackend:
+    """Process-wide backend selected by STORAGE_BACKEND, with its calls timed"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if STORAGE_BACKEND == "local":
+                    backend = LocalStorageBackend()
+                elif STORAGE_BACKEND == "gcs":
+                    backend = GCSStorageBackend()
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+                _backend = InstrumentedStorageBackend(backend)
+    return _backend
@@ -1,18 +1,85 @@
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+import importlib
+import logging
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from models import Base, User, Image, Tag, Interaction, image_tags
+from fastapi.responses import ORJSONResponse
+from fastapi.staticfiles import StaticFiles
+from middleware import RequestMetricsMiddleware
+from services.interaction_buffer import get_interaction_buffer
+from services import password_service, token_service
+from google_cloud.storage_backends import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_BASE_URL, get_storage_backend
+from database import warm_up, get_async_engine, DB_SCHEMA_CHECK
+from urllib.parse import urlparse
+import os
 from routers.image_routers import router as image_routers
 from routers.user_router import router as user_routers
 from routers.interactions_router import router as interaction_routers
 from routers.comment_router import router as comment_routers
+from routers.metrics_router import router as metrics_routers
 from sqlalchemy.orm import configure_mappers
 import uvicorn
-configure_mappers()
+
+logger = logging.getLogger(__name__)
+
+
+# The schema check (loading alembic and the revisions) and the storage client
+# (GCS may resolve credentials via the metadata server) run in the background,
+# startup itself only waits for the database connections
+
+async def check_schema():
+    try:
+        # alembic is only needed here - imported off the event loop, not at startup
+        migrations = await run_in_threadpool(importlib.import_module, "migrations")
+
+        async with get_async_engine().connect() as connection:
+            current = await connection.run_sync(migrations.current_revision)
+        head = await run_in_threadpool(migrations.head_revision)
+        if current != head:
+            logger.warning("Database schema is at revision %s, the code expects %s - run scripts/migrate.py upgrade", current, head)
+    except Exception:
+        logger.exception("Database schema check failed")
+
+
+async def warm_up_storage():
+    try:
+        await run_in_threadpool(get_storage_backend().warm_up)
+    except Exception:
+        logger.exception("Storage backend warm-up failed, retrying on first use")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing above connects anywhere - the engine, schema check and storage
+    # clients are set up here, once per worker
+    configure_mappers()
+    token_service.check_secret()
+    background = [asyncio.create_task(warm_up_storage())]
+    if DB_SCHEMA_CHECK:
+        background.append(asyncio.create_task(check_schema()))
+    await warm_up()
+
+    interaction_buffer = get_interaction_buffer()
+    if interaction_buffer is not None:
+        interaction_buffer.start()
+    yield
+    # Graceful shutdown - write the buffered interactions before exiting
+    if interaction_buffer is not None:
+        await run_in_threadpool(interaction_buffer.close)
+    password_service.shutdown()
+    for task in background:
+        task.cancel()
+    await get_async_engine().dispose()
+
 
 app = FastAPI(
     title="Tatau     App API",
     description="API for Tatau Application",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 
@@ -22,12 +89,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Query-Count"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(image_routers)
 app.include_router(user_routers)
 app.include_router(interaction_routers)
 app.include_router(comment_routers)
+app.include_router(metrics_routers)
+
+# Local storage backend: serve uploaded files from the API itself
+# (LOCAL_STORAGE_BASE_URL may be absolute, e.g. http://192.168.0.10:8000/media)
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(urlparse(LOCAL_STORAGE_BASE_URL).path.rstrip("/"), StaticFiles(directory=LOCAL_STORAGE_DIR), name="media")
 
 @app.get("/")
 async def root():
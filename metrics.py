@@ -0,0 +1,187 @@
+"""
+In-process metrics in the Prometheus text format, served by GET /metrics.
+
+Counters and histograms live in this worker's memory (each worker is scraped
+on its own, like any Prometheus target). Recorded here:
+- per route: request count by status, latency, DB time, SQL statements and
+  storage time per request (middleware.RequestMetricsMiddleware)
+- every SQL statement's duration (database.py cursor events)
+- every storage call's duration by operation (google_cloud/storage_backends.py)
+Other modules add gauges computed at scrape time with register_collector.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)  # statements per request
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (non-cumulative, last = +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+HTTP_REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_REQUEST_DB_DURATION = Histogram("http_request_db_seconds", "Time a request spent executing SQL statements", ("method", "route"))
+HTTP_REQUEST_STATEMENTS = Histogram("http_request_db_statements", "SQL statements executed per request", ("method", "route"), STATEMENT_BUCKETS)
+HTTP_REQUEST_STORAGE_DURATION = Histogram("http_request_storage_seconds", "Time a request spent in storage backend calls", ("method", "route"))
+DB_STATEMENT_DURATION = Histogram("db_statement_duration_seconds", "Duration of every SQL statement, incl. background work")
+STORAGE_CALL_DURATION = Histogram("storage_call_duration_seconds", "Storage backend call duration", ("operation",))
+STORAGE_CALL_ERRORS = Counter("storage_call_errors_total", "Failed storage backend calls", ("operation",))
+
+_METRICS = (
+    HTTP_REQUESTS,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_DB_DURATION,
+    HTTP_REQUEST_STATEMENTS,
+    HTTP_REQUEST_STORAGE_DURATION,
+    DB_STATEMENT_DURATION,
+    STORAGE_CALL_DURATION,
+    STORAGE_CALL_ERRORS,
+)
+
+# Callables returning [(name, type, help, [(labels dict, value)])], evaluated per scrape
+_collectors = []
+
+
+def register_collector(collector):
+    _collectors.append(collector)
+
+
+class RequestStorageTime:
+    """Storage time of the current request, added to from threadpool workers"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.seconds += seconds
+
+
+_request_storage_time = ContextVar("request_storage_time", default=None)
+
+
+@contextmanager
+def track_request_storage_time():
+    """Attribute the storage calls made inside the block (also in run_in_threadpool) to it"""
+    storage_time = RequestStorageTime()
+    token = _request_storage_time.set(storage_time)
+    try:
+        yield storage_time
+    finally:
+        _request_storage_time.reset(token)
+
+
+@contextmanager
+def storage_call(operation):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STORAGE_CALL_ERRORS.inc(operation)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STORAGE_CALL_DURATION.observe(elapsed, operation)
+        storage_time = _request_storage_time.get()
+        if storage_time is not None:
+            storage_time.add(elapsed)
+
+
+def record_db_statement(seconds):
+    DB_STATEMENT_DURATION.observe(seconds)
+
+
+def record_request(method, route, status, seconds, statements, db_seconds, storage_seconds):
+    HTTP_REQUESTS.inc(method, route, str(status))
+    HTTP_REQUEST_DURATION.observe(seconds, method, route)
+    HTTP_REQUEST_DB_DURATION.observe(db_seconds, method, route)
+    HTTP_REQUEST_STATEMENTS.observe(statements, method, route)
+    HTTP_REQUEST_STORAGE_DURATION.observe(storage_seconds, method, route)
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    for collector in _collectors:
+        for name, metric_type, documentation, samples in collector():
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,49 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from database import count_queries
+from metrics import record_request, track_request_storage_time
+
+
+class RequestMetricsMiddleware:
+    """
+    Records each request's latency, SQL statement count, DB time and storage
+    time per route (see metrics.py, served by GET /metrics), and adds an
+    `X-Query-Count` header with the number of SQL statements the request
+    executed, so tests and benchmarks can assert the query budget of an endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        with count_queries() as counter, track_request_storage_time() as storage_time:
+            async def send_with_count(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    MutableHeaders(scope=message).append("X-Query-Count", str(counter.count))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_count)
+            finally:
+                # The matched route's template (/image/images/{user_id}), set by
+                # the router - raw paths would give a label per id
+                route = scope.get("route")
+                record_request(
+                    scope["method"],
+                    getattr(route, "path", "other"),
+                    status,
+                    time.perf_counter() - start,
+                    counter.count,
+                    counter.duration,
+                    storage_time.seconds,
+                )
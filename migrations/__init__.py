@@ -0,0 +1,55 @@
+"""
+Versioned schema migrations (Alembic). The revisions live in migrations/versions,
+scripts/migrate.py is the command line entry point.
+
+`connection`/`schema` let a caller migrate through its own connection, e.g. a
+throwaway schema for scripts/check_query_plans.py.
+"""
+import os
+
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+ALEMBIC_INI = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'alembic.ini'))
+
+
+def alembic_config(connection=None, schema=None):
+    config = Config(ALEMBIC_INI)
+    if connection is not None:
+        config.attributes['connection'] = connection
+    if schema is not None:
+        config.attributes['schema'] = schema
+    return config
+
+
+def upgrade(revision='head', connection=None, schema=None):
+    command.upgrade(alembic_config(connection, schema), revision)
+
+
+def downgrade(revision, connection=None, schema=None):
+    command.downgrade(alembic_config(connection, schema), revision)
+
+
+def head_revision():
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection):
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def create_index_concurrently(name, table, columns, **kw):
+    """
+    CREATE INDEX CONCURRENTLY for a revision, inside op.get_context().autocommit_block().
+    A build that failed part way leaves an INVALID index behind, which IF NOT EXISTS
+    would keep, so one is dropped and built again.
+    """
+    invalid = not op.get_context().as_sql and op.get_bind().exec_driver_sql(
+        "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%(name)s) AND NOT indisvalid",
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
@@ -0,0 +1,59 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import text
+
+from models import Base
+
+config = context.config
+if config.config_file_name is not None and not config.attributes.get('connection'):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def _configure(connection):
+    schema = config.attributes.get('schema')
+    if schema:
+        # Unqualified names in the revisions resolve to the given schema (pg_trgm stays reachable in public)
+        connection.execute(text(f'SET search_path TO "{schema}", public'))
+        connection.commit()
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        version_table_schema=schema,
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_offline():
+    from database import get_engine
+
+    context.configure(
+        url=get_engine().url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        _configure(connection)
+        return
+
+    from database import get_engine
+
+    with get_engine().connect() as connection:
+        _configure(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,114 @@
+"""baseline schema
+
+The schema as Base.metadata.create_all created it at import time, before
+the revisions that follow. Every statement is IF NOT EXISTS, so databases
+created that way are brought under version control by simply upgrading them.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('password_hash', sa.String(), nullable=True),
+        sa.Column('user_type', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_users_id', 'users', ['id'], if_not_exists=True)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True, if_not_exists=True)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True, if_not_exists=True)
+
+    op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_tags_id', 'tags', ['id'], if_not_exists=True)
+    op.create_index('ix_tags_name', 'tags', ['name'], unique=True, if_not_exists=True)
+
+    op.create_table(
+        'images',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_images_id', 'images', ['id'], if_not_exists=True)
+
+    op.create_table(
+        'image_tags',
+        sa.Column('image_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['image_id'], ['images.id']),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id']),
+        sa.PrimaryKeyConstraint('image_id', 'tag_id'),
+        if_not_exists=True,
+    )
+
+    op.create_table(
+        'follows',
+        sa.Column('follower_id', sa.Integer(), nullable=False),
+        sa.Column('followed_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['followed_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['follower_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('follower_id', 'followed_id'),
+        if_not_exists=True,
+    )
+
+    op.create_table(
+        'interactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('image_id', sa.Integer(), nullable=True),
+        sa.Column('interaction_type', sa.String(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['image_id'], ['images.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_interactions_id', 'interactions', ['id'], if_not_exists=True)
+
+    op.create_table(
+        'comments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('image_id', sa.Integer(), nullable=True),
+        sa.Column('content', sa.String(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['image_id'], ['images.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_comments_id', 'comments', ['id'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_table('comments')
+    op.drop_table('interactions')
+    op.drop_table('follows')
+    op.drop_table('image_tags')
+    op.drop_table('images')
+    op.drop_table('tags')
+    op.drop_table('users')
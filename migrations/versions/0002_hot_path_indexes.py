@@ -0,0 +1,48 @@
+"""hot path indexes
+
+Composite indexes for the filters the services actually run:
+- interactions (user_id, image_id): tags of the images a user interacted with
+  (recommendations), a user's interactions on delete
+- interactions (image_id, interaction_type, user_id): like/save stats and the
+  user's flags per image (covering), unlike/unsave, an image's interactions
+- images (user_id, id): an artist's gallery newest first, timeline backfill
+  and pulls from high-fanout authors
+- image_tags (tag_id, image_id): images by tag (recommendations, tag search);
+  the primary key only serves lookups by image_id
+- comments (user_id): a user's comments on delete
+
+Built CONCURRENTLY so writes to the existing tables are not blocked.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from migrations import create_index_concurrently
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_interactions_user_id_image_id', 'interactions', ['user_id', 'image_id']),
+    ('ix_interactions_image_id_type_user_id', 'interactions', ['image_id', 'interaction_type', 'user_id']),
+    ('ix_images_user_id_id', 'images', ['user_id', 'id']),
+    ('ix_image_tags_tag_id_image_id', 'image_tags', ['tag_id', 'image_id']),
+    ('ix_comments_user_id', 'comments', ['user_id']),
+)
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            create_index_concurrently(name, table, columns)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
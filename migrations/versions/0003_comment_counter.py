@@ -0,0 +1,33 @@
+"""comment counter
+
+images.comment_count, the denormalized number of comments per image kept by
+comment_service.add_comment/delete_comment, backfilled from the comments table.
+
+Adding a NOT NULL column with a constant default only changes the catalog
+(no table rewrite); the backfill then updates just the images that have
+comments, so it can be re-run safely.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('images', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False), if_not_exists=True)
+    op.execute("""
+        UPDATE images SET comment_count = counted.comments
+        FROM (SELECT image_id, count(*) AS comments FROM comments WHERE image_id IS NOT NULL GROUP BY image_id) counted
+        WHERE images.id = counted.image_id AND images.comment_count <> counted.comments
+    """)
+
+
+def downgrade():
+    op.drop_column('images', 'comment_count')
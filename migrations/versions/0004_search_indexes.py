@@ -0,0 +1,52 @@
+"""search and lookup indexes
+
+- images: full-text and trigram indexes on description (image search)
+- tags: trigram index on name (tag search)
+- users: lower(username)/lower(email) prefix (text_pattern_ops) and
+  lower(username) trigram indexes (user search)
+- follows (followed_id): follower lists and counts, the primary key only
+  serves lookups by follower_id
+- comments (image_id, timestamp, id): an image's comment pages
+
+Built CONCURRENTLY so writes to the existing tables are not blocked.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations import create_index_concurrently
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_images_description_fts', 'images', [sa.text("to_tsvector('simple', coalesce(description, ''))")], {'postgresql_using': 'gin'}),
+    ('ix_images_description_trgm', 'images', ['description'], {'postgresql_using': 'gin', 'postgresql_ops': {'description': 'gin_trgm_ops'}}),
+    ('ix_tags_name_trgm', 'tags', ['name'], {'postgresql_using': 'gin', 'postgresql_ops': {'name': 'gin_trgm_ops'}}),
+    ('ix_users_username_lower_pattern', 'users', [sa.text('lower(username) text_pattern_ops')], {}),
+    ('ix_users_email_lower_pattern', 'users', [sa.text('lower(email) text_pattern_ops')], {}),
+    ('ix_users_username_lower_trgm', 'users', [sa.text('lower(username) gin_trgm_ops')], {'postgresql_using': 'gin'}),
+    ('ix_follows_followed_id', 'follows', ['followed_id'], {}),
+    ('ix_comments_image_id_timestamp', 'comments', ['image_id', 'timestamp', 'id'], {}),
+)
+
+
+def upgrade():
+    # gin_trgm_ops
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            create_index_concurrently(name, table, columns, **options)
+
+
+def downgrade():
+    # pg_trgm stays installed, other schemas of the database may use it
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
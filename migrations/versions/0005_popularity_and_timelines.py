@@ -0,0 +1,69 @@
+"""popularity counters and home timelines
+
+The image_popularity and home_timeline tables, filled from the existing
+interactions, follows and images by the services' rebuilds - without them
+every existing image would have no popularity score and no timeline entries.
+The tables are new and empty when their indexes are created, so that happens
+in the migration's transaction; the backfill then commits with it.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'image_popularity',
+        sa.Column('image_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('weight_total', sa.Float(), nullable=False),
+        sa.Column('interaction_count', sa.Integer(), nullable=False),
+        sa.Column('last_interaction_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['image_id'], ['images.id']),
+        sa.PrimaryKeyConstraint('image_id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_image_popularity_score', 'image_popularity', ['score'], if_not_exists=True)
+
+    op.create_table(
+        'home_timeline',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('image_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['image_id'], ['images.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'image_id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_home_timeline_user_author', 'home_timeline', ['user_id', 'author_id'], if_not_exists=True)
+
+    if op.get_context().as_sql:
+        # No connection to backfill through - run scripts/rebuild_popularity.py
+        # and scripts/rebuild_timelines.py after applying the generated SQL
+        return
+
+    from services.popularity_service import rebuild_popularity
+    from services.timeline_service import rebuild_timelines
+
+    # Joins the migration's transaction: the services' commit() does not end it
+    session = Session(bind=op.get_bind())
+    try:
+        rebuild_popularity(session)
+        rebuild_timelines(session)
+    finally:
+        session.close()
+
+
+def downgrade():
+    op.drop_table('home_timeline')
+    op.drop_table('image_popularity')
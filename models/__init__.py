@@ -4,4 +4,6 @@ from models.user import User
 from models.tag import Tag
 from models.image import Image
 from models.interaction import Interaction
-from models.comment import Comment
\ No newline at end of file
+from models.comment import Comment
+from models.image_popularity import ImagePopularity
+from models.home_timeline import HomeTimelineEntry
\ No newline at end of file
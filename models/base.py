@@ -1,3 +1,7 @@
+from sqlalchemy import event, DDL
 from sqlalchemy.ext.declarative import declarative_base
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Trigram indexes (gin_trgm_ops) used by the image/tag search need pg_trgm
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 import datetime
@@ -7,7 +7,12 @@ import datetime
 class Comment(Base):
 
     __tablename__ = 'comments'
-    
+    __table_args__ = (
+        # Comment pages of one image, newest or oldest first (id breaks timestamp ties)
+        Index('ix_comments_image_id_timestamp', 'image_id', 'timestamp', 'id'),
+        Index('ix_comments_user_id', 'user_id'),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     image_id = Column(Integer, ForeignKey('images.id'))
@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, ForeignKey, Table
+from sqlalchemy import Column, Integer, ForeignKey, Table, Index
 from models.base import Base
 
 follows = Table(
     'follows',
     Base.metadata,
     Column('follower_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('followed_id', Integer, ForeignKey('users.id'), primary_key=True)
+    Column('followed_id', Integer, ForeignKey('users.id'), primary_key=True),
+    # The primary key covers lookups by follower_id, this one follower lists/counts
+    Index('ix_follows_followed_id', 'followed_id')
 )
\ No newline at end of file
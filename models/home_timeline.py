@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from models.base import Base
+
+
+class HomeTimelineEntry(Base):
+    """
+    Images of followed artists pushed into each follower's home timeline when they
+    are uploaded (fan-out on write), maintained by services/timeline_service.py.
+    Bounded to TIMELINE_MAX_LENGTH newest entries per user.
+    """
+    __tablename__ = 'home_timeline'
+    __table_args__ = (
+        # Unfollow removes one author's entries from one timeline
+        Index('ix_home_timeline_user_author', 'user_id', 'author_id'),
+    )
+
+    # The primary key (user_id, image_id) serves the newest-first timeline read
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    image_id = Column(Integer, ForeignKey('images.id'), primary_key=True)
+    author_id = Column(Integer, ForeignKey('users.id'), nullable=False)
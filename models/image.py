@@ -1,15 +1,24 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from models.base import Base
 from models.image_tag import image_tags
 
 class Image(Base):
     __tablename__ = 'images'
+    __table_args__ = (
+        # Search (services/search_service.py): full-text match and trigram similarity/substring match
+        Index('ix_images_description_fts', text("to_tsvector('simple', coalesce(description, ''))"), postgresql_using='gin'),
+        Index('ix_images_description_trgm', 'description', postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+        # An artist's images newest first (gallery, timeline backfill)
+        Index('ix_images_user_id_id', 'user_id', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     image_url = Column(String)
     description = Column(String)
+    # Denormalized, maintained by comment_service.add_comment/delete_comment
+    comment_count = Column(Integer, nullable=False, default=0, server_default='0')
 
     owner = relationship("User", back_populates="images")
     
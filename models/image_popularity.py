@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from models.base import Base
+
+
+class ImagePopularity(Base):
+    """
+    Popularity counters per image, maintained incrementally by services/popularity_service.py.
+    `score` is the interaction-weight sum with exponential time decay, stored relative
+    to a fixed epoch, so ordering by it needs no per-request aggregation.
+    """
+    __tablename__ = 'image_popularity'
+
+    image_id = Column(Integer, ForeignKey('images.id'), primary_key=True)
+    score = Column(Float, nullable=False, default=0.0, index=True)
+    weight_total = Column(Float, nullable=False, default=0.0)
+    interaction_count = Column(Integer, nullable=False, default=0)
+    last_interaction_at = Column(DateTime)
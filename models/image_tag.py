@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Table
+from sqlalchemy import Column, Integer, ForeignKey, Table, Index
 from models.base import Base
 
 
@@ -6,5 +6,7 @@ image_tags = Table(
     'image_tags',
     Base.metadata,
     Column('image_id', Integer, ForeignKey('images.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
+    # The primary key covers lookups by image_id, this one images by tag
+    Index('ix_image_tags_tag_id_image_id', 'tag_id', 'image_id')
 )
\ No newline at end of file
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 import datetime
 
 class Interaction(Base):
     __tablename__ = 'interactions'
+    __table_args__ = (
+        # Tags of the images a user interacted with (recommendations)
+        Index('ix_interactions_user_id_image_id', 'user_id', 'image_id'),
+        # Like/save counts and the user's flags per image (covering the stats query)
+        Index('ix_interactions_image_id_type_user_id', 'image_id', 'interaction_type', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 from models.image_tag import image_tags
 
 class Tag(Base):
     __tablename__ = 'tags'
+    __table_args__ = (
+        Index('ix_tags_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, unique=True)
@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index, text
 from sqlalchemy.orm import relationship
 from models.base import Base
 from models.follow import follows
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # User search (services/user_service.search_users): prefix matches on
+        # lower(username)/lower(email) via text_pattern_ops, substrings via trigrams
+        Index('ix_users_username_lower_pattern', text('lower(username) text_pattern_ops')),
+        Index('ix_users_email_lower_pattern', text('lower(email) text_pattern_ops')),
+        Index('ix_users_username_lower_trgm', text('lower(username) gin_trgm_ops'), postgresql_using='gin'),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     username = Column(String, unique=True, index=True)
@@ -1,85 +1,116 @@
 from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+import datetime
 
-from database import get_db_session
-from services.comment_service import add_comment, delete_comment, edit_comment, get_comments_for_image
+from database import get_async_db_session
+from auth import get_token_claims
+from services.comment_service import add_comment, delete_comment, edit_comment, get_comment_rows, COMMENT_ORDERS
+from services.pagination import encode_cursor, decode_cursor
 from services.user_service import get_user
+from schemas.comment import CommentResponse, CommentListResponse
 
 router = APIRouter(prefix="/comment", tags=["comment"])
 
+# Upper bound for one page of comments
+MAX_COMMENT_PAGE = 100
+
 
 class CommentCreate(BaseModel):
-    user_id: int
+    # Taken from the bearer token when one is sent
+    user_id: int | None = None
     image_id: int
     content: str
 
 
-@router.post("/add")
-async def create_comment(payload: CommentCreate, db: Session = Depends(get_db_session)):
+@router.post("/add", response_model=CommentResponse)
+async def create_comment(payload: CommentCreate, claims: dict | None = Depends(get_token_claims), db: AsyncSession = Depends(get_async_db_session)):
     try:
         content = payload.content
         if not content or not content.strip():
-            return JSONResponse(status_code=400, content={"status": "error", "message": "Comment cannot be empty"})
+            return ORJSONResponse(status_code=400, content={"status": "error", "message": "Comment cannot be empty"})
 
-        user = get_user(db, payload.user_id)
-        if not user:
-            return JSONResponse(status_code=404, content={"status": "error", "message": "User not found"})
+        if claims is not None:
+            # The signed token identifies the author, no user lookup needed
+            if payload.user_id is not None and payload.user_id != claims["user_id"]:
+                return ORJSONResponse(status_code=403, content={"status": "error", "message": "Cannot comment as another user"})
+            user_id, username = claims["user_id"], claims["username"]
+        elif payload.user_id is not None:
+            user = await db.run_sync(get_user, payload.user_id)
+            if not user:
+                return ORJSONResponse(status_code=404, content={"status": "error", "message": "User not found"})
+            user_id, username = user.id, user.username
+        else:
+            return ORJSONResponse(status_code=401, content={"status": "error", "message": "Not authenticated"})
 
-        comment = add_comment(db, payload.user_id, payload.image_id, content.strip())
-        return JSONResponse(content={
+        comment = await db.run_sync(add_comment, user_id, payload.image_id, content.strip())
+        return ORJSONResponse(content={
             "status": "success",
             "comment": {
                 "id": comment.id,
                 "user_id": comment.user_id,
-                "username": user.username,
+                "username": username,
                 "content": comment.content,
                 "timestamp": comment.timestamp.isoformat()
             }
         })
     except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+        return ORJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
 
-@router.get("/image/{image_id}")
-async def list_comments(image_id: int, db: Session = Depends(get_db_session)):
+@router.get("/image/{image_id}", response_model=CommentListResponse)
+async def list_comments(
+    image_id: int,
+    limit: int = 50,
+    order: str = "newest",
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    A page of the image's comments, `order` = newest or oldest first.
+    Pass the returned `next_cursor` as `cursor` to get the next page.
+    """
     try:
-        comments = get_comments_for_image(db, image_id)
-        comment_list = [
-            {
-                "id": c.id,
-                "user_id": c.user_id,
-                "username": c.user.username if c.user else f"User {c.user_id}",
-                "content": c.content,
-                "timestamp": c.timestamp.isoformat()
-            }
-            for c in comments
-        ]
-        return JSONResponse(content={"status": "success", "comments": comment_list})
+        limit = max(1, min(limit, MAX_COMMENT_PAGE))
+        try:
+            if order not in COMMENT_ORDERS:
+                raise ValueError(f"order must be one of {', '.join(COMMENT_ORDERS)}")
+            after = None
+            if cursor:
+                last_timestamp, last_id = decode_cursor(cursor, t=str, id=int)
+                after = (datetime.datetime.fromisoformat(last_timestamp), last_id)
+        except (ValueError, TypeError) as e:
+            return ORJSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+        comment_list = await db.run_sync(get_comment_rows, image_id, limit, order, after)
+        next_cursor = None
+        if len(comment_list) >= limit:
+            next_cursor = encode_cursor(t=comment_list[-1]["timestamp"], id=comment_list[-1]["id"])
+        return ORJSONResponse(content={"status": "success", "comments": comment_list, "next_cursor": next_cursor})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+        return ORJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
 
 @router.delete("/{comment_id}")
-async def remove_comment(comment_id: int, db: Session = Depends(get_db_session)):
+async def remove_comment(comment_id: int, db: AsyncSession = Depends(get_async_db_session)):
     try:
-        deleted = delete_comment(db, comment_id)
+        deleted = await db.run_sync(delete_comment, comment_id)
         if not deleted:
-            return JSONResponse(status_code=404, content={"status": "error", "message": "Comment not found"})
-        return JSONResponse(content={"status": "success", "message": "Comment deleted"})
+            return ORJSONResponse(status_code=404, content={"status": "error", "message": "Comment not found"})
+        return ORJSONResponse(content={"status": "success", "message": "Comment deleted"})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+        return ORJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
 
 @router.put("/{comment_id}")
-async def update_comment(comment_id: int, content: str, db: Session = Depends(get_db_session)):
+async def update_comment(comment_id: int, content: str, db: AsyncSession = Depends(get_async_db_session)):
     try:
         if not content or not content.strip():
-            return JSONResponse(status_code=400, content={"status": "error", "message": "Comment cannot be empty"})
-        updated = edit_comment(db, comment_id, content.strip())
+            return ORJSONResponse(status_code=400, content={"status": "error", "message": "Comment cannot be empty"})
+        updated = await db.run_sync(edit_comment, comment_id, content.strip())
         if not updated:
-            return JSONResponse(status_code=404, content={"status": "error", "message": "Comment not found"})
-        return JSONResponse(content={"status": "success", "message": "Comment updated"})
+            return ORJSONResponse(status_code=404, content={"status": "error", "message": "Comment not found"})
+        return ORJSONResponse(content={"status": "success", "message": "Comment updated"})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+        return ORJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
@@ -1,93 +1,309 @@
 import logging
-from google_cloud.client import upload_cs_file, download_cs_file, delete_cs_file, BUCKET_NAME
-from services.image_service import add_image, delete_image, get_image, get_user_images, get_feed_images
-from services.recommendation_service import get_recommendations
-from database import get_db_session
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, File, UploadFile, Depends
-from sqlalchemy.orm import Session
+from google_cloud.storage_backends import get_storage_backend, UPLOAD_CHUNK_SIZE
+from services.image_service import add_image, delete_image, get_image, get_user_image_rows, get_feed_image_rows
+from services.recommendation_service import get_recommended_page
+from services.search_service import search_image_ids
+from services.pagination import encode_cursor, decode_cursor
+from services.import_service import (
+    IMPORT_CONCURRENCY,
+    IMPORT_BATCH_SIZE,
+    MAX_IMPORT_ITEMS,
+    MAX_IMPORT_ENTRIES,
+    MAX_IMPORT_BYTES,
+    MAX_MANIFEST_BYTES,
+    MANIFEST_FILE_NAME,
+    parse_manifest,
+    is_image_file,
+    relative_file_path,
+    select_import_files,
+    file_digest,
+    import_object_name,
+    upload_import_file,
+    imported_urls,
+    insert_image_batch,
+)
+from database import get_async_db_session
+from fastapi import FastAPI, File, UploadFile, Request
+from fastapi.responses import ORJSONResponse
+from fastapi import APIRouter, File, UploadFile, Depends, Form
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from schemas.image import ImageResponse, ImageListResponse, FeedResponse, ImportResponse
+import asyncio
 import os
-from google.cloud import storage
-import shutil
 import uuid
+import zipfile
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/image", tags=["image"])
 
-@router.post("/upload")
-async def upload_file(file: UploadFile = File(...), user_id: int = 1, description: str = None, db: Session = Depends(get_db_session)):
+# Upper bound for one page of a user's gallery
+MAX_GALLERY_PAGE = 200
+
+def _feed_image_list(db, limit, offset, user_id, search_term, debug_scores=False, after=None):
+    """Returns (image list, next cursor or None); `after` = (score, id) of a decoded cursor"""
+    if search_term:
+        scored = [(image_id, {"total": rank}) for image_id, rank in search_image_ids(db, search_term, limit, offset, after)]
+    else:
+        scored = get_recommended_page(db, user_id, limit, offset, after)
+
+    next_cursor = None
+    if scored and len(scored) >= limit:
+        last_image_id, last_scores = scored[-1]
+        next_cursor = encode_cursor(s=last_scores["total"], id=last_image_id)
+
+    # Only the serialized columns are fetched, no ORM objects or lazy loads
+    image_list = get_feed_image_rows(db, [image_id for image_id, _ in scored])
+    if debug_scores:
+        breakdowns = dict(scored)
+        for item in image_list:
+            item["scores"] = breakdowns[item["id"]]
+    return image_list, next_cursor
+
+async def _stream_to_storage(chunks, filename, content_type=None):
+    """
+    Pipe an async iterator of byte chunks into a resumable storage upload.
+    At most one UPLOAD_CHUNK_SIZE part is buffered per upload, and the blocking
+    storage calls run in the threadpool so the event loop stays free.
+    """
+    object_name = f"uploads/{uuid.uuid4().hex}_{os.path.basename(filename or 'upload')}"
+    writer = await run_in_threadpool(get_storage_backend().open_writer, object_name, content_type)
+
     try:
-        temp_filename = f"temp_{uuid.uuid4().hex}_{file.filename}"
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer.extend(chunk)
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(writer.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(writer.write, bytes(buffer))
+    except Exception:
+        await run_in_threadpool(writer.abort)
+        raise
 
-        with open(temp_filename, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    return await run_in_threadpool(writer.commit)
 
-        # Upload to GCS
-        gcs_filename = f"uploads/{uuid.uuid4().hex}_{file.filename}" 
-        public_url = upload_cs_file(BUCKET_NAME, temp_filename, gcs_filename)
+async def _upload_file_chunks(file: UploadFile):
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
 
-        os.remove(temp_filename)
-     
-        add_image(db, user_id, public_url, description)
+@router.post("/upload")
+async def upload_file(file: UploadFile = File(...), user_id: int = 1, description: str = None, db: AsyncSession = Depends(get_async_db_session)):
+    try:
+        public_url = await _stream_to_storage(_upload_file_chunks(file), file.filename, file.content_type)
+
+        await db.run_sync(add_image, user_id, public_url, description)
         
-        return JSONResponse(content={"status": "success", "public_url": public_url})
+        return ORJSONResponse(content={"status": "success", "public_url": public_url})
 
     except Exception as e:
-        logger.exception("Feed endpoint failed")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        logger.exception("Upload endpoint failed")
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
+
+@router.post("/upload/stream")
+async def upload_stream(request: Request, filename: str, user_id: int = 1, description: str = None, db: AsyncSession = Depends(get_async_db_session)):
+    """
+    Upload the raw request body (no multipart) straight to storage as it arrives,
+    e.g. `curl --data-binary @tattoo.jpg -H "Content-Type: image/jpeg" ".../image/upload/stream?filename=tattoo.jpg"`
+    """
+    try:
+        public_url = await _stream_to_storage(request.stream(), filename, request.headers.get("content-type"))
+
+        await db.run_sync(add_image, user_id, public_url, description)
+
+        return ORJSONResponse(content={"status": "success", "public_url": public_url})
+
+    except Exception as e:
+        logger.exception("Stream upload endpoint failed")
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
     
+def _check_import_size(total_bytes, manifest_bytes=0):
+    if total_bytes > MAX_IMPORT_BYTES:
+        raise ValueError(f"At most {MAX_IMPORT_BYTES} bytes (uncompressed) per import")
+    if manifest_bytes > MAX_MANIFEST_BYTES:
+        raise ValueError(f"The manifest may be at most {MAX_MANIFEST_BYTES} bytes")
+
+def _import_sources(files: list[UploadFile]):
+    """
+    Expand the request into (relative path, binary file object) pairs of the
+    image files - .zip files contribute their entries - plus the manifest text,
+    if one was sent as a file or inside an archive. Raises ValueError when the
+    archives hold more than MAX_IMPORT_ENTRIES members, everything together
+    unpacks to more than MAX_IMPORT_BYTES or the manifest is larger than
+    MAX_MANIFEST_BYTES; an archive's limits are checked on its directory,
+    before any of its entries is read.
+    """
+    sources, manifest_text = [], None
+    entry_count, total_bytes = 0, 0
+    for upload in files:
+        file_name = os.path.basename(upload.filename or "")
+        if file_name.lower().endswith(".zip"):
+            archive = zipfile.ZipFile(upload.file)
+            entries = [entry for entry in archive.infolist() if not entry.is_dir()]
+            entry_count += len(entries)
+            if entry_count > MAX_IMPORT_ENTRIES:
+                raise ValueError(f"At most {MAX_IMPORT_ENTRIES} archive entries per import")
+            # zipfile never yields more than the declared file_size of an entry,
+            # so the sizes bound what unpacking can produce (zip bombs included)
+            manifests = [entry for entry in entries if os.path.basename(entry.filename) == MANIFEST_FILE_NAME]
+            total_bytes += sum(entry.file_size for entry in entries)
+            _check_import_size(total_bytes, max((entry.file_size for entry in manifests), default=0))
+            for entry in entries:
+                if entry in manifests:
+                    manifest_text = archive.read(entry).decode("utf-8")
+                elif is_image_file(entry.filename):
+                    sources.append((relative_file_path(entry.filename), archive.open(entry)))
+        elif file_name == MANIFEST_FILE_NAME:
+            # At most one byte over the limit is read, enough to reject it
+            manifest_bytes = upload.file.read(MAX_MANIFEST_BYTES + 1)
+            _check_import_size(total_bytes, len(manifest_bytes))
+            manifest_text = manifest_bytes.decode("utf-8")
+        elif is_image_file(file_name):
+            total_bytes += upload.size or 0
+            _check_import_size(total_bytes)
+            sources.append((file_name, upload.file))
+    return sources, manifest_text
+
+async def _import_batch(db, backend, user_id, batch, manifest, semaphore, seen_urls):
+    """Upload one batch in parallel and insert it in one transaction; returns the per-item results"""
+    async def prepare(file_name, source):
+        async with semaphore:
+            digest = await run_in_threadpool(file_digest, source)
+        object_name = import_object_name(user_id, file_name, digest)
+        return object_name, await run_in_threadpool(backend.public_url, object_name)
+
+    prepared = await asyncio.gather(*[prepare(file_name, source) for file_name, source in batch])
+    existing = await db.run_sync(imported_urls, user_id, [url for _, url in prepared])
+
+    results, pending = [], []
+    for (file_name, source), (object_name, url) in zip(batch, prepared):
+        result = {"file": file_name, "status": "skipped", "url": url}
+        results.append(result)
+        if url in existing or url in seen_urls:
+            continue
+        seen_urls.add(url)
+        pending.append((result, source, object_name))
+
+    async def upload(result, source, object_name):
+        async with semaphore:
+            try:
+                await run_in_threadpool(upload_import_file, backend, source, object_name, result["file"])
+                return True
+            except Exception as e:
+                logger.exception("Import upload of %s failed", result["file"])
+                result.update(status="failed", url=None, error=str(e))
+                return False
+
+    uploaded = await asyncio.gather(*[upload(*item) for item in pending])
+    rows, row_results = [], []
+    for (result, _, _), ok in zip(pending, uploaded):
+        if ok:
+            entry = manifest.get(result["file"], {})
+            rows.append({"image_url": result["url"], "description": entry.get("description"), "tags": entry.get("tags")})
+            row_results.append(result)
+
+    try:
+        image_ids = await db.run_sync(insert_image_batch, user_id, rows)
+    except Exception as e:
+        logger.exception("Import batch insert failed")
+        await db.rollback()
+        for result in row_results:
+            result.update(status="failed", url=None, error=str(e))
+        return results
+    for result, image_id in zip(row_results, image_ids):
+        result.update(status="imported", image_id=image_id)
+    return results
+
+@router.post("/import", response_model=ImportResponse)
+async def import_images(
+    files: list[UploadFile] = File(...),
+    manifest: str | None = Form(None),
+    user_id: int = 1,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Bulk portfolio import: image files and/or .zip archives, with an optional
+    manifest (form field or manifest.json file/archive entry), see
+    services/import_service.parse_manifest. With a manifest only the files it
+    lists are imported, without one every image file. Re-sending the same
+    files after a failure only imports what is still missing.
+    """
+    try:
+        try:
+            sources, manifest_text = await run_in_threadpool(_import_sources, files)
+            manifest_text = manifest or manifest_text
+            manifest = parse_manifest(manifest_text) if manifest_text else None
+            # Same rule as scripts/import_portfolio.py: only the listed files when there is a manifest
+            selected = set(select_import_files([file_name for file_name, _ in sources], manifest))
+        except (ValueError, zipfile.BadZipFile) as e:
+            return ORJSONResponse(status_code=400, content={"error": str(e)})
+        sources = [(file_name, source) for file_name, source in sources if file_name in selected]
+        if len(sources) > MAX_IMPORT_ITEMS:
+            return ORJSONResponse(status_code=400, content={"error": f"At most {MAX_IMPORT_ITEMS} images per import"})
+
+        backend = get_storage_backend()
+        semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+        seen_urls = set()
+        results = []
+        for start in range(0, len(sources), IMPORT_BATCH_SIZE):
+            batch = sources[start:start + IMPORT_BATCH_SIZE]
+            results += await _import_batch(db, backend, user_id, batch, manifest or {}, semaphore, seen_urls)
+
+        counts = {status: sum(1 for result in results if result["status"] == status) for status in ("imported", "skipped", "failed")}
+        return ORJSONResponse(content={"status": "success", **counts, "results": results})
+
+    except Exception as e:
+        logger.exception("Import endpoint failed")
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
+
 @router.delete("/delete/{image_id}")
-async def delete_file(image_id: int, db: Session = Depends(get_db_session)):
-    image = get_image(db, image_id)
+async def delete_file(image_id: int, db: AsyncSession = Depends(get_async_db_session)):
+    image = await db.run_sync(get_image, image_id)
     if not image:
-        return JSONResponse(status_code=404, content={"error": "Image not found"})
+        return ORJSONResponse(status_code=404, content={"error": "Image not found"})
     else:   
         try:
         # Delete from GCS
         # delete_cs_file(BUCKET_NAME, image.image_url.split("/")[-1])
         # Delete from DB
-            delete_image(db, image_id)       
-            return JSONResponse(content={"status": "success", "message": "Image deleted successfully"})
+            await db.run_sync(delete_image, image_id)       
+            return ORJSONResponse(content={"status": "success", "message": "Image deleted successfully"})
         except Exception as e:
-            return JSONResponse(status_code=500, content={"error": str(e)})
+            return ORJSONResponse(status_code=500, content={"error": str(e)})
         
 
-@router.get("/images/{user_id}")
-async def get_images(user_id: int, db: Session = Depends(get_db_session)):
+@router.get("/images/{user_id}", response_model=ImageListResponse)
+async def get_images(user_id: int, limit: int = 60, cursor: str | None = None, db: AsyncSession = Depends(get_async_db_session)):
     """
-    Fetch all images for a specific user to display them on the page
+    Fetch a page of a user's images (newest first) to display them on the page.
+    Pass the returned `next_cursor` as `cursor` to get the next page.
     """
     try:
-        images = get_user_images(db, user_id)
-        if not images:
-            return JSONResponse(content={"status": "success", "images": []})
-        
-        # Convert images to a list of dictionaries with relevant information
-        image_list = [
-            {
-                "id": image.id,
-                "url": image.image_url,
-                "description": image.description,
-            }
-            for image in images
-        ]
+        limit = max(1, min(limit, MAX_GALLERY_PAGE))
+        try:
+            after_id = decode_cursor(cursor, id=int)[0] if cursor else None
+        except ValueError as e:
+            return ORJSONResponse(status_code=400, content={"error": str(e)})
+
+        image_list = await db.run_sync(get_user_image_rows, user_id, limit, after_id)
+        next_cursor = encode_cursor(id=image_list[-1]["id"]) if len(image_list) >= limit else None
         
-        return JSONResponse(content={"status": "success", "images": image_list})
+        return ORJSONResponse(content={"status": "success", "images": image_list, "next_cursor": next_cursor})
     
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
 
-@router.get("/image/{image_id}")
-async def get_single_image(image_id: int, db: Session = Depends(get_db_session)):
+@router.get("/image/{image_id}", response_model=ImageResponse)
+async def get_single_image(image_id: int, db: AsyncSession = Depends(get_async_db_session)):
     """
     Fetch a specific image by its ID
     """
     try:
-        image = get_image(db, image_id)
+        image = await db.run_sync(get_image, image_id)
         if not image:
-            return JSONResponse(status_code=404, content={"error": "Image not found"})
+            return ORJSONResponse(status_code=404, content={"error": "Image not found"})
         
         image_data = {
             "id": image.id,
@@ -96,43 +312,38 @@ async def get_single_image(image_id: int, db: Session = Depends(get_db_session))
             "user_id": image.user_id
         }
         
-        return JSONResponse(content={"status": "success", "image": image_data})
+        return ORJSONResponse(content={"status": "success", "image": image_data})
     
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
     
-@router.get("/feed")
+@router.get("/feed", response_model=FeedResponse)
 async def get_feed(
     limit: int = 20,
     offset: int = 0,
     user_id: int | None = None,
     search_term: str | None = None,
-    db: Session = Depends(get_db_session)
+    debug_scores: bool = False,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    """Get images for the feed with optional search, pagination, and personalization."""
+    """Get images for the feed with optional search, pagination, and personalization.
+    Pass the returned `next_cursor` as `cursor` for the next page (keyset, replaces `offset`).
+    `debug_scores=true` adds the per-source ranking breakdown to each recommended image."""
     # try:
-    if search_term:
-        images = get_feed_images(db, limit, offset, search_term)
-    else:
-        images = get_recommendations(db, user_id, limit)
+    try:
+        after = decode_cursor(cursor, s=float, id=int) if cursor else None
+    except ValueError as e:
+        return ORJSONResponse(status_code=400, content={"error": str(e)})
 
-    image_list = [
-        {
-            "id": image.id,
-            "url": image.image_url,
-            "description": image.description,
-            "user_id": image.user_id,
-            "username": getattr(image.owner, "username", f"User {image.user_id}"),
-            "user_type": getattr(image.owner, "user_type", "artist"),
-        }
-        for image in images
-    ]
+    image_list, next_cursor = await db.run_sync(_feed_image_list, limit, offset, user_id, search_term, debug_scores, after)
 
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         "status": "success",
         "images": image_list,
-        "count": len(image_list)
+        "count": len(image_list),
+        "next_cursor": next_cursor
     })
 
     # except Exception as e:
-    #     return JSONResponse(status_code=500, content={"error": str(e)})
\ No newline at end of file
+    #     return ORJSONResponse(status_code=500, content={"error": str(e)})
\ No newline at end of file
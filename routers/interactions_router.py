@@ -1,9 +1,14 @@
-from services.interaction_service import add_interaction, get_interactions
-from services.recommendation_service import get_recommendations
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from database import get_db_session
+from services.interaction_service import add_interaction, get_interaction_stats
+from services.recommendation_service import get_recommended_page
+from services.image_service import get_feed_image_rows
+from services.interaction_buffer import get_interaction_buffer, BUFFERED_INTERACTION_TYPES
+from services.pagination import encode_cursor, decode_cursor
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db_session
+from schemas.image import FeedResponse
+from schemas.interaction import InteractionStatsResponse, InteractionStatsBatchResponse
 
 router = APIRouter(prefix="/interaction", tags=["interaction"])
 
@@ -12,79 +17,96 @@ async def record_interaction(
     image_id: int,
     user_id: int,
     interaction_type: str,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
-    Record user interaction with an image
+    Record user interaction with an image. Views are queued in the write-behind
+    buffer (see services/interaction_buffer.py) instead of a transaction per click.
     """
     try:
-        interaction = add_interaction(db, user_id, image_id, interaction_type)
-        return JSONResponse(content={"status": "success"})
+        interaction_buffer = get_interaction_buffer()
+        if interaction_buffer is not None and interaction_type in BUFFERED_INTERACTION_TYPES:
+            interaction_buffer.add(user_id, image_id, interaction_type)
+            return ORJSONResponse(content={"status": "success", "buffered": True})
+
+        await db.run_sync(add_interaction, user_id, image_id, interaction_type)
+        return ORJSONResponse(content={"status": "success"})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
+
+# Upper bound for one batch stats request (a feed page is 20 images)
+MAX_STATS_BATCH = 100
 
-@router.get("/image/{image_id}")
+@router.get("/image/{image_id}", response_model=InteractionStatsResponse)
 async def get_image_interactions(
     image_id: int,
     user_id: int = None,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
-    Get all interactions for an image with counts and user status
+    Get interaction counts for an image and the user's like/save status
     """
     try:
-        interactions = get_interactions(db, image_id)
-        
-        # Count interactions by type
-        likes = sum(1 for i in interactions if i.interaction_type == 'like')
-        comments = sum(1 for i in interactions if i.interaction_type == 'comment')
-        saves = sum(1 for i in interactions if i.interaction_type == 'save')
-        
-        # Check if current user has interacted
-        user_liked = False
-        user_saved = False
-        if user_id:
-            user_liked = any(i.user_id == user_id and i.interaction_type == 'like' for i in interactions)
-            user_saved = any(i.user_id == user_id and i.interaction_type == 'save' for i in interactions)
+        stats = await db.run_sync(get_interaction_stats, [image_id], user_id)
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={"status": "success", **stats[image_id]})
+    except Exception as e:
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
+
+@router.get("/images/stats", response_model=InteractionStatsBatchResponse)
+async def get_images_interactions(
+    image_ids: list[int] = Query(...),
+    user_id: int = None,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Interaction counts and the user's like/save status for many images in one request,
+    e.g. /interaction/images/stats?image_ids=1&image_ids=2&user_id=3
+    """
+    try:
+        if len(image_ids) > MAX_STATS_BATCH:
+            return ORJSONResponse(status_code=400, content={"error": f"At most {MAX_STATS_BATCH} image ids per request"})
+
+        stats = await db.run_sync(get_interaction_stats, image_ids, user_id)
+
+        return ORJSONResponse(content={
             "status": "success",
-            "likes": likes,
-            "comments": comments,
-            "saves": saves,
-            "user_liked": user_liked,
-            "user_saved": user_saved
+            "images": {str(image_id): image_stats for image_id, image_stats in stats.items()}
         })
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
 
-@router.get("/feed")
+@router.get("/feed", response_model=FeedResponse)
 async def get_feed(
     limit: int = 20, 
     offset: int = 0, 
     user_id: int = None,
-    db: Session = Depends(get_db_session)
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
-    Get personalized feed for a user with recommendations
+    Get personalized feed for a user with recommendations,
+    `cursor` (the returned `next_cursor`) replaces `offset`
     """
     try:
-        images = get_recommendations(db, user_id, limit)
-        image_list = [
-            {
-                "id": image.id,
-                "url": image.image_url,
-                "description": image.description,
-                "user_id": image.user_id
-            }
-            for image in images
-        ]
+        try:
+            after = decode_cursor(cursor, s=float, id=int) if cursor else None
+        except ValueError as e:
+            return ORJSONResponse(status_code=400, content={"error": str(e)})
+
+        page = await db.run_sync(get_recommended_page, user_id, limit, offset, after)
+        next_cursor = None
+        if page and len(page) >= limit:
+            last_image_id, last_scores = page[-1]
+            next_cursor = encode_cursor(s=last_scores["total"], id=last_image_id)
+        image_list = await db.run_sync(get_feed_image_rows, [image_id for image_id, _ in page])
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success", 
             "images": image_list,
-            "count": len(image_list)
+            "count": len(image_list),
+            "next_cursor": next_cursor
         })
     
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
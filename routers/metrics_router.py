@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+
+from database import get_pool_stats
+from metrics import render_metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("")
+async def prometheus_metrics():
+    """
+    Per-route request counts, latency, DB time, SQL statements and storage time,
+    SQL statement and storage call durations and pool usage, in the Prometheus
+    text format. Counters are per worker process.
+    """
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    """
+    Connection pool usage (checked out / idle / overflow) and checkout wait times
+    """
+    try:
+        return ORJSONResponse(content={"status": "success", "pools": get_pool_stats()})
+    except Exception as e:
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
@@ -1,139 +1,166 @@
-from google_cloud.client import upload_cs_file, download_cs_file, delete_cs_file, BUCKET_NAME
 from services.user_service import (
     add_user,
-    delete_user,
+    delete_user as delete_user_service,
     get_user,
     get_user_by_username,
     get_user_by_email,
     update_user,
-    set_password,
-    check_password,
-    authenticate_user,
-    search_users_by_term,
+    get_user_for_login,
+    update_password_hash,
+    search_user_rows,
     add_follow,
     remove_follow,
     is_following,
+    get_follow_counts,
 )
-from database import get_db_session
+from services.pagination import encode_cursor, decode_cursor
+from services.password_service import hash_password_async, verify_password_async, needs_rehash
+from database import get_async_db_session
+from auth import get_optional_token_claims
+from services.token_service import issue_token
 from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi import APIRouter, File, UploadFile, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+from schemas.user import UserSearchResponse, UserDetailsResponse, LoginResponse
 import os
-from google.cloud import storage
 import shutil
 import uuid
 import traceback
 
 router = APIRouter(prefix="/user", tags=["user"])
 
+# Upper bound for one page of user search results
+MAX_SEARCH_PAGE = 50
+
 class LoginRequest(BaseModel):
     username_or_email: str
     password: str
 
 @router.post("/register_user")
-async def register_user(username: str, email: str, password: str, user_type: str, db: Session = Depends(get_db_session)):
+async def register_user(username: str, email: str, password: str, user_type: str, db: AsyncSession = Depends(get_async_db_session)):
     try:
-        user = add_user(db, username, email, password, user_type)
-        return JSONResponse(content={"status": "success", "user_id": user.id})
+        # bcrypt runs in the password pool, not on the event loop
+        password_hash = await hash_password_async(password)
+        user = await db.run_sync(add_user, username, email, password_hash=password_hash, user_type=user_type)
+        return ORJSONResponse(content={"status": "success", "user_id": user.id})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
     
 @router.delete("/delete_user/{user_id}")
-async def delete_user(user_id: int, db: Session = Depends(get_db_session)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db_session)):
     try:
-        user = get_user(db, user_id)
+        user = await db.run_sync(get_user, user_id)
         if not user:
-            return JSONResponse(status_code=404, content={"error": "User not found"})
+            return ORJSONResponse(status_code=404, content={"error": "User not found"})
         else:   
-            delete_user(db, user_id)       
-            return JSONResponse(content={"status": "success", "message": "User deleted successfully"})
+            await db.run_sync(delete_user_service, user_id)
+            return ORJSONResponse(content={"status": "success", "message": "User deleted successfully"})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
 
-@router.post("/login_user/")
-async def login_user(login_data: LoginRequest, db: Session = Depends(get_db_session)):
+@router.post("/login_user/", response_model=LoginResponse)
+async def login_user(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db_session)):
     """
     Authenticate a user and return user information if successful
     """
     try:
-        user = authenticate_user(db, login_data.username_or_email, login_data.password)
+        user = await db.run_sync(get_user_for_login, login_data.username_or_email)
+        if user and not await verify_password_async(login_data.password, user.password_hash):
+            user = None
+        elif user and needs_rehash(user.password_hash):
+            # Cost factor changed since the hash was made - upgrade it transparently
+            password_hash = await hash_password_async(login_data.password)
+            await db.run_sync(update_password_hash, user.id, password_hash)
         
         if user:
-            # Zwróć podstawowe informacje o użytkowniku
-            return JSONResponse(content={
+            # Zwróć podstawowe informacje o użytkowniku i podpisany token sesji
+            token, expires_at = issue_token(user.id, user.user_type, user.username)
+            return ORJSONResponse(content={
                 "status": "success",
                 "user": {
                     "id": user.id,
                     "username": user.username,
                     "email": user.email,
                     "user_type": user.user_type
-                }
+                },
+                "token": token,
+                "token_type": "bearer",
+                "expires_at": expires_at
             })
         else:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=401,
                 content={"status": "error", "message": "Nieprawidłowa nazwa użytkownika/email lub hasło"}
             )
             
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"status": "error", "message": f"Logowanie nie powiodło się: {str(e)}"}
         )
 
-@router.get("/search")
-async def search_users(term: str = "", db: Session = Depends(get_db_session)):
+@router.get("/search", response_model=UserSearchResponse)
+async def search_users_route(term: str = "", limit: int = 20, cursor: str | None = None, db: AsyncSession = Depends(get_async_db_session)):
+    """
+    Ranked user search (exact > prefix > substring), paginated with `cursor` = returned `next_cursor`
+    """
     try:
-        users = search_users_by_term(db, term)
-        if not users:
-            return JSONResponse(content={"status": "success", "users": []})
-        
-        user_list = [
-            {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "user_type": user.user_type
-            }
-            for user in users
-        ]
+        limit = max(1, min(limit, MAX_SEARCH_PAGE))
+        try:
+            after = decode_cursor(cursor, r=int, u=str, id=int) if cursor else None
+        except ValueError as e:
+            return ORJSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+        ranked = await db.run_sync(search_user_rows, term, limit, after)
+        user_list = [user for user, _ in ranked]
+        next_cursor = None
+        if ranked and len(ranked) >= limit:
+            last_user, last_rank = ranked[-1]
+            next_cursor = encode_cursor(r=last_rank, u=last_user["username"].lower(), id=last_user["id"])
         
-        return JSONResponse(content={"status": "success", "users": user_list})
+        return ORJSONResponse(content={"status": "success", "users": user_list, "next_cursor": next_cursor})
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500, 
             content={"status": "error", "message": f"Search failed: {str(e)}"}
         )
 
-@router.get("/user/{user_id}")
-async def get_user_details(user_id: int, follower_id: int | None = None, db: Session = Depends(get_db_session)):
+@router.get("/user/{user_id}", response_model=UserDetailsResponse)
+async def get_user_details(user_id: int, follower_id: int | None = None, claims: dict | None = Depends(get_optional_token_claims), db: AsyncSession = Depends(get_async_db_session)):
+    """`is_following` is for the caller identified by the bearer token, or by `follower_id`"""
     try:
-        user = get_user(db, user_id)
+        if claims is not None:
+            follower_id = claims["user_id"]
+
+        user = await db.run_sync(get_user, user_id)
         if not user:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=404,
                 content={"status": "error", "message": "User not found"}
             )
 
         follow_state = False
         if follower_id:
-            follow_state = is_following(db, follower_id, user_id)
+            follow_state = await db.run_sync(is_following, follower_id, user_id)
+        counts = await db.run_sync(get_follow_counts, user_id)
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success",
             "user": {
                 "id": user.id,
                 "username": user.username,
                 "email": user.email,
                 "user_type": user.user_type,
-                "is_following": follow_state
+                "is_following": follow_state,
+                "followers_count": counts["followers"],
+                "following_count": counts["following"]
             }
         })
     except Exception as e:
         traceback.print_exc()
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"status": "error", "message": f"Failed to get user: {str(e)}"}
         )
@@ -143,31 +170,29 @@ async def update_follow(
     user_id: int,
     followed_id: int,
     action: str = "follow",
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     try:
         if user_id == followed_id:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={"status": "error", "message": "Users cannot follow themselves"}
             )
-        follower = get_user(db, user_id)
-        target = get_user(db, followed_id)
-        if not follower or not target:
-            return JSONResponse(status_code=404, content={"status": "error", "message": "User not found"})
-
         if action == "unfollow":
-            remove_follow(db, user_id, followed_id)
+            # Idempotent: nothing to delete for unknown users either
+            await db.run_sync(remove_follow, user_id, followed_id)
             is_now_following = False
             msg = "Unfollowed successfully"
         else:
-            add_follow(db, user_id, followed_id)
+            # The follows foreign keys check that both users exist
+            if not await db.run_sync(add_follow, user_id, followed_id):
+                return ORJSONResponse(status_code=404, content={"status": "error", "message": "User not found"})
             is_now_following = True
             msg = "Followed successfully"
 
-        return JSONResponse(content={"status": "success", "message": msg, "is_following": is_now_following})
+        return ORJSONResponse(content={"status": "success", "message": msg, "is_following": is_now_following})
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"status": "error", "message": f"Failed to follow user: {str(e)}"}
         )
\ No newline at end of file
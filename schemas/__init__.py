@@ -0,0 +1,4 @@
+from schemas.image import ImageOut, FeedImageOut, ImageResponse, ImageListResponse, FeedResponse, ImportItemResult, ImportResponse
+from schemas.user import UserOut, UserDetailsOut, UserSearchResponse, UserDetailsResponse, LoginResponse
+from schemas.comment import CommentOut, CommentResponse, CommentListResponse
+from schemas.interaction import InteractionStatsOut, InteractionStatsResponse, InteractionStatsBatchResponse
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+
+
+class CommentOut(BaseModel):
+    id: int
+    user_id: int | None = None
+    username: str
+    content: str | None = None
+    timestamp: str
+
+
+class CommentResponse(BaseModel):
+    status: str
+    comment: CommentOut
+
+
+class CommentListResponse(BaseModel):
+    status: str
+    comments: list[CommentOut]
+    next_cursor: str | None = None
@@ -0,0 +1,48 @@
+from pydantic import BaseModel
+
+
+class ImageOut(BaseModel):
+    id: int
+    url: str | None = None
+    description: str | None = None
+    user_id: int | None = None
+
+
+class FeedImageOut(ImageOut):
+    username: str
+    user_type: str
+    scores: dict | None = None
+
+
+class ImageResponse(BaseModel):
+    status: str
+    image: ImageOut
+
+
+class ImageListResponse(BaseModel):
+    status: str
+    images: list[ImageOut]
+    next_cursor: str | None = None
+
+
+class FeedResponse(BaseModel):
+    status: str
+    images: list[FeedImageOut]
+    count: int
+    next_cursor: str | None = None
+
+
+class ImportItemResult(BaseModel):
+    file: str
+    status: str  # imported | skipped | failed
+    image_id: int | None = None
+    url: str | None = None
+    error: str | None = None
+
+
+class ImportResponse(BaseModel):
+    status: str
+    imported: int
+    skipped: int
+    failed: int
+    results: list[ImportItemResult]
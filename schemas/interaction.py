@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+
+class InteractionStatsOut(BaseModel):
+    likes: int
+    comments: int
+    saves: int
+    user_liked: bool
+    user_saved: bool
+
+
+class InteractionStatsResponse(InteractionStatsOut):
+    status: str
+
+
+class InteractionStatsBatchResponse(BaseModel):
+    status: str
+    images: dict[str, InteractionStatsOut]
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+
+
+class UserOut(BaseModel):
+    id: int
+    username: str
+    email: str
+    user_type: str | None = None
+
+
+class UserDetailsOut(UserOut):
+    is_following: bool
+    followers_count: int
+    following_count: int
+
+
+class UserSearchResponse(BaseModel):
+    status: str
+    users: list[UserOut]
+    next_cursor: str | None = None
+
+
+class UserDetailsResponse(BaseModel):
+    status: str
+    user: UserDetailsOut
+
+
+class LoginResponse(BaseModel):
+    status: str
+    user: UserOut
+    token: str
+    token_type: str
+    expires_at: int
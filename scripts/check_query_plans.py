@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from synthetic_data import create_schema, drop_schema, seed
+from services.recommendation_service import _rank_candidates
+from services.recommendation_cache import RECOMMENDATION_CANDIDATES
+from services.search_service import search_image_ids
+from services.image_service import get_user_image_rows, get_feed_image_rows
+from services.comment_service import get_comment_rows
+from services.interaction_service import get_interaction_stats
+from services.user_service import search_user_rows, get_followed_ids, get_follow_counts
+
+# Flags service queries whose plan falls back to a sequential scan of a large
+# table. Migrates a throwaway schema, fills it with synthetic data, runs the
+# read paths of the API, EXPLAINs every statement they issued and drops the
+# schema again:
+#   python scripts/check_query_plans.py --scale 1
+# Exits with 1 when a query needs a sequential scan.
+#
+# The plans are made with enable_seqscan off, so a Seq Scan left in them means
+# no index can serve the query at all - on a dataset this small the planner
+# would otherwise rightly prefer scanning for the less selective queries.
+# --planner-choice checks the plans the planner picks on its own instead.
+
+# Tables with fewer rows are fine to scan
+MIN_TABLE_ROWS = 10000
+
+
+def hot_path_calls(user_id, artist_id, image_id):
+    """(name, service call) of the read paths the API serves"""
+    return [
+        # Before the feed, which would otherwise fill the followed-ids cache
+        ("followed ids", lambda session: get_followed_ids(session, user_id)),
+        ("feed (user)", lambda session: _rank_candidates(session, user_id, RECOMMENDATION_CANDIDATES)),
+        ("feed (anonymous)", lambda session: _rank_candidates(session, None, RECOMMENDATION_CANDIDATES)),
+        ("feed images", lambda session: get_feed_image_rows(session, [image_id, image_id + 1, image_id + 2])),
+        ("image search", lambda session: search_image_ids(session, "dragon", 20)),
+        ("fuzzy image search", lambda session: search_image_ids(session, "dragn", 20)),
+        ("user search", lambda session: search_user_rows(session, "user12", 20)),
+        ("gallery", lambda session: get_user_image_rows(session, artist_id, 20)),
+        ("comments", lambda session: get_comment_rows(session, image_id, 50)),
+        ("interaction stats", lambda session: get_interaction_stats(session, [image_id, image_id + 1], user_id)),
+        ("follow counts", lambda session: get_follow_counts(session, artist_id)),
+    ]
+
+
+def capture_statements(connection, call):
+    """Run `call` in a session on `connection`, returning the (statement, parameters) it executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    session = Session(bind=connection)
+    try:
+        call(session)
+    finally:
+        session.close()
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def _seq_scans(plan):
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    # A filtered walk over a whole index (no Index Cond) is a scan in disguise
+    elif plan.get("Node Type") in ("Index Scan", "Index Only Scan") and "Filter" in plan and "Index Cond" not in plan:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+def sequential_scans(connection, statement, parameters, large_tables, planner_choice=False):
+    """Large tables the statement's plan reads with a Seq Scan"""
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return []
+    connection.execute(text(f"SET LOCAL enable_seqscan TO {'on' if planner_choice else 'off'}"))
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return sorted({table for table in _seq_scans(plan[0]["Plan"]) if table in large_tables})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the service queries for sequential scans")
+    parser.add_argument("--scale", type=float, default=1.0, help="synthetic dataset size, see scripts/synthetic_data.py")
+    parser.add_argument("--min-rows", type=int, default=MIN_TABLE_ROWS, help="smaller tables may be scanned")
+    parser.add_argument("--planner-choice", action="store_true", help="check the plans as chosen at this dataset size")
+    parser.add_argument("--keep-schema", action="store_true", help="leave the synthetic schema in place")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every checked statement")
+    args = parser.parse_args()
+
+    from database import get_engine
+
+    schema = f"plan_check_{uuid.uuid4().hex[:8]}"
+    failures = 0
+    with get_engine().connect() as connection:
+        try:
+            create_schema(connection, schema)
+            sizes = seed(connection, args.scale)
+            print(f"Seeded schema {schema}: " + ", ".join(f"{name}={count}" for name, count in sizes.items()))
+
+            large_tables = set(connection.execute(
+                text("SELECT relname FROM pg_class WHERE relkind = 'r' AND relnamespace = CAST(:schema AS regnamespace) AND reltuples >= :min_rows"),
+                {"schema": schema, "min_rows": args.min_rows},
+            ).scalars())
+
+            # The most followed artist, an average user and the artist's newest image
+            artist_id = connection.execute(text("SELECT followed_id FROM follows GROUP BY followed_id ORDER BY count(*) DESC LIMIT 1")).scalar()
+            user_id = sizes["users"] // 2 + 1
+            image_id = connection.execute(text("SELECT max(id) FROM images WHERE user_id = :artist_id"), {"artist_id": artist_id}).scalar()
+
+            for name, call in hot_path_calls(user_id, artist_id, image_id):
+                for statement, parameters in capture_statements(connection, call):
+                    scanned = sequential_scans(connection, statement, parameters, large_tables, args.planner_choice)
+                    if scanned:
+                        failures += 1
+                        print(f"SEQ SCAN  {name}: {', '.join(scanned)}\n    {' '.join(statement.split())}")
+                    elif args.verbose:
+                        print(f"ok        {name}: {' '.join(statement.split())[:120]}")
+                connection.rollback()
+        finally:
+            if not args.keep_schema:
+                drop_schema(connection, schema)
+
+    print(f"{failures} statement(s) with sequential scans on tables over {args.min_rows} rows.")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
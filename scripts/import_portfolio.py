@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import get_db
+from google_cloud.storage_backends import get_storage_backend
+from services.import_service import (
+    IMPORT_CONCURRENCY,
+    IMPORT_BATCH_SIZE,
+    MANIFEST_FILE_NAME,
+    parse_manifest,
+    relative_file_path,
+    select_import_files,
+    file_digest,
+    import_object_name,
+    upload_import_file,
+    imported_urls,
+    insert_image_batch,
+)
+
+# Import a portfolio directory for one artist:
+#   python scripts/import_portfolio.py ./portfolio --user-id 7
+# With <directory>/manifest.json (or --manifest) only the listed files are
+# imported, with their descriptions and tags; without it every image file is,
+# subdirectories included. Files are named by their path relative to <directory>.
+# Safe to re-run after an interruption - already imported files are skipped.
+
+
+def _upload(backend, path, object_name):
+    with open(path, "rb") as source:
+        return upload_import_file(backend, source, object_name, path)
+
+
+def _prepare(user_id, path):
+    with open(path, "rb") as source:
+        return import_object_name(user_id, path, file_digest(source))
+
+
+def _directory_files(directory):
+    """Paths of all files below `directory`, relative to it, sorted"""
+    return sorted(
+        relative_file_path(os.path.relpath(os.path.join(root, name), directory))
+        for root, _, names in os.walk(directory)
+        for name in names
+    )
+
+
+def import_batch(db, backend, executor, user_id, directory, file_names, manifest):
+    paths = [os.path.join(directory, file_name) for file_name in file_names]
+    object_names = list(executor.map(lambda path: _prepare(user_id, path), paths))
+    urls = [backend.public_url(object_name) for object_name in object_names]
+    existing = imported_urls(db, user_id, urls)
+
+    results, pending = [], []
+    for file_name, path, object_name, url in zip(file_names, paths, object_names, urls):
+        result = {"file": file_name, "status": "skipped", "url": url}
+        results.append(result)
+        # The same file twice in the directory is imported once
+        if url not in existing:
+            existing.add(url)
+            pending.append((result, path, object_name))
+
+    futures = [(result, executor.submit(_upload, backend, path, object_name)) for result, path, object_name in pending]
+    rows, row_results = [], []
+    for result, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            result.update(status="failed", url=None, error=str(e))
+            continue
+        entry = manifest.get(result["file"], {})
+        rows.append({"image_url": result["url"], "description": entry.get("description"), "tags": entry.get("tags")})
+        row_results.append(result)
+
+    try:
+        image_ids = insert_image_batch(db, user_id, rows)
+    except Exception as e:
+        db.rollback()
+        for result in row_results:
+            result.update(status="failed", url=None, error=str(e))
+        return results
+    for result, image_id in zip(row_results, image_ids):
+        result.update(status="imported", image_id=image_id)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import a portfolio directory")
+    parser.add_argument("directory")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--manifest", help=f"defaults to <directory>/{MANIFEST_FILE_NAME} when present")
+    parser.add_argument("--concurrency", type=int, default=IMPORT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--results", help="write the per-file results to this JSON file")
+    args = parser.parse_args()
+
+    manifest_path = args.manifest or os.path.join(args.directory, MANIFEST_FILE_NAME)
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = parse_manifest(manifest_file.read())
+
+    try:
+        file_names = select_import_files(_directory_files(args.directory), manifest)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    backend = get_storage_backend()
+    results = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor, get_db() as db:
+        for start in range(0, len(file_names), args.batch_size):
+            batch = import_batch(db, backend, executor, args.user_id, args.directory, file_names[start:start + args.batch_size], manifest or {})
+            for result in batch:
+                print(f"{result['status']:>8}  {result['file']}" + (f"  ({result['error']})" if result.get("error") else ""))
+            results += batch
+
+    counts = {status: sum(1 for result in results if result["status"] == status) for status in ("imported", "skipped", "failed")}
+    print(f"Imported {counts['imported']}, skipped {counts['skipped']}, failed {counts['failed']}.")
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as results_file:
+            json.dump(results, results_file, indent=2)
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from alembic import command
+from migrations import alembic_config
+
+# Schema migrations:
+#   python scripts/migrate.py upgrade            # to the newest revision
+#   python scripts/migrate.py downgrade 0001
+#   python scripts/migrate.py current / history
+#   python scripts/migrate.py revision -m "add foo" --autogenerate
+# Databases created by the old import-time create_all need no stamping, the
+# baseline revision only creates what is missing.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run database schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upgrade = commands.add_parser("upgrade", help="migrate up to a revision")
+    upgrade.add_argument("revision", nargs="?", default="head")
+    upgrade.add_argument("--sql", action="store_true", help="print the SQL instead of running it")
+
+    downgrade = commands.add_parser("downgrade", help="migrate down to a revision")
+    downgrade.add_argument("revision")
+    downgrade.add_argument("--sql", action="store_true", help="print the SQL instead of running it")
+
+    commands.add_parser("current", help="show the database's revision")
+    commands.add_parser("history", help="list the revisions")
+
+    stamp = commands.add_parser("stamp", help="record a revision without running migrations")
+    stamp.add_argument("revision")
+
+    revision = commands.add_parser("revision", help="create a new revision file")
+    revision.add_argument("-m", "--message", required=True)
+    revision.add_argument("--autogenerate", action="store_true", help="diff the models against the database")
+
+    args = parser.parse_args()
+    config = alembic_config()
+
+    if args.command == "upgrade":
+        command.upgrade(config, args.revision, sql=args.sql)
+    elif args.command == "downgrade":
+        command.downgrade(config, args.revision, sql=args.sql)
+    elif args.command == "current":
+        command.current(config, verbose=True)
+    elif args.command == "history":
+        command.history(config)
+    elif args.command == "stamp":
+        command.stamp(config, args.revision)
+    elif args.command == "revision":
+        command.revision(config, message=args.message, autogenerate=args.autogenerate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import get_db
+from services.comment_service import rebuild_comment_counts
+
+# Recompute images.comment_count from the comments table, to repair drift
+# after manual data changes (migration 0003 backfills it when adding the column)
+with get_db() as db:
+    rebuild_comment_counts(db)
+print("Comment counts rebuilt successfully.")
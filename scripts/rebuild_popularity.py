@@ -0,0 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import get_db
+from services.popularity_service import rebuild_popularity
+
+# Backfill image_popularity from the interactions table - run once after
+# deploying the counters and whenever POPULARITY_EPOCH / half-life change
+with get_db() as db:
+    rebuild_popularity(db)
+print("Popularity counters rebuilt successfully.")
@@ -0,0 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import get_db
+from services.timeline_service import rebuild_timelines
+
+# Backfill home_timeline from follows and images - run once after deploying
+# the timelines and whenever TIMELINE_MAX_LENGTH / FANOUT_MAX_FOLLOWERS change
+with get_db() as db:
+    rebuild_timelines(db)
+print("Home timelines rebuilt successfully.")
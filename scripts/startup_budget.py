@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Measures what a new API worker pays before it can serve: importing `main`
+# and running the lifespan startup (engine, DB warm-up, schema check). Each
+# measurement runs in a fresh interpreter, like a worker start or reload:
+#   python scripts/startup_budget.py --runs 5
+# Exits with 1 when the median is over budget; --top lists the slowest imports.
+
+IMPORT_BUDGET_MS = 800
+STARTUP_BUDGET_MS = 500
+
+# Runs in the child process, prints the timings as JSON
+_MEASURE = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+started = asyncio.run(startup())
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (started - imported) * 1000}))
+"""
+
+
+def measure(python=sys.executable):
+    output = subprocess.run([python, "-c", _MEASURE], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(count, python=sys.executable):
+    """[(cumulative ms, module)] of the top-level imports of `main`, slowest first"""
+    stderr = subprocess.run([python, "-X", "importtime", "-c", "import main"], cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Two-space indent = imported directly by main
+        if name.startswith("   ") and not name.startswith("    "):
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the API's import and startup time budget")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest imports of main.py")
+    args = parser.parse_args()
+
+    # The children inherit it: startup must not fail for lack of a token secret
+    os.environ.setdefault("APP_ENV", "development")
+    runs = [measure() for _ in range(args.runs)]
+    import_ms = _median([run["import_ms"] for run in runs])
+    startup_ms = _median([run["startup_ms"] for run in runs])
+    print(f"import main   {import_ms:7.1f} ms  (budget {args.import_budget_ms:.0f} ms)")
+    print(f"startup       {startup_ms:7.1f} ms  (budget {args.startup_budget_ms:.0f} ms)")
+    print(f"total         {import_ms + startup_ms:7.1f} ms")
+
+    if args.top:
+        print("\nSlowest imports of main.py:")
+        for cumulative_ms, name in slowest_imports(args.top):
+            print(f"  {cumulative_ms:7.1f} ms  {name}")
+
+    if import_ms > args.import_budget_ms or startup_ms > args.startup_budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import migrations
+from models import Base
+from services.interaction_service import INTERACTION_WEIGHTS
+from services.popularity_service import rebuild_popularity
+from services.timeline_service import rebuild_timelines
+from services.comment_service import rebuild_comment_counts
+
+# Synthetic dataset for query plan checks and benchmarks, generated in SQL
+# (generate_series) so a few hundred thousand rows take seconds. Always seeded
+# into its own schema, never next to real data:
+#   python scripts/synthetic_data.py --schema synthetic --scale 2
+# Every 10th user is an artist, images and follows are skewed towards the
+# low artist ids so there are popular artists, tags and images.
+
+# Rows at scale 1
+BASE_SIZES = {
+    "users": 5000,
+    "tags": 300,
+    "images": 20000,
+    "tags_per_image": 3,
+    "follows_per_user": 5,
+    "interactions": 200000,
+    "comments": 50000,
+}
+# Share of each interaction type among the generated interactions
+INTERACTION_MIX = {"view": 0.6, "like": 0.25, "save": 0.1, "comment": 0.05}
+
+TAG_WORDS = ("dragon", "rose", "skull", "koi", "mandala", "tribal", "geometric", "portrait", "script", "lotus")
+
+
+def dataset_sizes(scale=1.0, **overrides):
+    """BASE_SIZES times `scale`; keyword arguments set single sizes, e.g. interactions=1000000"""
+    sizes = {name: max(1, int(count * scale)) for name, count in BASE_SIZES.items()}
+    sizes["tags_per_image"] = BASE_SIZES["tags_per_image"]
+    sizes["follows_per_user"] = BASE_SIZES["follows_per_user"]
+    sizes.update((name, count) for name, count in overrides.items() if count is not None)
+    sizes["artists"] = max(1, sizes["users"] // 10)
+    return sizes
+
+
+def create_schema(connection, schema):
+    """Create `schema`, migrate it to head and make it the connection's search_path"""
+    connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+    connection.commit()
+    migrations.upgrade("head", connection=connection, schema=schema)
+    connection.execute(text(f'SET search_path TO "{schema}", public'))
+    # Seeding and rebuilding the derived tables run longer than API queries may
+    connection.execute(text("SET statement_timeout TO 0"))
+    connection.commit()
+
+
+def drop_schema(connection, schema):
+    connection.rollback()
+    connection.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+    connection.execute(text("RESET search_path"))
+    connection.execute(text("RESET statement_timeout"))
+    connection.commit()
+
+
+def _interaction_types_sql():
+    # (type, weight, lower bound, upper bound) of each type's share of random()
+    rows, bound = [], 0.0
+    for interaction_type, share in INTERACTION_MIX.items():
+        rows.append(f"('{interaction_type}', {INTERACTION_WEIGHTS[interaction_type]}, {bound}, {bound + share})")
+        bound += share
+    return f"(VALUES {', '.join(rows)}) AS kinds(interaction_type, weight, low, high)"
+
+
+def seed(connection, scale=1.0, random_seed=0.42, sizes=None):
+    """
+    Fill the (empty) schema on the connection's search_path, then rebuild the
+    derived tables and ANALYZE. `sizes` (see dataset_sizes) replaces `scale`.
+    Returns the dataset sizes.
+    """
+    sizes = sizes or dataset_sizes(scale)
+    if connection.execute(text("SELECT EXISTS (SELECT 1 FROM users)")).scalar():
+        raise ValueError("Synthetic data is only seeded into an empty schema")
+
+    words = "ARRAY[" + ", ".join(f"'{word}'" for word in TAG_WORDS) + "]"
+    statements = [
+        "SELECT setseed(:random_seed)",
+        """
+        INSERT INTO users (username, email, user_type)
+        SELECT 'user' || g, 'user' || g || '@example.com',
+               CASE WHEN g % 50 = 0 THEN 'studio' WHEN g % 10 = 0 THEN 'artist' ELSE 'client' END
+        FROM generate_series(1, :users) g
+        """,
+        f"""
+        INSERT INTO tags (name)
+        SELECT ({words})[1 + g % {len(TAG_WORDS)}] || '-' || g
+        FROM generate_series(1, :tags) g
+        """,
+        # Authors are artists (id % 10 = 0), skewed towards the first ones
+        f"""
+        INSERT INTO images (user_id, image_url, description)
+        SELECT 10 * (1 + floor(power(random(), 1.5) * :artists)::int),
+               'https://example.com/synthetic/' || g || '.jpg',
+               'Synthetic ' || ({words})[1 + g % {len(TAG_WORDS)}] || ' tattoo number ' || g
+        FROM generate_series(1, :images) g
+        """,
+        """
+        INSERT INTO image_tags (image_id, tag_id)
+        SELECT images.id, 1 + floor(power(random(), 2) * :tags)::int
+        FROM images CROSS JOIN generate_series(1, :tags_per_image)
+        ON CONFLICT DO NOTHING
+        """,
+        """
+        INSERT INTO follows (follower_id, followed_id)
+        SELECT follower_id, followed_id FROM (
+            SELECT users.id AS follower_id, 10 * (1 + floor(power(random(), 2) * :artists)::int) AS followed_id
+            FROM users CROSS JOIN generate_series(1, :follows_per_user)
+        ) pairs
+        WHERE follower_id <> followed_id
+        ON CONFLICT DO NOTHING
+        """,
+        f"""
+        INSERT INTO interactions (user_id, image_id, interaction_type, weight, timestamp)
+        SELECT draws.user_id, draws.image_id, kinds.interaction_type, kinds.weight, draws.timestamp
+        FROM (
+            SELECT 1 + floor(random() * :users)::int AS user_id,
+                   1 + floor(power(random(), 2) * :images)::int AS image_id,
+                   random() AS kind,
+                   now() - random() * interval '90 days' AS timestamp
+            FROM generate_series(1, :interactions)
+        ) draws
+        JOIN {_interaction_types_sql()} ON draws.kind >= kinds.low AND draws.kind < kinds.high
+        """,
+        """
+        INSERT INTO comments (user_id, image_id, content, timestamp)
+        SELECT 1 + floor(random() * :users)::int,
+               1 + floor(power(random(), 2) * :images)::int,
+               'Synthetic comment ' || g,
+               now() - random() * interval '90 days'
+        FROM generate_series(1, :comments) g
+        """,
+    ]
+    parameters = dict(sizes, random_seed=random_seed)
+    for statement in statements:
+        connection.execute(text(statement), parameters)
+    connection.commit()
+
+    session = Session(bind=connection)
+    try:
+        rebuild_comment_counts(session)
+        rebuild_popularity(session)
+        rebuild_timelines(session)
+    finally:
+        session.close()
+
+    for table in Base.metadata.sorted_tables:
+        connection.execute(text(f'ANALYZE "{table.name}"'))
+    connection.commit()
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a schema with synthetic data")
+    parser.add_argument("--schema", required=True, help="created and migrated, must not exist yet")
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    from database import get_engine
+
+    with get_engine().connect() as connection:
+        create_schema(connection, args.schema)
+        sizes = seed(connection, args.scale)
+    print(f"Seeded schema {args.schema}: " + ", ".join(f"{name}={count}" for name, count in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
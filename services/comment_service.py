@@ -1,4 +1,10 @@
+from sqlalchemy import select, func, update, or_, and_, desc, asc
+from sqlalchemy.orm import joinedload
 from models.comment import Comment
+from models.image import Image
+from models.user import User
+
+COMMENT_ORDERS = ('newest', 'oldest')
 
 def add_comment(session, user_id, image_id, content):
     new_comment = Comment(
@@ -7,6 +13,8 @@ def add_comment(session, user_id, image_id, content):
         content=content
     )
     session.add(new_comment)
+    # The counter is updated in the same transaction as the comment
+    session.execute(update(Image).where(Image.id == image_id).values(comment_count=Image.comment_count + 1))
     session.commit()
     session.refresh(new_comment)
     return new_comment
@@ -23,10 +31,58 @@ def delete_comment(session, comment_id):
     comment = session.query(Comment).filter_by(id=comment_id).first()
     if comment:
         session.delete(comment)
+        session.execute(
+            update(Image)
+            .where(Image.id == comment.image_id)
+            .values(comment_count=func.greatest(Image.comment_count - 1, 0))
+        )
         session.commit()
         return True
     return False
 
 
 def get_comments_for_image(session, image_id):
-    return session.query(Comment).filter_by(image_id=image_id).all()
\ No newline at end of file
+    # Comments are serialized with the author's username
+    return session.query(Comment).options(joinedload(Comment.user)).filter_by(image_id=image_id).all()
+
+
+def get_comment_rows(session, image_id, limit=50, order='newest', after=None):
+    """
+    One page of an image's comments projected to the serialized columns, with the
+    author's username joined in. `order` is 'newest' or 'oldest' first; `after` =
+    (timestamp, id) of the last comment already shown is the keyset cursor.
+    Served by the (image_id, timestamp, id) index however many comments there are.
+    """
+    if order not in COMMENT_ORDERS:
+        raise ValueError(f"order must be one of {', '.join(COMMENT_ORDERS)}")
+    newest_first = order == 'newest'
+
+    query = select(Comment.id, Comment.user_id, User.username, Comment.content, Comment.timestamp)\
+        .outerjoin(User, User.id == Comment.user_id)\
+        .where(Comment.image_id == image_id)
+    if after is not None:
+        last_timestamp, last_id = after
+        if newest_first:
+            query = query.where(or_(Comment.timestamp < last_timestamp, and_(Comment.timestamp == last_timestamp, Comment.id < last_id)))
+        else:
+            query = query.where(or_(Comment.timestamp > last_timestamp, and_(Comment.timestamp == last_timestamp, Comment.id > last_id)))
+    direction = desc if newest_first else asc
+    query = query.order_by(direction(Comment.timestamp), direction(Comment.id)).limit(limit)
+
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "username": row.username if row.username is not None else f"User {row.user_id}",
+            "content": row.content,
+            "timestamp": row.timestamp.isoformat()
+        }
+        for row in session.execute(query)
+    ]
+
+
+def rebuild_comment_counts(session):
+    """Recompute every image's comment_count from the comments table (backfill)"""
+    counted = select(func.count(Comment.id)).where(Comment.image_id == Image.id).scalar_subquery()
+    session.execute(update(Image).values(comment_count=counted))
+    session.commit()
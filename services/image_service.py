@@ -1,8 +1,15 @@
 from models.image import Image
+from models.user import User
 from models.tag import Tag
 from models.interaction import Interaction
 from models.comment import Comment
-from sqlalchemy import desc, or_
+from services.recommendation_cache import invalidate_recommendations
+from services.popularity_service import delete_image_popularity
+from services.tag_service import set_image_tags
+from services.timeline_service import fan_out_image, delete_image_from_timelines
+from services.search_service import search_images
+from sqlalchemy import desc, or_, and_, select, func
+from sqlalchemy.orm import joinedload
 
 def add_image(session, user_id, image_url, description=None, tags=None):
     new_image = Image(user_id=user_id, image_url=image_url, description=description)
@@ -10,23 +17,15 @@ def add_image(session, user_id, image_url, description=None, tags=None):
     session.flush()
 
     if tags and isinstance(tags, list):
-        tag_objects = []
-        for tag_name in tags:
-            tag_name = tag_name.strip().lower()
-            if not tag_name:
-                continue
-            
-            tag = session.query(Tag).filter(Tag.name == tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                session.add(tag)
-                session.flush()  
-            
-            tag_objects.append(tag)
-
-        new_image.tags = tag_objects
+        set_image_tags(session, new_image.id, tags)
 
+    # Nowy obraz trafia do timeline'ów obserwujących (fan-out on write)
+    follower_ids = fan_out_image(session, new_image.id, user_id)
     session.commit()
+
+    # ... i do feedu niezalogowanych; obserwujący kont z bardzo dużą liczbą
+    # obserwujących zobaczą go po wygaśnięciu swojego cache rekomendacji
+    invalidate_recommendations(None, *follower_ids)
     return new_image
 
 def update_image(session, image_id, image_url=None, description=None, tags=None):
@@ -37,21 +36,7 @@ def update_image(session, image_id, image_url=None, description=None, tags=None)
         if description:
             image.description = description
         if tags and isinstance(tags, list):
-            tag_objects = []
-            for tag_name in tags:
-                tag_name = tag_name.strip().lower()
-                if not tag_name:
-                    continue
-                
-                tag = session.query(Tag).filter(Tag.name == tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    session.add(tag)
-                    session.flush()  
-                
-                tag_objects.append(tag)
-
-            image.tags = tag_objects
+            set_image_tags(session, image.id, tags, replace=True)
 
         session.commit()
         return True
@@ -65,6 +50,8 @@ def delete_image(session, image_id):
     # Remove dependent records to satisfy FK constraints
     session.query(Interaction).filter_by(image_id=image_id).delete(synchronize_session=False)
     session.query(Comment).filter_by(image_id=image_id).delete(synchronize_session=False)
+    delete_image_popularity(session, image_id)
+    delete_image_from_timelines(session, image_id)
 
     # Clear many-to-many tags
     image.tags = []
@@ -76,31 +63,73 @@ def delete_image(session, image_id):
 def get_image(session, image_id):
     return session.query(Image).filter_by(id=image_id).first()
 
-def get_user_images(session, user_id):
-    return session.query(Image).filter_by(user_id=user_id).all()
+def get_user_images(session, user_id, limit=None, after_id=None):
+    """Newest first; `after_id` is the keyset cursor (id of the last image already shown)"""
+    query = session.query(Image).options(joinedload(Image.owner)).filter_by(user_id=user_id)
+    if after_id is not None:
+        query = query.filter(Image.id < after_id)
+    query = query.order_by(desc(Image.id))
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
-def get_feed_images(session, limit=20, offset=0, search_term=None):
-    query = session.query(Image)
-    
+def get_user_image_rows(session, user_id, limit=None, after_id=None):
+    """get_user_images projected to the gallery columns: [{"id", "url", "description"}]"""
+    query = select(Image.id, Image.image_url.label("url"), Image.description)\
+        .where(Image.user_id == user_id)
+    if after_id is not None:
+        query = query.where(Image.id < after_id)
+    query = query.order_by(desc(Image.id))
+    if limit is not None:
+        query = query.limit(limit)
+    return [dict(row) for row in session.execute(query).mappings()]
+
+def get_feed_image_rows(session, image_ids):
+    """
+    Feed columns of the given images with their owner, one query, in the order of
+    `image_ids`: [{"id", "url", "description", "user_id", "username", "user_type"}]
+    """
+    if not image_ids:
+        return []
+    query = select(
+        Image.id,
+        Image.image_url.label("url"),
+        Image.description,
+        Image.user_id,
+        User.username,
+        User.user_type,
+    ).outerjoin(User, User.id == Image.user_id).where(Image.id.in_(image_ids))
+
+    by_id = {}
+    for row in session.execute(query).mappings():
+        item = dict(row)
+        if item["username"] is None:
+            item["username"] = f"User {item['user_id']}"
+        if item["user_type"] is None:
+            item["user_type"] = "artist"
+        by_id[item["id"]] = item
+    return [by_id[image_id] for image_id in image_ids if image_id in by_id]
+
+def get_feed_images(session, limit=20, offset=0, search_term=None, after_id=None):
+    """
+    `after_id` (keyset cursor: id of the last image already shown) replaces `offset`.
+    With `search_term` the results are relevance-ranked, see search_service.search_images.
+    """
     if search_term:
-        search_term = search_term.strip().lower()        
-        tag_images = session.query(Image.id)\
-            .join(Image.tags)\
-            .filter(Tag.name.ilike(f"%{search_term}%"))\
-            .subquery()
-            
-        query = query.filter(
-            or_(
-                Image.description.ilike(f"%{search_term}%"),
-                Image.id.in_(tag_images)
-            )
-        )
+        return [image for image, _ in search_images(session, search_term, limit, offset)]
+
+    # The feed is serialized with the owner's username/user_type
+    query = session.query(Image).options(joinedload(Image.owner))
     
+    if after_id is not None:
+        return query.filter(Image.id < after_id).order_by(desc(Image.id)).limit(limit).all()
+
     query = query.order_by(desc(Image.id))
     
     return query.limit(limit).offset(offset).all()
 
-def get_images_by_tags(session, tag_names, limit=20, offset=0):
+def get_images_by_tags(session, tag_names, limit=20, offset=0, after=None):
+    """`after` = (matched tag count, image id) of the last image already shown, replaces `offset`"""
     if not tag_names:
         return []
         
@@ -111,14 +140,23 @@ def get_images_by_tags(session, tag_names, limit=20, offset=0):
     ).group_by(Image.id)
     
     if len(normalized_tags) > 1:
-        from sqlalchemy import func
         query = query.having(
             func.count(Tag.id) > 0
         ).order_by(
             desc(func.count(Tag.id)),
             desc(Image.id)
         )
+        if after is not None:
+            matched, last_id = after
+            query = query.having(or_(
+                func.count(Tag.id) < matched,
+                and_(func.count(Tag.id) == matched, Image.id < last_id)
+            ))
     else:
         query = query.order_by(desc(Image.id))
-        
+        if after is not None:
+            query = query.filter(Image.id < after[1])
+
+    if after is not None:
+        return query.limit(limit).all()
     return query.limit(limit).offset(offset).all()
\ No newline at end of file
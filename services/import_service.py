@@ -0,0 +1,137 @@
+"""
+Bulk portfolio import, shared by the /image/import endpoint and scripts/import_portfolio.py.
+
+Items are processed in batches of IMPORT_BATCH_SIZE: the files of a batch are
+uploaded in parallel (at most IMPORT_CONCURRENCY at a time), then the batch's
+images and tags are inserted in one transaction. Object names are derived from
+the file content, so re-running an interrupted import skips everything that
+was already committed and re-uploads at most the one unfinished batch.
+"""
+from sqlalchemy import insert, select
+from models.image import Image
+from services.recommendation_cache import invalidate_recommendations
+from services.tag_service import resolve_tag_ids, normalize_tag_names
+from services.timeline_service import fan_out_images
+from models.image_tag import image_tags
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", 4))  # parallel uploads
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 50))  # images per transaction
+MAX_IMPORT_ITEMS = int(os.getenv("MAX_IMPORT_ITEMS", 500))  # per request / archive
+# Limits on what one import request may unpack, checked before anything is read
+MAX_IMPORT_ENTRIES = int(os.getenv("MAX_IMPORT_ENTRIES", 2000))  # archive members, incl. non-images
+MAX_IMPORT_BYTES = int(os.getenv("MAX_IMPORT_BYTES", 2 * 1024 ** 3))  # uncompressed, all files
+MAX_MANIFEST_BYTES = int(os.getenv("MAX_MANIFEST_BYTES", 1024 * 1024))  # uncompressed
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic"}
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def parse_manifest(text):
+    """
+    Manifest: a JSON list of {"file": "koi.jpg", "description": "...", "tags": ["koi"]},
+    "file" being the path relative to the imported directory or archive root.
+    Returns {relative path: {"description", "tags"}}; raises ValueError when malformed.
+    """
+    try:
+        entries = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid manifest: {e}")
+    if not isinstance(entries, list):
+        raise ValueError("Invalid manifest: expected a list of entries")
+
+    manifest = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("file") or not isinstance(entry["file"], str):
+            raise ValueError("Invalid manifest: every entry needs a \"file\"")
+        if not is_image_file(entry["file"]):
+            raise ValueError(f"Invalid manifest: {entry['file']} is not an image file")
+        tags = entry.get("tags") or []
+        if not isinstance(tags, list):
+            raise ValueError(f"Invalid manifest: tags of {entry['file']} must be a list")
+        manifest[relative_file_path(entry["file"])] = {"description": entry.get("description"), "tags": tags}
+    return manifest
+
+
+def is_image_file(file_name):
+    return os.path.splitext(file_name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def relative_file_path(path):
+    """The manifest key of a path: ./2021\\koi.jpg -> 2021/koi.jpg"""
+    return posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+
+
+def select_import_files(file_names, manifest):
+    """
+    Which of `file_names` (relative paths) to import, in their order: with a
+    manifest exactly the files it lists, without one every image file.
+    Raises ValueError naming the listed files that are missing.
+    """
+    if manifest is None:
+        return [file_name for file_name in file_names if is_image_file(file_name)]
+    missing = set(manifest).difference(file_names)
+    if missing:
+        raise ValueError(f"Files listed in the manifest are missing: {', '.join(sorted(missing))}")
+    return [file_name for file_name in file_names if file_name in manifest]
+
+
+def file_digest(source):
+    """sha256 of a binary file object; rewinds it for the upload"""
+    digest = hashlib.sha256()
+    while chunk := source.read(1024 * 1024):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def import_object_name(user_id, file_name, digest):
+    """Content-addressed, so the same file always maps to the same object (and URL)"""
+    extension = os.path.splitext(file_name)[1].lower()
+    return f"imports/{user_id}/{digest[:40]}{extension}"
+
+
+def upload_import_file(backend, source, object_name, file_name):
+    return backend.upload_fileobj(source, object_name, mimetypes.guess_type(file_name)[0])
+
+
+def imported_urls(session, user_id, urls):
+    """The subset of `urls` the user already has images for"""
+    if not urls:
+        return set()
+    return set(session.execute(
+        select(Image.image_url).where(Image.user_id == user_id, Image.image_url.in_(urls))
+    ).scalars())
+
+
+def insert_image_batch(session, user_id, rows):
+    """
+    Insert [{"image_url", "description", "tags"}] for one user in a single
+    transaction: one multi-row INSERT for the images, one tag upsert for all
+    tags of the batch, one INSERT for the links and one timeline fan-out.
+    Returns the new image ids.
+    """
+    if not rows:
+        return []
+    image_ids = session.execute(
+        insert(Image).returning(Image.id, sort_by_parameter_order=True),
+        [{"user_id": user_id, "image_url": row["image_url"], "description": row.get("description")} for row in rows]
+    ).scalars().all()
+
+    tag_ids = resolve_tag_ids(session, [tag for row in rows for tag in row.get("tags") or []])
+    links = [
+        {"image_id": image_id, "tag_id": tag_ids[tag_name]}
+        for image_id, row in zip(image_ids, rows)
+        for tag_name in normalize_tag_names(row.get("tags"))
+    ]
+    if links:
+        session.execute(insert(image_tags), links)
+    follower_ids = fan_out_images(session, user_id, image_ids)
+    session.commit()
+
+    invalidate_recommendations(None, *follower_ids)
+    return image_ids
@@ -0,0 +1,149 @@
+from sqlalchemy import insert, select
+from models.interaction import Interaction
+from models.image import Image
+from models.user import User
+from services.interaction_service import INTERACTION_WEIGHTS, DEFAULT_INTERACTION_WEIGHT
+from services.popularity_service import record_interactions
+from services.recommendation_cache import invalidate_recommendations
+import datetime
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+INTERACTION_BUFFER_ENABLED = os.getenv("INTERACTION_BUFFER_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+# Interaction types accepted into the buffer, everything else is written immediately
+BUFFERED_INTERACTION_TYPES = frozenset(
+    t.strip() for t in os.getenv("BUFFERED_INTERACTION_TYPES", "view").split(",") if t.strip()
+)
+INTERACTION_BUFFER_MAX_SIZE = int(os.getenv("INTERACTION_BUFFER_MAX_SIZE", 500))  # rows, flush trigger
+INTERACTION_BUFFER_FLUSH_INTERVAL = float(os.getenv("INTERACTION_BUFFER_FLUSH_INTERVAL", 2.0))  # seconds
+# Repeated events for the same user/image/type within this window are dropped
+INTERACTION_COALESCE_WINDOW = float(os.getenv("INTERACTION_COALESCE_WINDOW", 300))  # seconds
+
+
+class InteractionBuffer:
+    """
+    Write-behind ingestion: interactions are queued in memory, duplicates per
+    (user, image, type) inside the coalescing window are dropped, and a
+    background thread writes them with one bulk INSERT when the queue reaches
+    `max_size` or every `flush_interval` seconds. close() flushes what is left.
+    """
+
+    def __init__(self, session_factory, max_size=INTERACTION_BUFFER_MAX_SIZE,
+                 flush_interval=INTERACTION_BUFFER_FLUSH_INTERVAL, coalesce_window=INTERACTION_COALESCE_WINDOW):
+        self._session_factory = session_factory
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.coalesce_window = datetime.timedelta(seconds=coalesce_window)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._last_seen = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(self, user_id, image_id, interaction_type, timestamp=None):
+        """Queue an interaction; returns False when it was coalesced into an earlier one"""
+        timestamp = timestamp or datetime.datetime.utcnow()
+        key = (user_id, image_id, interaction_type)
+        with self._lock:
+            last_seen = self._last_seen.get(key)
+            if last_seen is not None and timestamp - last_seen < self.coalesce_window:
+                return False
+            self._last_seen[key] = timestamp
+            self._pending.append({
+                "user_id": user_id,
+                "image_id": image_id,
+                "interaction_type": interaction_type,
+                "weight": INTERACTION_WEIGHTS.get(interaction_type, DEFAULT_INTERACTION_WEIGHT),
+                "timestamp": timestamp,
+            })
+            if len(self._pending) >= self.max_size:
+                self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Write everything queued so far; returns the number of inserted rows"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._forget_expired()
+            if not rows:
+                return 0
+
+            try:
+                db = self._session_factory()
+                try:
+                    rows = self._existing_rows(db, rows)
+                    if rows:
+                        db.execute(insert(Interaction), rows)
+                        record_interactions(db, [(row["image_id"], row["weight"], row["timestamp"]) for row in rows])
+                        db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("Flushing %d buffered interactions failed", len(rows))
+                with self._lock:
+                    # Retry with the next flush, but never grow without bound
+                    if len(self._pending) + len(rows) <= self.max_size * 10:
+                        self._pending[:0] = rows
+                return 0
+
+            invalidate_recommendations(*{row["user_id"] for row in rows})
+            return len(rows)
+
+    def _existing_rows(self, db, rows):
+        # One bad id must not fail the whole bulk insert on the foreign keys
+        image_ids = set(db.execute(select(Image.id).where(Image.id.in_({row["image_id"] for row in rows}))).scalars())
+        user_ids = set(db.execute(select(User.id).where(User.id.in_({row["user_id"] for row in rows}))).scalars())
+        return [row for row in rows if row["image_id"] in image_ids and row["user_id"] in user_ids]
+
+    def _forget_expired(self):
+        cutoff = datetime.datetime.utcnow() - self.coalesce_window
+        self._last_seen = {key: seen for key, seen in self._last_seen.items() if seen >= cutoff}
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="interaction-buffer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and flush the remaining interactions"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_interaction_buffer():
+    """Process-wide buffer, or None when INTERACTION_BUFFER_ENABLED is off"""
+    global _buffer
+    if not INTERACTION_BUFFER_ENABLED:
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                from database import get_session_factory
+
+                _buffer = InteractionBuffer(get_session_factory())
+    return _buffer
@@ -1,15 +1,20 @@
+from sqlalchemy import func, and_, select
+from models.image import Image
 from models.interaction import Interaction
+from services.recommendation_cache import invalidate_recommendations
+from services.popularity_service import record_interaction, remove_interaction
+
+INTERACTION_WEIGHTS = {
+    'view': 0.5,
+    'like': 2.0,
+    'save': 3.0,
+    'comment': 4.0
+}
+DEFAULT_INTERACTION_WEIGHT = 1.0
 
 
 def add_interaction(db, user_id: int, image_id: int, interaction_type: str):
-    weights = {
-        'view': 0.5,
-        'like': 2.0,
-        'save': 3.0,
-        'comment': 4.0
-    }    
-    
-    weight = weights.get(interaction_type, 1.0)
+    weight = INTERACTION_WEIGHTS.get(interaction_type, DEFAULT_INTERACTION_WEIGHT)
     
     new_interaction = Interaction(
         user_id=user_id,
@@ -19,18 +24,69 @@ def add_interaction(db, user_id: int, image_id: int, interaction_type: str):
     )
 
     db.add(new_interaction)
+    db.flush()
+    record_interaction(db, image_id, weight, new_interaction.timestamp)
     db.commit()
     db.refresh(new_interaction)
+    invalidate_recommendations(user_id)
     return new_interaction
 
 def get_interactions(db, image_id: int):
     return db.query(Interaction).filter_by(image_id=image_id).all()
 
+def get_interaction_stats(db, image_ids, user_id: int = None):
+    """
+    Counts of likes/comments/saves and the user's liked/saved flags for many images,
+    aggregated in the database with one query. Returns {image_id: stats}, images
+    without any interactions get zeros.
+    """
+    image_ids = list(dict.fromkeys(image_ids))
+    stats = {
+        image_id: {"likes": 0, "comments": 0, "saves": 0, "user_liked": False, "user_saved": False}
+        for image_id in image_ids
+    }
+    if not image_ids:
+        return stats
+
+    # Likes/saves are aggregated from interactions, comments come from the
+    # counter on images maintained by comment_service
+    columns = [
+        Interaction.image_id.label('image_id'),
+        func.count().filter(Interaction.interaction_type == 'like').label('likes'),
+        func.count().filter(Interaction.interaction_type == 'save').label('saves'),
+    ]
+    if user_id:
+        columns += [
+            func.bool_or(and_(Interaction.user_id == user_id, Interaction.interaction_type == 'like')).label('user_liked'),
+            func.bool_or(and_(Interaction.user_id == user_id, Interaction.interaction_type == 'save')).label('user_saved'),
+        ]
+    aggregated = select(*columns)\
+        .where(Interaction.image_id.in_(image_ids))\
+        .where(Interaction.interaction_type.in_(['like', 'save']))\
+        .group_by(Interaction.image_id)\
+        .subquery()
+
+    rows = db.execute(
+        select(Image.id, Image.comment_count, aggregated)
+        .outerjoin(aggregated, aggregated.c.image_id == Image.id)
+        .where(Image.id.in_(image_ids))
+    ).mappings()
+
+    for row in rows:
+        image_stats = stats[row["id"]]
+        image_stats["comments"] = row["comment_count"]
+        image_stats["likes"], image_stats["saves"] = row["likes"] or 0, row["saves"] or 0
+        if user_id:
+            image_stats["user_liked"], image_stats["user_saved"] = bool(row["user_liked"]), bool(row["user_saved"])
+    return stats
+
 ## tu chyba chujowe podejscie 
 def delete_interaction(db, user_id: int, image_id: int, interaction_type: str):
     interaction = db.query(Interaction).filter_by(user_id=user_id, image_id=image_id, interaction_type=interaction_type).first()
     if interaction:
         db.delete(interaction)
+        remove_interaction(db, image_id, interaction.weight or 0.0, interaction.timestamp)
         db.commit()
+        invalidate_recommendations(user_id)
         return True
     return False
\ No newline at end of file
@@ -0,0 +1,35 @@
+import base64
+import json
+
+
+def encode_cursor(**values):
+    """Opaque next-page cursor, e.g. encode_cursor(id=42) or encode_cursor(s=7.5, id=42)"""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _has_type(value, expected):
+    if isinstance(value, bool):
+        return expected is bool
+    if expected is float:
+        # JSON writes whole scores as integers
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor, **fields):
+    """
+    Decode a cursor made by encode_cursor and return the values of `fields`
+    (name=expected type, e.g. s=float, id=int) in order. Raises ValueError for
+    anything that is not a cursor with those fields and types - the values go
+    straight into keyset filters.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        decoded = tuple(values[key] for key in fields)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not all(_has_type(value, expected) for value, expected in zip(decoded, fields.values())):
+        raise ValueError("Invalid cursor")
+    return decoded
@@ -0,0 +1,71 @@
+"""
+Password hashing off the event loop.
+
+bcrypt is deliberately slow (~0.25 s at cost 12), so async routes must not call
+it directly: the *_async helpers run it in a dedicated, bounded thread pool
+(bcrypt releases the GIL while hashing), which also caps how many CPU cores a
+login burst can take away from the rest of the API.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", 12))  # bcrypt cost factor
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, min(4, (os.cpu_count() or 1) // 2))))
+
+# Created on first use and again after shutdown(), so a process that runs the
+# app's lifespan more than once (test clients, in-process reloads) keeps working
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _executor
+
+
+def hash_password(password):
+    password_bytes = password.encode('utf-8')
+    salt = bcrypt.gensalt(rounds=PASSWORD_HASH_ROUNDS)
+    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+
+
+def verify_password(password, password_hash):
+    if not password_hash:
+        return False
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def needs_rehash(password_hash):
+    """True when the hash was made with a different cost factor than PASSWORD_HASH_ROUNDS"""
+    try:
+        return int(password_hash.split('$')[2]) != PASSWORD_HASH_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return True
+
+
+async def hash_password_async(password):
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), hash_password, password)
+
+
+async def verify_password_async(password, password_hash):
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), verify_password, password, password_hash)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
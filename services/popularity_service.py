@@ -0,0 +1,115 @@
+from sqlalchemy import func, desc, select, delete, literal
+from sqlalchemy.dialects.postgresql import insert
+from models.image_popularity import ImagePopularity
+from models.interaction import Interaction
+import datetime
+import os
+
+# Decayed popularity: every interaction adds weight * 2^(age / half-life) to the
+# image's counter. The boost is computed from the interaction's hour bucket
+# relative to a fixed epoch, so stored scores never need to be rewritten and
+# ORDER BY score is the same order as by the decayed value at any moment.
+# 2^(hours / 72) stays within float range for ~8 years after the epoch -
+# move POPULARITY_EPOCH forward and run scripts/rebuild_popularity.py before that.
+POPULARITY_HALF_LIFE_HOURS = float(os.getenv("POPULARITY_HALF_LIFE_HOURS", 72))
+POPULARITY_EPOCH = datetime.datetime.fromisoformat(os.getenv("POPULARITY_EPOCH", "2025-01-01"))
+
+
+def _hours_since_epoch(timestamp):
+    return (timestamp - POPULARITY_EPOCH).total_seconds() / 3600.0
+
+
+def decay_boost(timestamp):
+    """Multiplier for an interaction that happened at `timestamp` (hour buckets)"""
+    return 2.0 ** (int(_hours_since_epoch(timestamp)) / POPULARITY_HALF_LIFE_HOURS)
+
+
+def current_decay(now=None):
+    """Converts a stored score into its decayed value as of `now`"""
+    now = now or datetime.datetime.utcnow()
+    return 2.0 ** (-_hours_since_epoch(now) / POPULARITY_HALF_LIFE_HOURS)
+
+
+def record_interactions(session, interactions):
+    """
+    Add interactions to the counters: an iterable of (image_id, weight, timestamp).
+    Runs in the caller's transaction (no commit), one upsert per call.
+    """
+    rows = {}
+    for image_id, weight, timestamp in interactions:
+        row = rows.setdefault(image_id, {
+            "image_id": image_id,
+            "score": 0.0,
+            "weight_total": 0.0,
+            "interaction_count": 0,
+            "last_interaction_at": timestamp,
+        })
+        row["score"] += weight * decay_boost(timestamp)
+        row["weight_total"] += weight
+        row["interaction_count"] += 1
+        row["last_interaction_at"] = max(row["last_interaction_at"], timestamp)
+    if not rows:
+        return
+
+    stmt = insert(ImagePopularity).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ImagePopularity.image_id],
+        set_={
+            "score": ImagePopularity.score + stmt.excluded.score,
+            "weight_total": ImagePopularity.weight_total + stmt.excluded.weight_total,
+            "interaction_count": ImagePopularity.interaction_count + stmt.excluded.interaction_count,
+            "last_interaction_at": func.greatest(ImagePopularity.last_interaction_at, stmt.excluded.last_interaction_at),
+        },
+    )
+    session.execute(stmt)
+
+
+def record_interaction(session, image_id, weight, timestamp):
+    record_interactions(session, [(image_id, weight, timestamp)])
+
+
+def remove_interaction(session, image_id, weight, timestamp):
+    """Take back the contribution of a deleted interaction (no commit)"""
+    session.query(ImagePopularity)\
+        .filter(ImagePopularity.image_id == image_id)\
+        .update({
+            ImagePopularity.score: func.greatest(ImagePopularity.score - weight * decay_boost(timestamp), 0.0),
+            ImagePopularity.weight_total: func.greatest(ImagePopularity.weight_total - weight, 0.0),
+            ImagePopularity.interaction_count: func.greatest(ImagePopularity.interaction_count - 1, 0),
+        }, synchronize_session=False)
+
+
+def delete_image_popularity(session, image_id):
+    session.execute(delete(ImagePopularity).where(ImagePopularity.image_id == image_id))
+
+
+def get_popular_image_scores(session, limit, excluded_ids=None):
+    """Top images by decayed popularity: [(image_id, current decayed score)], an index scan on score"""
+    query = select(ImagePopularity.image_id, ImagePopularity.score)\
+        .where(ImagePopularity.score > 0)\
+        .order_by(desc(ImagePopularity.score), desc(ImagePopularity.image_id))\
+        .limit(limit)
+    if excluded_ids:
+        query = query.where(ImagePopularity.image_id.notin_(excluded_ids))
+    decay = current_decay()
+    return [(image_id, score * decay) for image_id, score in session.execute(query)]
+
+
+def rebuild_popularity(session):
+    """Recompute all counters from the interactions table (backfill / epoch change)"""
+    hours = func.floor(func.extract('epoch', Interaction.timestamp - literal(POPULARITY_EPOCH)) / 3600.0)
+    aggregated = select(
+        Interaction.image_id,
+        func.sum(Interaction.weight * func.power(2.0, hours / POPULARITY_HALF_LIFE_HOURS)),
+        func.sum(Interaction.weight),
+        func.count(Interaction.id),
+        func.max(Interaction.timestamp),
+    ).where(Interaction.image_id.isnot(None), Interaction.weight.isnot(None))\
+        .group_by(Interaction.image_id)
+
+    session.execute(delete(ImagePopularity))
+    session.execute(insert(ImagePopularity).from_select(
+        ["image_id", "score", "weight_total", "interaction_count", "last_interaction_at"],
+        aggregated,
+    ))
+    session.commit()
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+
+from cachetools import TTLCache
+
+# memory = per-process LRU/TTL cache, redis = shared between workers (needs REDIS_URL)
+RECOMMENDATION_CACHE_BACKEND = os.getenv("RECOMMENDATION_CACHE_BACKEND", "memory").lower()
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 10000))  # users
+RECOMMENDATION_CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", 300))  # seconds
+# How many ranked candidates are kept per user - the feed is paginated out of this
+# list, which grows when a page reaches its end
+RECOMMENDATION_CANDIDATES = int(os.getenv("RECOMMENDATION_CANDIDATES", 200))
+
+# Cache key for users that are not logged in
+ANONYMOUS_KEY = 0
+
+
+class InProcessRecommendationCache:
+    """
+    Ranked candidate lists per user: {"size": requested size, "complete": ranking
+    covers every candidate, "items": [[image_id, breakdown], ...]}.
+    Least recently used users are evicted first, every entry expires after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize=RECOMMENDATION_CACHE_SIZE, ttl=RECOMMENDATION_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, user_key):
+        with self._lock:
+            return self._cache.get(user_key)
+
+    def set(self, user_key, ranked):
+        with self._lock:
+            self._cache[user_key] = ranked
+
+    def invalidate(self, *user_keys):
+        with self._lock:
+            for user_key in user_keys:
+                self._cache.pop(user_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class RedisRecommendationCache:
+    """Same interface, stored in Redis so all workers share entries and invalidations"""
+
+    def __init__(self, url=None, ttl=RECOMMENDATION_CACHE_TTL, prefix="tatau:recs:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.Redis.from_url(url or os.environ["REDIS_URL"])
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def _key(self, user_key):
+        return f"{self._prefix}{user_key}"
+
+    def get(self, user_key):
+        value = self._redis.get(self._key(user_key))
+        return json.loads(value) if value is not None else None
+
+    def set(self, user_key, ranked):
+        self._redis.set(self._key(user_key), json.dumps(ranked), ex=self._ttl)
+
+    def invalidate(self, *user_keys):
+        if user_keys:
+            self._redis.delete(*[self._key(user_key) for user_key in user_keys])
+
+    def clear(self):
+        for key in self._redis.scan_iter(f"{self._prefix}*"):
+            self._redis.delete(key)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_recommendation_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if RECOMMENDATION_CACHE_BACKEND == "redis":
+                    _cache = RedisRecommendationCache()
+                elif RECOMMENDATION_CACHE_BACKEND == "memory":
+                    _cache = InProcessRecommendationCache()
+                else:
+                    raise ValueError(f"Unknown RECOMMENDATION_CACHE_BACKEND: {RECOMMENDATION_CACHE_BACKEND}")
+    return _cache
+
+
+def invalidate_recommendations(*user_ids):
+    """Drop cached feeds; None/0 stands for the anonymous feed"""
+    get_recommendation_cache().invalidate(*[user_id or ANONYMOUS_KEY for user_id in user_ids])
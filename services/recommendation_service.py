@@ -1,12 +1,23 @@
-from sqlalchemy import func, desc
-from sqlalchemy.orm import Session
+from sqlalchemy import func, desc, select, literal, union_all
+from sqlalchemy.orm import Session, joinedload
 from models.image import Image
-from models.user import User
-from models.tag import Tag
 from models.interaction import Interaction
-import datetime
+from models.image_tag import image_tags
+from models.image_popularity import ImagePopularity
+from services.popularity_service import current_decay, get_popular_image_scores
+from services.user_service import get_followed_ids
+from services.timeline_service import followed_images_query
+from services.recommendation_cache import get_recommendation_cache, ANONYMOUS_KEY, RECOMMENDATION_CANDIDATES
 
-def get_recommendations(session: Session, user_id: int, limit: int = 20):
+# Wagi poszczególnych źródeł kandydatów
+FOLLOWED_SCORE = 10.0
+TAG_SCORE = 5.0
+MAX_POPULARITY_SCORE = 3.0
+MAX_RECENCY_SCORE = 2.0
+
+SCORE_SOURCES = ('followed', 'tags', 'popular', 'recent')
+
+def get_recommendations(session: Session, user_id: int, limit: int = 20, with_scores: bool = False, offset: int = 0, after=None):
     """
     Generuje spersonalizowane rekomendacje dla użytkownika
 
@@ -15,127 +26,229 @@ def get_recommendations(session: Session, user_id: int, limit: int = 20):
     2. Obrazy z tagami, z którymi użytkownik wcześniej wchodził w interakcje
     3. Popularne obrazy w podobnych kategoriach
     4. Nowości w systemie
+
+    Posortowana lista kandydatów (RECOMMENDATION_CANDIDATES pozycji) jest trzymana
+    w cache per użytkownik, kolejne strony (`offset`) są z niej wycinane, a gdy strona
+    sięga za jej koniec, lista jest wydłużana (przewijanie nie ma sztywnego końca).
+    Z bazy pobierane są tylko obrazy z danej strony. Cache jest unieważniany przez
+    add_interaction, add_follow/remove_follow i add_image.
+    Z `with_scores=True` zwraca listę par (obraz, rozbicie punktacji na źródła).
+
+    `after` = (punktacja, id) ostatniego pokazanego obrazu - kursor zastępujący `offset`.
+    """
+    page = get_recommended_page(session, user_id, limit, offset, after)
+    breakdowns = dict((image_id, scores) for image_id, scores in page)
+
+    # Pobierz pełne obiekty obrazów razem z właścicielami jednym zapytaniem
+    images = _load_images(session, [image_id for image_id, _ in page])
+    if with_scores:
+        return [(image, breakdowns[image.id]) for image in images]
+    return images
+
+def get_recommended_page(session: Session, user_id: int, limit: int = 20, offset: int = 0, after=None):
+    """
+    Strona rekomendacji bez ładowania obrazów: [(image_id, rozbicie punktacji)].
+    Dla endpointów, które same pobierają tylko potrzebne kolumny
+    (image_service.get_feed_image_rows).
+    """
+    cache = get_recommendation_cache()
+    cache_key = user_id or ANONYMOUS_KEY
+    ranked = cache.get(cache_key)
+    if ranked is None:
+        ranked = _cache_ranking(session, cache, cache_key, user_id, max(RECOMMENDATION_CANDIDATES, offset + limit))
+
+    position = offset if after is None else _position_after(ranked['items'], *after)
+    # Strona sięga za koniec listy, a ranking nie objął jeszcze wszystkich obrazów - wydłużamy
+    # go (co najmniej dwukrotnie, żeby przewijanie nie przeliczało go na każdej stronie)
+    if len(ranked['items']) < position + limit and not ranked.get('complete'):
+        ranked = _cache_ranking(session, cache, cache_key, user_id, max(position + limit, 2 * ranked['size']), ranked['items'])
+    return [(image_id, scores) for image_id, scores in ranked['items'][position:position + limit]]
+
+def _cache_ranking(session: Session, cache, cache_key, user_id: int, size: int, shown=()):
+    """
+    Liczy ranking `size` kandydatów i zapisuje go w cache. Przy wydłużaniu `shown`
+    (dotychczasowa lista) zostaje bez zmian na początku, a z nowego rankingu dochodzą
+    tylko obrazy, których na niej nie było - kursory wskazują dalej te same pozycje,
+    nic się nie powtarza ani nie przepada
+    """
+    items = _rank_candidates(session, user_id, size)
+    complete = len(items) < size
+    if shown:
+        listed = {image_id for image_id, _ in shown}
+        items = list(shown) + [item for item in items if item[0] not in listed]
+    ranked = {'size': size, 'complete': complete, 'items': items}
+    cache.set(cache_key, ranked)
+    return ranked
+
+def _rank_key(item):
+    """Kolejność listy: malejąco po (punktacja, id) - ta sama, którą porównuje kursor"""
+    image_id, scores = item
+    return scores['total'], image_id
+
+def _position_after(items, score, image_id):
+    """Indeks pierwszego elementu za kursorem (score, image_id) w posortowanej liście"""
+    for position, (candidate_id, scores) in enumerate(items):
+        if candidate_id == image_id:
+            return position + 1
+    # Obrazu nie ma już na liście (np. cache został przeliczony) - szukamy po kluczu
+    # sortowania (punktacja, id), który mają wszyscy kandydaci, także rezerwowi
+    for position, item in enumerate(items):
+        if _rank_key(item) < (score, image_id):
+            return position
+    return len(items)
+
+def _rank_candidates(session: Session, user_id: int, limit: int):
+    """
+    Liczy posortowaną listę [image_id, rozbicie punktacji] - stała liczba zapytań
+    (użytkownik + obserwowani, kandydaci, ewentualnie uzupełnienie), niezależna od `limit`
     """
     if not user_id:
         # Dla niezalogowanych użytkowników - popularne i nowe obrazy
-        return get_popular_recent_images(session, limit)
-    
-    # Znajdź użytkownika
-    user = session.query(User).filter(User.id == user_id).first()
-    if not user:
-        return get_popular_recent_images(session, limit)
-
-    # Wyniki będziemy zbierać w słowniku {image_id: score}
-    image_scores = {}
-    
-    # 1. Obrazy od obserwowanych artystów (najwyższy priorytet)
-    followed_users_images = session.query(Image)\
-        .join(User, User.id == Image.user_id)\
-        .filter(User.id.in_([followed.id for followed in user.following]))\
-        .order_by(desc(Image.id))\
-        .limit(limit * 2)\
-        .all()
+        return _popular_recent_candidates(session, limit)
 
-    # Przypisz wysokie wagi obrazom od obserwowanych
-    for img in followed_users_images:
-        image_scores[img.id] = image_scores.get(img.id, 0) + 10.0
-    
-    # 2. Znajdź tagi, z którymi użytkownik wchodził w interakcje
-    user_interaction_tags = session.query(Tag)\
-        .join(Image.tags)\
-        .join(Interaction, Interaction.image_id == Image.id)\
-        .filter(Interaction.user_id == user_id)\
-        .group_by(Tag.id)\
-        .order_by(desc(func.count(Interaction.id)))\
-        .limit(10)\
-        .all()
-        
-    # Znajdź obrazy z tymi tagami
-    if user_interaction_tags:
-        tag_based_images = session.query(Image)\
-            .join(Image.tags)\
-            .filter(Tag.id.in_([tag.id for tag in user_interaction_tags]))\
-            .filter(Image.id.notin_(image_scores.keys()))\
-            .limit(limit)\
-            .all()
-            
-        # Przypisz wagi na podstawie podobieństwa tagów
-        for img in tag_based_images:
-            image_scores[img.id] = image_scores.get(img.id, 0) + 5.0
-    
-    # 3. Uwzględnij popularność i świeżość - dla wszystkich obrazów
-    # Te dwa parametry będą miały niższe wagi, jeśli już przypisaliśmy wagi powyżej
-    now = datetime.datetime.now()
-    one_week_ago = now - datetime.timedelta(days=7)
-    
-    # Popularne ostatnio obrazy
-    popular_images = session.query(Image, func.count(Interaction.id).label('interactions_count'))\
-        .outerjoin(Interaction)\
-        .filter(Interaction.timestamp > one_week_ago)\
-        .group_by(Image.id)\
-        .order_by(desc('interactions_count'))\
-        .limit(limit)\
-        .all()
+    # Obserwowani z cache (None = użytkownik nie istnieje)
+    followed_ids = get_followed_ids(session, user_id)
+    if followed_ids is None:
+        return _popular_recent_candidates(session, limit)
+    followed_ids = list(followed_ids)
 
-    # Przypisz wagi na podstawie popularności
-    for img, count in popular_images:
-        # Maksymalna waga 3.0 dla najpopularniejszych
-        popularity_score = min(3.0, count / 10.0)
-        image_scores[img.id] = image_scores.get(img.id, 0) + popularity_score
-    
-    # 4. Najnowsze obrazy (priorytet dla świeżości)
-    # Brak created_at w modelu Image — jako proxy świeżości używamy malejącego ID
-    recent_images = session.query(Image)\
-        .order_by(desc(Image.id))\
-        .limit(limit)\
-        .all()
+    # Wyniki będziemy zbierać w słowniku {image_id: {źródło: punkty}}
+    breakdowns = {}
+    decay = current_decay()
+    for image_id, source, value in session.execute(_candidates_query(session, user_id, followed_ids, limit)):
+        scores = breakdowns.setdefault(image_id, dict.fromkeys(SCORE_SOURCES, 0.0))
+        if source == 'followed':
+            # 1. Wysokie wagi dla obrazów od obserwowanych
+            scores['followed'] = FOLLOWED_SCORE
+        elif source == 'tags':
+            # 2. Wagi na podstawie podobieństwa tagów
+            scores['tags'] = TAG_SCORE
+        elif source == 'popular':
+            # 3. Maksymalna waga 3.0 dla najpopularniejszych (wygaszona w czasie suma wag interakcji)
+            scores['popular'] = min(MAX_POPULARITY_SCORE, value * decay / 10.0)
+        elif source == 'recent':
+            # 4. Waga za świeżość bazująca na pozycji (ID jako przybliżenie kolejności dodania)
+            scores['recent'] = max(0.0, MAX_RECENCY_SCORE - value * 0.1)
+
+    for scores in breakdowns.values():
+        scores['total'] = sum(scores[source] for source in SCORE_SOURCES)
+
+    # Sortuj według końcowych wag (przy remisie nowsze pierwsze)
+    ranked = sorted(breakdowns.items(), key=_rank_key, reverse=True)[:limit]
 
-    # Waga za świeżość bazująca na pozycji (ID jako przybliżenie kolejności dodania)
-    for rank, img in enumerate(recent_images):
-        recency_score = max(0.0, 2.0 - rank * 0.1)
-        image_scores[img.id] = image_scores.get(img.id, 0) + recency_score
-    
-    # Sortuj obrazy według ich końcowych wag i pobierz pełne obiekty
-    sorted_image_ids = sorted(image_scores.keys(), key=lambda x: image_scores[x], reverse=True)
-    
-    # Pobierz pełne obiekty obrazów
-    recommended_images = []
-    for image_id in sorted_image_ids[:limit]:
-        image = session.query(Image).filter(Image.id == image_id).first()
-        if image:
-            recommended_images.append(image)
-    
     # Jeśli mamy za mało rekomendacji, uzupełnij popularnymi obrazami
-    if len(recommended_images) < limit:
-        fallback_limit = limit - len(recommended_images)
-        fallback_images = get_popular_recent_images(
-            session, 
-            fallback_limit, 
-            [img.id for img in recommended_images]
+    if len(ranked) < limit:
+        ranked.extend(_popular_recent_candidates(session, limit - len(ranked), list(breakdowns)))
+        ranked.sort(key=_rank_key, reverse=True)
+
+    return [[image_id, scores] for image_id, scores in ranked]
+
+def _candidates_query(session: Session, user_id: int, followed_ids, limit: int):
+    """
+    Wszystkie źródła kandydatów jako jedno zapytanie UNION ALL
+    zwracające wiersze (image_id, źródło, wartość). Każde źródło jest uporządkowane,
+    więc większy `limit` tylko dokłada kandydatów
+    """
+    branches = []
+
+    # 1. Obrazy od obserwowanych artystów (najwyższy priorytet) - z timeline'u
+    # użytkownika wypełnianego przy dodawaniu obrazu (timeline_service)
+    if followed_ids:
+        followed_images = followed_images_query(session, user_id, followed_ids, limit * 2).subquery()
+        branches.append(
+            select(followed_images.c.image_id.label('image_id'), literal('followed').label('source'), literal(0).label('value'))
         )
-        recommended_images.extend(fallback_images)
-    
-    return recommended_images
 
-def get_popular_recent_images(session: Session, limit: int, excluded_ids=None):
+    # 2. Tagi, z którymi użytkownik wchodził w interakcje, i obrazy z tymi tagami
+    user_interaction_tags = select(image_tags.c.tag_id)\
+        .join(Interaction, Interaction.image_id == image_tags.c.image_id)\
+        .where(Interaction.user_id == user_id)\
+        .group_by(image_tags.c.tag_id)\
+        .order_by(desc(func.count(Interaction.id)))\
+        .limit(10)\
+        .scalar_subquery()
+
+    tag_based = select(image_tags.c.image_id.label('image_id'), literal('tags').label('source'), literal(0).label('value'))\
+        .where(image_tags.c.tag_id.in_(user_interaction_tags))\
+        .group_by(image_tags.c.image_id)\
+        .order_by(desc(image_tags.c.image_id))\
+        .limit(limit)
+    if followed_ids:
+        tag_based = tag_based.where(
+            image_tags.c.image_id.notin_(select(Image.id).where(Image.user_id.in_(followed_ids)))
+        )
+    branches.append(tag_based)
+
+    # 3. Popularne ostatnio obrazy - licznik utrzymywany przez popularity_service (odczyt z indeksu)
+    branches.append(
+        select(ImagePopularity.image_id.label('image_id'), literal('popular').label('source'), ImagePopularity.score.label('value'))
+        .where(ImagePopularity.score > 0)
+        .order_by(desc(ImagePopularity.score))
+        .limit(limit)
+    )
+
+    # 4. Najnowsze obrazy - brak created_at w modelu Image, jako proxy świeżości używamy malejącego ID
+    branches.append(
+        select(Image.id.label('image_id'), literal('recent').label('source'), (func.row_number().over(order_by=desc(Image.id)) - 1).label('value'))
+        .order_by(desc(Image.id))
+        .limit(limit)
+    )
+
+    return union_all(*[branch.subquery().select() for branch in branches])
+
+def _load_images(session: Session, image_ids):
+    """Pobiera obrazy (z właścicielami) jednym zapytaniem, zachowując kolejność `image_ids`"""
+    if not image_ids:
+        return []
+    images = session.query(Image)\
+        .options(joinedload(Image.owner))\
+        .filter(Image.id.in_(image_ids))\
+        .all()
+    by_id = {image.id: image for image in images}
+    return [by_id[image_id] for image_id in image_ids if image_id in by_id]
+
+def get_popular_recent_images(session: Session, limit: int, excluded_ids=None, with_scores: bool = False):
     """
     Pobiera popularne i nowe obrazy - dla niezalogowanych użytkowników
     lub jako uzupełnienie dla użytkowników z małą ilością interakcji
     """
-    if excluded_ids is None:
-        excluded_ids = []
-        
-    # Łączymy popularność z świeżością
-    now = datetime.datetime.utcnow()
-    one_month_ago = now - datetime.timedelta(days=30)
-    
-    popular_recent = session.query(Image, func.count(Interaction.id).label('interaction_count'))\
-        .outerjoin(Interaction)\
-        .filter(Image.id.notin_(excluded_ids))\
-        .group_by(Image.id)\
-        .order_by(desc('interaction_count'), desc(Image.id))\
-        .limit(limit)\
-        .all()
-    
-    # Wyciągnij samo obrazy z wyników
-    return [item[0] for item in popular_recent]
\ No newline at end of file
+    candidates = _popular_recent_candidates(session, limit, excluded_ids)
+    breakdowns = dict((image_id, scores) for image_id, scores in candidates)
+
+    # Pobierz same obrazy (z właścicielami) jednym zapytaniem
+    images = _load_images(session, [image_id for image_id, _ in candidates])
+    if with_scores:
+        return [(image, breakdowns[image.id]) for image in images]
+    return images
+
+def _popular_recent_candidates(session: Session, limit: int, excluded_ids=None):
+    """
+    Kandydaci bez personalizacji, punktowani jak w _rank_candidates (popularność),
+    więc lista jest posortowana po (punktacja, id) jak każda inna i kursor działa
+    także na niej
+    """
+    excluded_ids = list(excluded_ids or [])
+
+    # Łączymy popularność z świeżością - najpierw najpopularniejsze...
+    popular = get_popular_image_scores(session, limit, excluded_ids)
+    candidates = [[image_id, _fallback_scores(popular=min(MAX_POPULARITY_SCORE, score / 10.0))] for image_id, score in popular]
+
+    # ...a jeśli ich brakuje, uzupełniamy najnowszymi (bez punktów, więc za popularnymi i malejąco po id)
+    if len(candidates) < limit:
+        recent_ids = session.query(Image.id)\
+            .filter(Image.id.notin_(excluded_ids + [image_id for image_id, _ in popular]))\
+            .order_by(desc(Image.id))\
+            .limit(limit - len(candidates))\
+            .all()
+        candidates.extend([image_id, _fallback_scores()] for image_id, in recent_ids)
+
+    # Ograniczenie punktów popularności wyrównuje najpopularniejsze - remis rozstrzyga id
+    candidates.sort(key=_rank_key, reverse=True)
+    return candidates
+
+def _fallback_scores(popular=0.0):
+    scores = dict.fromkeys(SCORE_SOURCES, 0.0)
+    scores['popular'] = popular
+    scores['total'] = popular
+    scores['fallback'] = True
+    return scores
@@ -0,0 +1,110 @@
+from sqlalchemy import func, desc, select, or_, and_, literal, cast, union, Float
+from sqlalchemy.orm import Session, joinedload
+from models.image import Image
+from models.tag import Tag
+from models.image_tag import image_tags
+import re
+
+# Must match the expression of the ix_images_description_fts index
+_DESCRIPTION_TSVECTOR = func.to_tsvector('simple', func.coalesce(Image.description, ''))
+
+# Terms shorter than this have no trigrams to match on, they only use prefix matching
+MIN_FUZZY_TERM_LENGTH = 3
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _prefix_tsquery(term):
+    """All words must match, the last one as a prefix (the user may still be typing)"""
+    words = re.findall(r"\w+", term)
+    if not words:
+        return func.plainto_tsquery('simple', term)
+    return func.to_tsquery('simple', ' & '.join(words[:-1] + [f"{words[-1]}:*"]))
+
+
+def search_images(session: Session, search_term: str, limit: int = 20, offset: int = 0, after=None):
+    """
+    Same as search_image_ids, returning [(image, rank)] with the owners loaded
+    """
+    page = search_image_ids(session, search_term, limit, offset, after)
+    if not page:
+        return []
+
+    images = session.query(Image)\
+        .options(joinedload(Image.owner))\
+        .filter(Image.id.in_([image_id for image_id, _ in page]))\
+        .all()
+    by_id = {image.id: image for image in images}
+    return [(by_id[image_id], image_rank) for image_id, image_rank in page if image_id in by_id]
+
+
+def search_image_ids(session: Session, search_term: str, limit: int = 20, offset: int = 0, after=None):
+    """
+    Relevance-ranked image search over descriptions and tag names, served by the
+    GIN indexes on images.description (tsvector + trigram) and tags.name (trigram).
+
+    An image matches when its description matches the words (full text), contains
+    the term, or is similar to it (trigram word similarity - tolerates typos such
+    as "dragn"), or when one of its tags is similar to or starts with the term.
+    Returns [(image_id, rank)] best first; `after` = (rank, id) of the last result
+    already shown is the keyset cursor replacing `offset`.
+    """
+    term = (search_term or '').strip().lower()
+    if not term:
+        return []
+    fuzzy = len(term) >= MIN_FUZZY_TERM_LENGTH
+    pattern = _escape_like(term)
+    tsquery = _prefix_tsquery(term)
+
+    # Tags matching the term, with the best similarity per image
+    tag_condition = Tag.name.like(f"{pattern}%")
+    if fuzzy:
+        tag_condition = or_(tag_condition, literal(term).op('<%')(Tag.name))
+    tag_matches = select(
+        image_tags.c.image_id.label('image_id'),
+        func.max(func.word_similarity(term, Tag.name)).label('tag_rank')
+    ).join(Tag, Tag.id == image_tags.c.tag_id)\
+        .where(tag_condition)\
+        .group_by(image_tags.c.image_id)\
+        .cte('tag_matches')
+
+    description_conditions = [_DESCRIPTION_TSVECTOR.op('@@')(tsquery)]
+    if fuzzy:
+        description_conditions += [
+            Image.description.ilike(f"%{pattern}%"),
+            literal(term).op('<%')(Image.description),
+        ]
+
+    rank = cast(func.greatest(
+        func.ts_rank(_DESCRIPTION_TSVECTOR, tsquery),
+        func.word_similarity(term, func.coalesce(Image.description, '')),
+        func.coalesce(tag_matches.c.tag_rank, 0),
+    ), Float).label('rank')
+
+    # Matching ids collected per index (a union, not one OR across the outer
+    # join, which could only be answered by scanning every image)
+    matched_ids = union(
+        select(tag_matches.c.image_id),
+        select(Image.id.label('image_id')).where(or_(*description_conditions))
+    ).subquery()
+
+    matches = select(Image.id.label('id'), rank)\
+        .join(matched_ids, matched_ids.c.image_id == Image.id)\
+        .outerjoin(tag_matches, tag_matches.c.image_id == Image.id)\
+        .subquery()
+
+    # Rank is a computed column, so ordering and the cursor filter wrap the match query
+    query = select(matches.c.id, matches.c.rank)
+    if after is not None:
+        last_rank, last_id = after
+        query = query.where(or_(
+            matches.c.rank < last_rank,
+            and_(matches.c.rank == last_rank, matches.c.id < last_id)
+        ))
+    query = query.order_by(desc(matches.c.rank), desc(matches.c.id)).limit(limit)
+    if after is None:
+        query = query.offset(offset)
+
+    return [(image_id, image_rank) for image_id, image_rank in session.execute(query)]
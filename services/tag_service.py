@@ -0,0 +1,95 @@
+from sqlalchemy import select, event
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from cachetools import LRUCache
+from models.tag import Tag
+from models.image_tag import image_tags
+import os
+import threading
+
+TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", 10000))  # tag names
+
+# Tags are never deleted or renamed, so a name -> id entry stays valid forever;
+# the cache is only bounded to keep memory flat with user-generated tag names
+_tag_ids = LRUCache(maxsize=TAG_CACHE_SIZE)
+_tag_ids_lock = threading.Lock()
+
+# Ids inserted by a transaction are cached only once it commits
+_PENDING_TAG_IDS = "pending_tag_ids"
+
+
+def normalize_tag_names(tag_names):
+    """Lower-cased, stripped, without empty names and duplicates, in the original order"""
+    names = []
+    for tag_name in tag_names or []:
+        tag_name = tag_name.strip().lower()
+        if tag_name and tag_name not in names:
+            names.append(tag_name)
+    return names
+
+
+def resolve_tag_ids(session, tag_names):
+    """
+    Ids of the given tags, creating the missing ones: {name: id} for the
+    normalized names. Cached names cost nothing, the rest one upsert
+    (INSERT ... ON CONFLICT DO NOTHING RETURNING) plus one SELECT for names that
+    already existed - also safe when concurrent uploads create the same tag.
+    """
+    names = normalize_tag_names(tag_names)
+    with _tag_ids_lock:
+        resolved = {name: _tag_ids[name] for name in names if name in _tag_ids}
+    missing = [name for name in names if name not in resolved]
+    if not missing:
+        return resolved
+
+    inserted = dict((name, tag_id) for tag_id, name in session.execute(
+        insert(Tag)
+        .values([{"name": name} for name in missing])
+        .on_conflict_do_nothing(index_elements=[Tag.name])
+        .returning(Tag.id, Tag.name)
+    ))
+    existing = [name for name in missing if name not in inserted]
+    found = {}
+    if existing:
+        found = dict((name, tag_id) for tag_id, name in session.execute(
+            select(Tag.id, Tag.name).where(Tag.name.in_(existing))
+        ))
+
+    with _tag_ids_lock:
+        _tag_ids.update(found)
+    session.info.setdefault(_PENDING_TAG_IDS, {}).update(inserted)
+
+    resolved.update(inserted)
+    resolved.update(found)
+    return resolved
+
+
+def set_image_tags(session, image_id, tag_names, replace=False):
+    """Link an image to its tags with one bulk INSERT (no commit); `replace` drops the old links first"""
+    tag_ids = resolve_tag_ids(session, tag_names)
+    if replace:
+        session.execute(image_tags.delete().where(image_tags.c.image_id == image_id))
+    if tag_ids:
+        session.execute(
+            insert(image_tags).on_conflict_do_nothing(),
+            [{"image_id": image_id, "tag_id": tag_id} for tag_id in tag_ids.values()]
+        )
+    return tag_ids
+
+
+def clear_tag_cache():
+    with _tag_ids_lock:
+        _tag_ids.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_tag_ids(session):
+    pending = session.info.pop(_PENDING_TAG_IDS, None)
+    if pending:
+        with _tag_ids_lock:
+            _tag_ids.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_tag_ids(session):
+    session.info.pop(_PENDING_TAG_IDS, None)
@@ -0,0 +1,177 @@
+from sqlalchemy import func, desc, select, delete, literal, text
+from sqlalchemy.dialects.postgresql import insert
+from cachetools import TTLCache
+from models.home_timeline import HomeTimelineEntry
+from models.image import Image
+from models.follow import follows
+import os
+import threading
+
+# Home timelines: an upload is pushed into every follower's timeline when it is
+# committed, so reading the followed-artists part of the feed is one bounded
+# index range scan instead of a join over everything the followed users posted.
+# Accounts with more than FANOUT_MAX_FOLLOWERS followers are not pushed (one upload
+# would write that many rows) - their followers pull those images on read.
+TIMELINE_MAX_LENGTH = int(os.getenv("TIMELINE_MAX_LENGTH", 400))  # entries per user
+FANOUT_MAX_FOLLOWERS = int(os.getenv("FANOUT_MAX_FOLLOWERS", 5000))
+HIGH_FANOUT_AUTHORS_TTL = int(os.getenv("HIGH_FANOUT_AUTHORS_TTL", 600))  # seconds
+
+_high_fanout_authors = TTLCache(maxsize=1, ttl=HIGH_FANOUT_AUTHORS_TTL)
+_high_fanout_lock = threading.Lock()
+
+# Drops every entry after the TIMELINE_MAX_LENGTH newest of each affected
+# timeline; the LATERAL subquery walks at most that many index entries per user
+_TRIM_TIMELINES = text("""
+    DELETE FROM home_timeline t
+    USING (
+        SELECT users.user_id, cut.image_id
+        FROM unnest(CAST(:user_ids AS integer[])) AS users(user_id)
+        CROSS JOIN LATERAL (
+            SELECT image_id FROM home_timeline
+            WHERE home_timeline.user_id = users.user_id
+            ORDER BY image_id DESC
+            OFFSET :max_length LIMIT 1
+        ) cut
+    ) oldest_kept
+    WHERE t.user_id = oldest_kept.user_id AND t.image_id <= oldest_kept.image_id
+""")
+
+
+def get_high_fanout_authors(session):
+    """Ids of the users with more than FANOUT_MAX_FOLLOWERS followers (cached)"""
+    with _high_fanout_lock:
+        authors = _high_fanout_authors.get("authors")
+    if authors is None:
+        authors = frozenset(session.execute(
+            select(follows.c.followed_id)
+            .group_by(follows.c.followed_id)
+            .having(func.count() > FANOUT_MAX_FOLLOWERS)
+        ).scalars())
+        with _high_fanout_lock:
+            _high_fanout_authors["authors"] = authors
+    return authors
+
+
+def _is_high_fanout(session, author_id):
+    # Counts at most FANOUT_MAX_FOLLOWERS + 1 rows of the followed_id index
+    capped = select(literal(1)).where(follows.c.followed_id == author_id).limit(FANOUT_MAX_FOLLOWERS + 1).subquery()
+    return session.execute(select(func.count()).select_from(capped)).scalar() > FANOUT_MAX_FOLLOWERS
+
+
+def _trim(session, user_ids):
+    if user_ids:
+        session.execute(_TRIM_TIMELINES, {"user_ids": list(user_ids), "max_length": TIMELINE_MAX_LENGTH})
+
+
+def fan_out_images(session, author_id, image_ids):
+    """
+    Push new images into the followers' timelines (no commit). Returns the
+    follower ids that received them - empty for high-fanout authors, whose
+    followers pull the images on read instead.
+    """
+    if not image_ids:
+        return []
+    if _is_high_fanout(session, author_id):
+        # Make followers start pulling right away, not after the cached set expires
+        with _high_fanout_lock:
+            authors = _high_fanout_authors.get("authors")
+            if authors is not None:
+                _high_fanout_authors["authors"] = authors | {author_id}
+        return []
+
+    follower_ids = session.execute(
+        insert(HomeTimelineEntry)
+        .from_select(
+            ["user_id", "image_id", "author_id"],
+            select(follows.c.follower_id, Image.id, Image.user_id)
+            .join(Image, Image.user_id == follows.c.followed_id)
+            .where(follows.c.followed_id == author_id, Image.id.in_(image_ids))
+        )
+        .on_conflict_do_nothing()
+        .returning(HomeTimelineEntry.user_id)
+    ).scalars().all()
+    follower_ids = sorted(set(follower_ids))
+    _trim(session, follower_ids)
+    return follower_ids
+
+
+def fan_out_image(session, image_id, author_id):
+    return fan_out_images(session, author_id, [image_id])
+
+
+def backfill_timeline(session, user_id, author_id):
+    """After a follow: copy the author's newest images into the user's timeline (no commit)"""
+    session.execute(
+        insert(HomeTimelineEntry)
+        .from_select(
+            ["user_id", "image_id", "author_id"],
+            select(literal(user_id), Image.id, Image.user_id)
+            .where(Image.user_id == author_id)
+            .order_by(desc(Image.id))
+            .limit(TIMELINE_MAX_LENGTH)
+        )
+        .on_conflict_do_nothing()
+    )
+    _trim(session, [user_id])
+
+
+def remove_author_from_timeline(session, user_id, author_id):
+    """After an unfollow (no commit)"""
+    session.execute(
+        delete(HomeTimelineEntry)
+        .where(HomeTimelineEntry.user_id == user_id, HomeTimelineEntry.author_id == author_id)
+    )
+
+
+def delete_image_from_timelines(session, image_id):
+    session.execute(delete(HomeTimelineEntry).where(HomeTimelineEntry.image_id == image_id))
+
+
+def delete_user_timelines(session, user_id):
+    """The user's own timeline and their images in other timelines (no commit)"""
+    session.execute(
+        delete(HomeTimelineEntry)
+        .where((HomeTimelineEntry.user_id == user_id) | (HomeTimelineEntry.author_id == user_id))
+    )
+
+
+def rebuild_timelines(session):
+    """Recompute every timeline from follows and images (backfill after deploying)"""
+    ranked = select(
+        follows.c.follower_id.label("user_id"),
+        Image.id.label("image_id"),
+        Image.user_id.label("author_id"),
+        func.row_number().over(partition_by=follows.c.follower_id, order_by=desc(Image.id)).label("position"),
+    ).join(Image, Image.user_id == follows.c.followed_id)\
+        .where(follows.c.followed_id.notin_(get_high_fanout_authors(session)))\
+        .subquery()
+
+    session.execute(delete(HomeTimelineEntry))
+    session.execute(insert(HomeTimelineEntry).from_select(
+        ["user_id", "image_id", "author_id"],
+        select(ranked.c.user_id, ranked.c.image_id, ranked.c.author_id)
+        .where(ranked.c.position <= TIMELINE_MAX_LENGTH)
+    ))
+    session.commit()
+
+
+def followed_images_query(session, user_id, followed_ids, limit):
+    """
+    Newest images of the followed artists as a select of image ids: the user's
+    timeline, plus a pull of the followed high-fanout authors' uploads
+    """
+    timeline = select(HomeTimelineEntry.image_id.label("image_id"))\
+        .where(HomeTimelineEntry.user_id == user_id)\
+        .order_by(desc(HomeTimelineEntry.image_id))\
+        .limit(limit)
+    high_fanout_authors = get_high_fanout_authors(session)
+    pulled_ids = [author_id for author_id in followed_ids if author_id in high_fanout_authors]
+    if not pulled_ids:
+        return timeline
+
+    pulled = select(Image.id.label("image_id"))\
+        .where(Image.user_id.in_(pulled_ids))\
+        .order_by(desc(Image.id))\
+        .limit(limit)
+    merged = timeline.union(pulled).subquery()
+    return select(merged.c.image_id).order_by(desc(merged.c.image_id)).limit(limit)
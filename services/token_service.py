@@ -0,0 +1,95 @@
+"""
+Stateless session tokens: `<payload>.<signature>`, both base64url, where the
+payload is JSON {"uid", "typ", "name", "exp"} and the signature its HMAC-SHA256
+under SESSION_TOKEN_SECRET. Verifying needs no database access; verified
+tokens are additionally cached so repeat requests skip the HMAC and JSON work.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", 7 * 24 * 3600))  # seconds
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))  # tokens
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))  # seconds
+
+# "development" lets the API run without SESSION_TOKEN_SECRET
+APP_ENV = os.getenv("APP_ENV", "production").lower()
+
+_secret = os.getenv("SESSION_TOKEN_SECRET")
+if not _secret and APP_ENV == "development":
+    # Tokens then stop working on restart and are not shared between workers
+    logger.warning("SESSION_TOKEN_SECRET is not set, using a random per-process secret")
+    _secret = secrets.token_urlsafe(32)
+_SECRET = _secret.encode("utf-8") if _secret else None
+
+_verified = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+_verified_lock = threading.Lock()
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def check_secret():
+    """
+    Raises RuntimeError when no signing secret is configured. Called at API startup:
+    a random per-process secret would invalidate every issued token on each
+    restart and between workers, so it is only used with APP_ENV=development.
+    """
+    if _SECRET is None:
+        raise RuntimeError("SESSION_TOKEN_SECRET must be set (or APP_ENV=development for a random per-process secret)")
+
+
+def _sign(payload):
+    check_secret()
+    return _b64encode(hmac.new(_SECRET, payload.encode("utf-8"), hashlib.sha256).digest())
+
+
+def issue_token(user_id, user_type, username=None, ttl=None):
+    """Returns (token, expiry as a unix timestamp)"""
+    expires_at = int(time.time()) + (ttl or SESSION_TOKEN_TTL)
+    claims = {"uid": user_id, "typ": user_type, "name": username, "exp": expires_at}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}", expires_at
+
+
+def verify_token(token):
+    """
+    Claims {"user_id", "user_type", "username", "expires_at"} of a valid token;
+    raises ValueError for malformed, forged or expired tokens
+    """
+    with _verified_lock:
+        claims = _verified.get(token)
+    if claims is None:
+        try:
+            payload, signature = token.split(".")
+        except (AttributeError, ValueError):
+            raise ValueError("Malformed token")
+        # As bytes: compare_digest rejects str with non-ASCII characters (TypeError)
+        if not hmac.compare_digest(signature.encode("utf-8"), _sign(payload).encode("ascii")):
+            raise ValueError("Invalid token signature")
+        try:
+            data = json.loads(_b64decode(payload))
+            claims = {"user_id": int(data["uid"]), "user_type": data.get("typ"), "username": data.get("name"), "expires_at": int(data["exp"])}
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Malformed token")
+        with _verified_lock:
+            _verified[token] = claims
+
+    if claims["expires_at"] <= time.time():
+        raise ValueError("Token expired")
+    return claims
@@ -1,9 +1,17 @@
-import bcrypt
+import os
+import threading
+from cachetools import TTLCache
+from sqlalchemy import func, case, or_, tuple_, select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from models.user import User
+from models.follow import follows
+from services.recommendation_cache import invalidate_recommendations
+from services.timeline_service import backfill_timeline, remove_author_from_timeline, delete_user_timelines
 
-def add_user(session, username, email, password, user_type):
-    hashed_password = set_password(password)
-    new_user = User(username=username, email=email, password_hash=hashed_password, user_type=user_type)
+def add_user(session, username, email, *, password_hash, user_type):
+    """`password_hash` from password_service.hash_password_async - bcrypt never runs in a DB session"""
+    new_user = User(username=username, email=email, password_hash=password_hash, user_type=user_type)
     session.add(new_user)
     session.commit()
     return new_user
@@ -11,8 +19,11 @@ def add_user(session, username, email, password, user_type):
 def delete_user(session, user_id):
     user = session.query(User).filter_by(id=user_id).first()
     if user:
+        delete_user_timelines(session, user_id)
         session.delete(user)
         session.commit()
+        with _followed_ids_lock:
+            _followed_ids.pop(user_id, None)
         return True
     return False
 
@@ -25,81 +36,148 @@ def get_user_by_username(session, username):
 def get_user_by_email(session, email):
     return session.query(User).filter_by(email=email).first()
 
-def update_user(session, user_id, username=None, password=None):
+def update_user(session, user_id, username=None, password_hash=None):
+    """`password_hash` from password_service.hash_password_async"""
     user = session.query(User).filter_by(id=user_id).first()
     if user:
         if username:
             user.username = username
-        if password:
-            user.set_password(password)
+        if password_hash:
+            user.password_hash = password_hash
         session.commit()
         return True
     return False
 
-def set_password(password):
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    password_hash = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
-    return password_hash
+def update_password_hash(session, user_id, password_hash):
+    session.query(User).filter_by(id=user_id).update({User.password_hash: password_hash}, synchronize_session=False)
+    session.commit()
+
+def get_user_for_login(session, username_or_email):
+    """User by username, or by email when no username matches - one query"""
+    return session.query(User)\
+        .filter(or_(User.username == username_or_email, User.email == username_or_email))\
+        .order_by(case((User.username == username_or_email, 0), else_=1))\
+        .first()
+
+# Terms shorter than this only match as a prefix - a substring search for one
+# or two letters would match (and scan) most of the table
+MIN_SUBSTRING_SEARCH_LENGTH = 3
+
+def _user_search_query(session, columns, search_term, limit, after):
+    term = (search_term or '').strip().lower()
+    if not term:
+        return None
+    pattern = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    username = func.lower(User.username)
+    email = func.lower(User.email)
+
+    conditions = [username.like(f"{pattern}%"), email.like(f"{pattern}%")]
+    if len(term) >= MIN_SUBSTRING_SEARCH_LENGTH:
+        conditions.append(username.like(f"%{pattern}%"))
+
+    match_rank = case(
+        (or_(username == term, email == term), 0),
+        (or_(username.like(f"{pattern}%"), email.like(f"{pattern}%")), 1),
+        else_=2
+    )
 
-def check_password(user, password):
-    password_bytes = password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, user.password_hash.encode('utf-8'))
+    query = session.query(*columns, match_rank).filter(or_(*conditions))
+    if after is not None:
+        query = query.filter(tuple_(match_rank, username, User.id) > tuple_(*after))
+    return query.order_by(match_rank, username, User.id).limit(limit)
 
-def authenticate_user(session, username_or_email, password):
+def search_users(session, search_term, limit=20, after=None):
     """
-    Authenticate a user by username/email and password
-    
-    Args:
-        session: SQLAlchemy database session
-        username_or_email: Username or email of the user
-        password: Plain text password
-        
-    Returns:
-        User object if authentication succeeds, None otherwise
+    Ranked user search: exact username/email (0) > username/email prefix (1) >
+    username substring (2), then alphabetically. Returns [(user, match rank)];
+    `after` = (match rank, lower(username), id) of the last user already shown.
+    """
+    query = _user_search_query(session, [User], search_term, limit, after)
+    return query.all() if query is not None else []
+
+def search_user_rows(session, search_term, limit=20, after=None):
+    """search_users projected to the public columns: [({"id", "username", "email", "user_type"}, match rank)]"""
+    query = _user_search_query(session, [User.id, User.username, User.email, User.user_type], search_term, limit, after)
+    if query is None:
+        return []
+    return [
+        ({"id": user_id, "username": username, "email": email, "user_type": user_type}, rank)
+        for user_id, username, email, user_type, rank in query
+    ]
+
+def search_users_by_term(session, search_term, limit=20):
+    return [user for user, _ in search_users(session, search_term, limit)]
+
+# Followed-id sets per user, shared by profile views and recommendations.
+# Changes made by this process invalidate the entry immediately, other workers
+# see them after at most FOLLOW_CACHE_TTL seconds
+FOLLOW_CACHE_SIZE = int(os.getenv("FOLLOW_CACHE_SIZE", 10000))  # users
+FOLLOW_CACHE_TTL = int(os.getenv("FOLLOW_CACHE_TTL", 300))  # seconds
+_followed_ids = TTLCache(maxsize=FOLLOW_CACHE_SIZE, ttl=FOLLOW_CACHE_TTL)
+_followed_ids_lock = threading.Lock()
+
+def _follows_changed(follower_id):
+    with _followed_ids_lock:
+        _followed_ids.pop(follower_id, None)
+    invalidate_recommendations(follower_id)
+
+def get_followed_ids(session, user_id):
     """
-    # Try to find user by username
-    user = get_user_by_username(session, username_or_email)
-    
-    # If not found, try by email
-    if not user:
-        user = get_user_by_email(session, username_or_email)
-    
-    # If user found, check password
-    if user and check_password(user, password):
-        return user
-        
-    return None
-
-def search_users_by_term(session, search_term):
-    return session.query(User).filter(
-        (User.username.ilike(f"%{search_term}%")) | 
-        (User.email.ilike(f"%{search_term}%"))
+    Ids of the users `user_id` follows as a frozenset (cached), or None when the
+    user does not exist - one primary-key query on a cache miss
+    """
+    with _followed_ids_lock:
+        followed_ids = _followed_ids.get(user_id)
+    if followed_ids is not None:
+        return followed_ids
+
+    rows = session.execute(
+        select(User.id, follows.c.followed_id)
+        .outerjoin(follows, follows.c.follower_id == User.id)
+        .where(User.id == user_id)
     ).all()
+    if not rows:
+        return None
+    followed_ids = frozenset(followed_id for _, followed_id in rows if followed_id is not None)
+    with _followed_ids_lock:
+        _followed_ids[user_id] = followed_ids
+    return followed_ids
 
 def add_follow(session, follower_id, followed_id):
-    follower = get_user(session, follower_id)
-    followed = get_user(session, followed_id)
-    if follower and followed:
-        if followed not in follower.following:
-            follower.following.append(followed)
-            session.commit()
-        return True
-    return False
+    """Insert-or-ignore on the follows table; False when one of the users does not exist"""
+    try:
+        result = session.execute(
+            insert(follows)
+            .values(follower_id=follower_id, followed_id=followed_id)
+            .on_conflict_do_nothing()
+        )
+    except IntegrityError:
+        session.rollback()
+        return False
+    if result.rowcount:
+        backfill_timeline(session, follower_id, followed_id)
+    session.commit()
+    if result.rowcount:
+        _follows_changed(follower_id)
+    return True
 
 def remove_follow(session, follower_id, followed_id):
-    follower = get_user(session, follower_id)
-    followed = get_user(session, followed_id)
-    if follower and followed:
-        if followed in follower.following:
-            follower.following.remove(followed)
-            session.commit()
-        return True
-    return False
+    result = session.execute(
+        delete(follows).where(follows.c.follower_id == follower_id, follows.c.followed_id == followed_id)
+    )
+    remove_author_from_timeline(session, follower_id, followed_id)
+    session.commit()
+    if result.rowcount:
+        _follows_changed(follower_id)
+    return True
 
 def is_following(session, follower_id, followed_id):
-    follower = get_user(session, follower_id)
-    followed = get_user(session, followed_id)
-    if not follower or not followed:
-        return False
-    return followed in follower.following
\ No newline at end of file
+    followed_ids = get_followed_ids(session, follower_id)
+    return followed_ids is not None and followed_id in followed_ids
+
+def get_follow_counts(session, user_id):
+    """{"followers": n, "following": n} in one query, both sides served by an index"""
+    followers = select(func.count()).where(follows.c.followed_id == user_id).scalar_subquery()
+    following = select(func.count()).where(follows.c.follower_id == user_id).scalar_subquery()
+    followers_count, following_count = session.execute(select(followers, following)).one()
+    return {"followers": followers_count, "following": following_count}
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+# Read by the app modules at import time, so set before any of them is imported
+os.environ.setdefault("SESSION_TOKEN_SECRET", "test-secret")
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("LOCAL_STORAGE_DIR", tempfile.mkdtemp(prefix="media-"))
+os.environ["DB_SCHEMA_CHECK"] = "false"
+# Database tests run in a throwaway schema of DATABASE_URL's database, every
+# connection of the app resolves table names there
+TEST_SCHEMA = f"test_{uuid.uuid4().hex[:8]}"
+os.environ["DB_SEARCH_PATH"] = f"{TEST_SCHEMA}, public"
+
+# Small enough to seed in a second, large enough for multi-page results
+TEST_DATASET_SCALE = 0.02
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    """Sizes of the synthetic dataset (scripts/synthetic_data.py) the database tests share"""
+    if not os.getenv("DATABASE_URL"):
+        pytest.skip("DATABASE_URL is not set")
+    from database import get_engine
+    from synthetic_data import create_schema, dataset_sizes, drop_schema, seed
+
+    sizes = dataset_sizes(TEST_DATASET_SCALE)
+    with get_engine().connect() as connection:
+        create_schema(connection, TEST_SCHEMA)
+        seed(connection, sizes=sizes)
+    yield sizes
+    with get_engine().connect() as connection:
+        drop_schema(connection, TEST_SCHEMA)
+
+
+@pytest.fixture(scope="session")
+def client(dataset):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
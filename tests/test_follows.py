@@ -0,0 +1,16 @@
+def test_follow_unknown_user_is_404(client):
+    response = client.put("/user/update_follow/1/999999")
+    assert response.status_code == 404
+    response = client.put("/user/update_follow/999999/1")
+    assert response.status_code == 404
+
+
+def test_follow_and_unfollow(client):
+    response = client.put("/user/update_follow/2/40")
+    assert response.status_code == 200, response.text
+    assert response.json()["is_following"] is True
+    assert client.get("/user/user/40", params={"follower_id": 2}).json()["user"]["is_following"] is True
+
+    response = client.put("/user/update_follow/2/40", params={"action": "unfollow"})
+    assert response.status_code == 200, response.text
+    assert client.get("/user/user/40", params={"follower_id": 2}).json()["user"]["is_following"] is False
@@ -0,0 +1,129 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from services.import_service import parse_manifest, select_import_files
+
+ARTIST_ID = 30
+
+
+def _zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_manifest_is_keyed_by_relative_path():
+    manifest = parse_manifest(json.dumps([
+        {"file": "2020/koi.jpg", "description": "Old koi"},
+        {"file": "./2021\\koi.jpg", "description": "New koi"},
+    ]))
+    assert manifest == {
+        "2020/koi.jpg": {"description": "Old koi", "tags": []},
+        "2021/koi.jpg": {"description": "New koi", "tags": []},
+    }
+
+
+def test_manifest_rejects_non_image_files():
+    with pytest.raises(ValueError, match="not an image file"):
+        parse_manifest(json.dumps([{"file": "notes.txt"}]))
+
+
+def test_without_manifest_every_image_file_is_selected():
+    assert select_import_files(["a.jpg", "notes.txt", "sub/a.JPG"], None) == ["a.jpg", "sub/a.JPG"]
+
+
+def test_with_manifest_only_listed_files_are_selected():
+    manifest = parse_manifest(json.dumps([{"file": "sub/a.jpg"}]))
+    assert select_import_files(["a.jpg", "sub/a.jpg", "b.png"], manifest) == ["sub/a.jpg"]
+
+
+def test_missing_manifest_files_are_reported():
+    manifest = parse_manifest(json.dumps([{"file": "a.jpg"}, {"file": "gone.png"}]))
+    with pytest.raises(ValueError, match="gone.png"):
+        select_import_files(["a.jpg"], manifest)
+
+
+def _import(client, files, manifest=None):
+    data = {"manifest": json.dumps(manifest)} if manifest is not None else {}
+    return client.post("/image/import", params={"user_id": ARTIST_ID}, data=data, files=[("files", item) for item in files])
+
+
+def test_import_skips_non_image_uploads(client):
+    response = _import(client, [("cover.jpg", b"\xff\xd8 cover", "image/jpeg"), ("notes.txt", b"notes", "text/plain")])
+    assert response.status_code == 200, response.text
+    assert [result["file"] for result in response.json()["results"]] == ["cover.jpg"]
+
+
+def test_import_keeps_same_named_archive_entries_apart(client):
+    archive = _zip({
+        "2020/koi.jpg": b"\xff\xd8 old koi",
+        "2021/koi.jpg": b"\xff\xd8 new koi",
+        "2021/unlisted.jpg": b"\xff\xd8 unlisted",
+    })
+    manifest = [{"file": "2020/koi.jpg", "description": "Old koi"}, {"file": "2021/koi.jpg", "description": "New koi"}]
+    response = _import(client, [("portfolio.zip", archive, "application/zip")], manifest)
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [(result["file"], result["status"]) for result in results] == [("2020/koi.jpg", "imported"), ("2021/koi.jpg", "imported")]
+
+    descriptions = {
+        image["id"]: image["description"]
+        for image in client.get(f"/image/images/{ARTIST_ID}", params={"limit": 200}).json()["images"]
+    }
+    assert [descriptions[result["image_id"]] for result in results] == ["Old koi", "New koi"]
+
+
+def test_import_rejects_missing_manifest_files(client):
+    response = _import(client, [("a.jpg", b"\xff\xd8 a", "image/jpeg")], [{"file": "b.jpg"}])
+    assert response.status_code == 400
+    assert "b.jpg" in response.json()["error"]
+
+
+def test_import_limits_archive_entries(client, monkeypatch):
+    monkeypatch.setattr("routers.image_routers.MAX_IMPORT_ENTRIES", 3)
+    archive = _zip({f"{index}.jpg": b"\xff\xd8" for index in range(4)})
+    response = _import(client, [("many.zip", archive, "application/zip")])
+    assert response.status_code == 400
+    assert "archive entries" in response.json()["error"]
+
+
+def test_import_limits_uncompressed_size(client, monkeypatch):
+    monkeypatch.setattr("routers.image_routers.MAX_IMPORT_BYTES", 1024 * 1024)
+    # ~2 MiB of zeros compress to a few KiB
+    archive = _zip({"bomb.jpg": bytes(2 * 1024 * 1024)})
+    assert len(archive) < 64 * 1024
+    response = _import(client, [("bomb.zip", archive, "application/zip")])
+    assert response.status_code == 400
+    assert "uncompressed" in response.json()["error"]
+
+
+def test_import_checks_size_before_reading_the_manifest(client, monkeypatch):
+    monkeypatch.setattr("routers.image_routers.MAX_IMPORT_BYTES", 1024 * 1024)
+
+    def read(*args, **kwargs):
+        raise AssertionError("archive entry read before the size check")
+
+    monkeypatch.setattr(zipfile.ZipFile, "read", read)
+    manifest = json.dumps([{"file": "a.jpg", "description": " " * 2 * 1024 * 1024}])
+    archive = _zip({"manifest.json": manifest, "a.jpg": b"\xff\xd8"})
+    response = _import(client, [("bomb.zip", archive, "application/zip")])
+    assert response.status_code == 400
+    assert "uncompressed" in response.json()["error"]
+
+
+@pytest.mark.parametrize("in_archive", [True, False])
+def test_import_limits_manifest_size(client, monkeypatch, in_archive):
+    monkeypatch.setattr("routers.image_routers.MAX_MANIFEST_BYTES", 1024)
+    manifest = json.dumps([{"file": "a.jpg", "description": "x" * 2048}]).encode()
+    if in_archive:
+        files = [("portfolio.zip", _zip({"manifest.json": manifest, "a.jpg": b"\xff\xd8"}), "application/zip")]
+    else:
+        files = [("manifest.json", manifest, "application/json"), ("a.jpg", b"\xff\xd8", "image/jpeg")]
+    response = _import(client, files)
+    assert response.status_code == 400
+    assert "manifest" in response.json()["error"]
@@ -0,0 +1,121 @@
+import datetime
+import threading
+
+import pytest
+
+from services import interaction_buffer
+from services.interaction_buffer import InteractionBuffer
+
+# Triggers that never fire during a test
+NEVER_FULL = 1000  # rows
+NEVER_DUE = 60  # seconds
+
+
+class FakeDatabase:
+    """Stands in for the session factory: collects the inserted rows, fails on request"""
+
+    def __init__(self):
+        self.rows = []
+        self.failures = 0
+        self.committed = threading.Event()
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+        return self
+
+    def execute(self, statement, rows):
+        self.rows += rows
+
+    def commit(self):
+        self.committed.set()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    monkeypatch.setattr(interaction_buffer, "record_interactions", lambda db, interactions: None)
+    monkeypatch.setattr(interaction_buffer, "invalidate_recommendations", lambda *user_ids: None)
+    monkeypatch.setattr(InteractionBuffer, "_existing_rows", lambda self, db, rows: rows)
+    return FakeDatabase()
+
+
+def _keys(rows):
+    return [(row["user_id"], row["image_id"], row["interaction_type"]) for row in rows]
+
+
+def test_repeated_interactions_are_coalesced(database):
+    buffer = InteractionBuffer(database, max_size=NEVER_FULL, flush_interval=NEVER_DUE, coalesce_window=300)
+    start = datetime.datetime(2024, 1, 1)
+
+    assert buffer.add(1, 10, "view", start)
+    assert not buffer.add(1, 10, "view", start + datetime.timedelta(seconds=299))
+    assert buffer.add(1, 10, "like", start)
+    assert buffer.add(2, 10, "view", start)
+    assert buffer.add(1, 11, "view", start)
+    assert buffer.add(1, 10, "view", start + datetime.timedelta(seconds=300))
+
+    assert buffer.flush() == 5
+    assert _keys(database.rows) == [(1, 10, "view"), (1, 10, "like"), (2, 10, "view"), (1, 11, "view"), (1, 10, "view")]
+
+
+def test_coalescing_spans_flushes(database):
+    buffer = InteractionBuffer(database, max_size=NEVER_FULL, flush_interval=NEVER_DUE, coalesce_window=300)
+    assert buffer.add(1, 10, "view")
+    assert buffer.flush() == 1
+    assert not buffer.add(1, 10, "view")
+    assert buffer.flush() == 0
+
+
+def test_full_buffer_triggers_a_flush(database):
+    buffer = InteractionBuffer(database, max_size=3, flush_interval=NEVER_DUE)
+    buffer.start()
+    try:
+        for image_id in (1, 2):
+            buffer.add(1, image_id, "view")
+        assert not database.committed.wait(0.2)
+
+        buffer.add(1, 3, "view")
+        assert database.committed.wait(5)
+        assert _keys(database.rows) == [(1, 1, "view"), (1, 2, "view"), (1, 3, "view")]
+    finally:
+        buffer.close()
+
+
+def test_interval_triggers_a_flush(database):
+    buffer = InteractionBuffer(database, max_size=NEVER_FULL, flush_interval=0.05)
+    buffer.start()
+    try:
+        buffer.add(1, 1, "view")
+        assert database.committed.wait(5)
+        assert _keys(database.rows) == [(1, 1, "view")]
+    finally:
+        buffer.close()
+
+
+def test_close_drains_the_buffer(database):
+    buffer = InteractionBuffer(database, max_size=NEVER_FULL, flush_interval=NEVER_DUE)
+    buffer.start()
+    buffer.add(1, 1, "view")
+    buffer.add(2, 1, "view")
+
+    buffer.close()
+    assert _keys(database.rows) == [(1, 1, "view"), (2, 1, "view")]
+    assert buffer._thread is None
+
+
+def test_failed_flush_keeps_the_rows_for_the_next_one(database):
+    buffer = InteractionBuffer(database, max_size=NEVER_FULL, flush_interval=NEVER_DUE)
+    buffer.add(1, 1, "view")
+    database.failures = 1
+
+    assert buffer.flush() == 0
+    assert database.rows == []
+    assert buffer.flush() == 1
+    assert _keys(database.rows) == [(1, 1, "view")]
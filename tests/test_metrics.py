@@ -0,0 +1,103 @@
+import re
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from middleware import RequestMetricsMiddleware
+from routers.metrics_router import PROMETHEUS_CONTENT_TYPE, router as metrics_router
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text):
+    """{(sample name, frozenset of label pairs): value}; every sample must follow its metric's # TYPE"""
+    samples, typed = {}, set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            typed.add(line.split()[2])
+            continue
+        if line.startswith("#") or not line:
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"not a sample line: {line!r}"
+        name, labels, value = match.groups()
+        assert name in typed or re.sub(r"_(bucket|sum|count)$", "", name) in typed, f"{name} has no # TYPE"
+        samples[(name, frozenset(LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+
+def sample(samples, name, **labels):
+    return samples.get((name, frozenset(labels.items())), 0)
+
+
+@pytest.fixture
+def app_client():
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+    app.include_router(metrics_router)
+
+    @app.get("/tests/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 404:
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    @app.get("/tests/broken/{item_id}")
+    async def broken(item_id: int):
+        raise RuntimeError("handler failed")
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        yield client
+
+
+def _scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    return response.text
+
+
+def test_requests_are_labelled_by_route_template(app_client):
+    before = parse_metrics(_scrape(app_client))
+    for item_id in (1, 2, 404):
+        app_client.get(f"/tests/items/{item_id}")
+    text = _scrape(app_client)
+    after = parse_metrics(text)
+
+    route = {"method": "GET", "route": "/tests/items/{item_id}"}
+    assert sample(after, "http_requests_total", **route, status="200") - sample(before, "http_requests_total", **route, status="200") == 2
+    assert sample(after, "http_requests_total", **route, status="404") - sample(before, "http_requests_total", **route, status="404") == 1
+    assert sample(after, "http_request_duration_seconds_count", **route) - sample(before, "http_request_duration_seconds_count", **route) == 3
+    assert sample(after, "http_request_duration_seconds_bucket", **route, le="+Inf") == sample(after, "http_request_duration_seconds_count", **route)
+    assert "/tests/items/1" not in text
+
+
+def test_unmatched_paths_share_one_label(app_client):
+    app_client.get("/tests/unknown/123")
+    text = _scrape(app_client)
+    assert "/tests/unknown" not in text
+    assert sample(parse_metrics(text), "http_requests_total", method="GET", route="other", status="404") >= 1
+
+
+def test_exception_is_recorded_as_500(app_client):
+    route = {"method": "GET", "route": "/tests/broken/{item_id}"}
+    before = sample(parse_metrics(_scrape(app_client)), "http_requests_total", **route, status="500")
+    response = app_client.get("/tests/broken/1")
+    assert response.status_code == 500
+    after = sample(parse_metrics(_scrape(app_client)), "http_requests_total", **route, status="500")
+    assert after - before == 1
+
+
+def test_app_routes_report_templates_and_statements(client):
+    for user_id in (10, 20):
+        assert client.get(f"/image/images/{user_id}", params={"limit": 5}).status_code == 200
+    text = _scrape(client)
+    samples = parse_metrics(text)
+
+    route = {"method": "GET", "route": "/image/images/{user_id}"}
+    assert sample(samples, "http_requests_total", **route, status="200") >= 2
+    assert sample(samples, "http_request_db_statements_sum", **route) >= 2
+    assert sample(samples, "db_statement_duration_seconds_count") >= 2
+    assert "/image/images/10" not in text
@@ -0,0 +1,88 @@
+"""
+SQL statements per request (the X-Query-Count header) of the read hot paths,
+and per call of their ORM service variants (database.count_queries).
+Each budget holds for any page size - a count that grows with `limit` is an
+N+1 (lazy loads or per-item queries) creeping back in.
+"""
+import pytest
+
+from services.recommendation_cache import invalidate_recommendations
+
+
+def _query_count(client, path, **params):
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-Query-Count"])
+
+
+@pytest.mark.parametrize("limit", [5, 40])
+def test_anonymous_feed(client, limit):
+    invalidate_recommendations(None)
+    # Cold: the popular candidates, then one query for the page's columns
+    assert _query_count(client, "/image/feed", limit=limit) == 2
+    # Ranked candidates cached: only the page's columns
+    assert _query_count(client, "/image/feed", limit=limit) == 1
+
+
+@pytest.mark.parametrize("user_id, limit", [(11, 5), (12, 40)])
+def test_personalized_feed(client, user_id, limit):
+    invalidate_recommendations(user_id)
+    # Cold: followed ids, all candidate sources in one UNION ALL, the page's columns
+    assert _query_count(client, "/image/feed", limit=limit, user_id=user_id) == 3
+    assert _query_count(client, "/image/feed", limit=limit, user_id=user_id) == 1
+
+
+@pytest.mark.parametrize("user_id, limit", [(13, 5), (14, 40)])
+def test_recommendations(client, user_id, limit):
+    invalidate_recommendations(user_id)
+    assert _query_count(client, "/interaction/feed", limit=limit, user_id=user_id) == 3
+    assert _query_count(client, "/interaction/feed", limit=limit, user_id=user_id) == 1
+
+
+@pytest.mark.parametrize("limit", [5, 40])
+def test_image_search(client, limit):
+    # Ranked ids, then the page's columns
+    assert _query_count(client, "/image/feed", limit=limit, search_term="dragon") == 2
+
+
+@pytest.mark.parametrize("limit", [5, 40])
+def test_user_gallery(client, limit):
+    # User 10 is the most prolific synthetic artist
+    response = client.get("/image/images/10", params={"limit": limit})
+    assert len(response.json()["images"]) == limit
+    assert int(response.headers["X-Query-Count"]) == 1
+    assert _query_count(client, "/image/images/10", limit=limit, cursor=response.json()["next_cursor"]) == 1
+
+
+@pytest.mark.parametrize("limit", [5, 40])
+def test_comments(client, limit):
+    response = client.get("/comment/image/1", params={"limit": limit})
+    assert len(response.json()["comments"]) == limit
+    assert int(response.headers["X-Query-Count"]) == 1
+
+
+def _orm_query_count(load, related, limit):
+    """Statements of loading a page of ORM objects and reading each one's `related` user"""
+    from database import count_queries, get_db
+
+    with get_db() as db, count_queries() as counter:
+        items = load(db, limit)
+        assert len(items) == limit
+        for item in items:
+            getattr(item, related).username
+    return counter.count
+
+
+@pytest.mark.parametrize("limit", [5, 40])
+def test_orm_variants_load_users_in_bulk(dataset, limit):
+    from services.comment_service import get_comments_for_image
+    from services.image_service import get_feed_images, get_user_images
+    from services.recommendation_service import get_recommendations
+
+    assert _orm_query_count(lambda db, limit: get_feed_images(db, limit), "owner", limit) == 1
+    assert _orm_query_count(lambda db, limit: get_feed_images(db, limit, search_term="dragon"), "owner", limit) == 2
+    assert _orm_query_count(lambda db, limit: get_user_images(db, 10, limit), "owner", limit) == 1
+    assert _orm_query_count(lambda db, limit: get_comments_for_image(db, 1)[:limit], "user", limit) == 1
+    # With the ranked candidates cached: only the page's images and owners
+    _orm_query_count(lambda db, limit: get_recommendations(db, 16, limit), "owner", limit)
+    assert _orm_query_count(lambda db, limit: get_recommendations(db, 16, limit), "owner", limit) == 1
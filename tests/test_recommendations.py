@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import func, select
+
+from database import get_db
+from models.image import Image
+from services.recommendation_cache import invalidate_recommendations
+from services.recommendation_service import _position_after
+
+CANDIDATES = 15
+
+
+def _image_count():
+    with get_db() as db:
+        return db.execute(select(func.count(Image.id))).scalar_one()
+
+
+def _scroll(client, **params):
+    """Follow next_cursor to the end of the feed; returns the image ids in order"""
+    image_ids, cursor = [], None
+    while True:
+        response = client.get("/image/feed", params={**params, "limit": 10, "cursor": cursor, "debug_scores": True})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        image_ids += [image["id"] for image in data["images"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return image_ids
+
+
+@pytest.mark.parametrize("user_id", [None, 15])
+def test_feed_scrolls_past_the_cached_candidates(client, monkeypatch, user_id):
+    monkeypatch.setattr("services.recommendation_service.RECOMMENDATION_CANDIDATES", CANDIDATES)
+    invalidate_recommendations(user_id)
+    params = {"user_id": user_id} if user_id else {}
+
+    image_ids = _scroll(client, **params)
+    assert len(image_ids) == len(set(image_ids))
+    assert len(image_ids) == _image_count() > CANDIDATES
+    invalidate_recommendations(user_id)
+
+
+def test_cursor_of_a_dropped_image_continues_by_score_and_id():
+    fallback = {"fallback": True}
+    items = [
+        [9, {**fallback, "total": 3.0}],
+        [4, {**fallback, "total": 3.0}],
+        [8, {**fallback, "total": 1.5}],
+        [7, {**fallback, "total": 0.0}],
+        [2, {**fallback, "total": 0.0}],
+    ]
+    assert _position_after(items, 3.0, 6) == 1
+    assert _position_after(items, 0.0, 5) == 4
+    assert _position_after(items, 0.0, 1) == 5
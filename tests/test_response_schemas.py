@@ -0,0 +1,77 @@
+"""
+The routes return ORJSONResponse directly (no response_model serialization on
+the hot path), so the declared response_model is checked here instead: every
+such route's success payload must validate against it and carry no field the
+schema does not declare.
+"""
+import json
+
+import pytest
+
+import schemas
+
+IMAGE_ID = 5
+USER_ID = 20  # an artist of the synthetic dataset
+
+
+def assert_matches_schema(payload, model):
+    validated = model.model_validate(payload)
+    # Fields outside the schema are dropped by validation and show up as a difference
+    assert validated.model_dump(mode="json", exclude_unset=True) == payload
+
+
+@pytest.fixture(scope="module")
+def login(client):
+    response = client.post("/user/register_user", params={"username": "schema-check", "email": "schema-check@example.com", "password": "secret", "user_type": "artist"})
+    assert response.status_code == 200, response.text
+    return client.post("/user/login_user/", json={"username_or_email": "schema-check", "password": "secret"})
+
+
+def _import(client):
+    manifest = [{"file": "a.jpg", "description": "Imported", "tags": ["koi"]}]
+    return client.post(
+        "/image/import",
+        params={"user_id": USER_ID},
+        data={"manifest": json.dumps(manifest)},
+        files=[("files", ("a.jpg", b"\xff\xd8 first", "image/jpeg")), ("files", ("b.png", b"\x89PNG second", "image/png"))],
+    )
+
+
+# (method, route path): (model, request)
+REQUESTS = {
+    ("GET", "/image/feed"): (schemas.FeedResponse, lambda client: client.get("/image/feed", params={"user_id": USER_ID, "debug_scores": True})),
+    ("GET", "/image/images/{user_id}"): (schemas.ImageListResponse, lambda client: client.get(f"/image/images/{USER_ID}", params={"limit": 5})),
+    ("GET", "/image/image/{image_id}"): (schemas.ImageResponse, lambda client: client.get(f"/image/image/{IMAGE_ID}")),
+    ("POST", "/image/import"): (schemas.ImportResponse, _import),
+    ("GET", "/interaction/feed"): (schemas.FeedResponse, lambda client: client.get("/interaction/feed", params={"user_id": USER_ID})),
+    ("GET", "/interaction/image/{image_id}"): (schemas.InteractionStatsResponse, lambda client: client.get(f"/interaction/image/{IMAGE_ID}", params={"user_id": USER_ID})),
+    ("GET", "/interaction/images/stats"): (schemas.InteractionStatsBatchResponse, lambda client: client.get("/interaction/images/stats", params={"image_ids": [1, 2, IMAGE_ID], "user_id": USER_ID})),
+    ("GET", "/comment/image/{image_id}"): (schemas.CommentListResponse, lambda client: client.get(f"/comment/image/{IMAGE_ID}", params={"limit": 5})),
+    ("POST", "/comment/add"): (schemas.CommentResponse, lambda client: client.post("/comment/add", json={"user_id": USER_ID, "image_id": IMAGE_ID, "content": "Nice"})),
+    ("GET", "/user/search"): (schemas.UserSearchResponse, lambda client: client.get("/user/search", params={"term": "user1"})),
+    ("GET", "/user/user/{user_id}"): (schemas.UserDetailsResponse, lambda client: client.get(f"/user/user/{USER_ID}", params={"follower_id": 1})),
+}
+
+
+def test_every_response_model_route_is_checked():
+    import main
+
+    declared = {
+        (method, route.path)
+        for route in main.app.routes if getattr(route, "response_model", None) is not None
+        for method in route.methods
+    }
+    assert declared == set(REQUESTS) | {("POST", "/user/login_user/")}
+
+
+@pytest.mark.parametrize("route", list(REQUESTS), ids=lambda route: f"{route[0]} {route[1]}")
+def test_payload_matches_response_model(client, route):
+    model, request = REQUESTS[route]
+    response = request(client)
+    assert response.status_code == 200, response.text
+    assert_matches_schema(response.json(), model)
+
+
+def test_login_payload_matches_response_model(login):
+    assert login.status_code == 200, login.text
+    assert_matches_schema(login.json(), schemas.LoginResponse)
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+from services import token_service
+from services.token_service import issue_token, verify_token
+
+
+def _bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_issued_token_verifies_to_its_claims():
+    token, expires_at = issue_token(7, "artist", "ania")
+    assert verify_token(token) == {"user_id": 7, "user_type": "artist", "username": "ania", "expires_at": expires_at}
+    assert expires_at > time.time()
+
+
+def test_expired_token_is_rejected():
+    token, _ = issue_token(7, "artist", ttl=-1)
+    with pytest.raises(ValueError, match="expired"):
+        verify_token(token)
+
+
+def test_token_expiring_after_being_cached_is_rejected(monkeypatch):
+    token, expires_at = issue_token(7, "artist", ttl=60)
+    verify_token(token)
+    monkeypatch.setattr(token_service.time, "time", lambda: expires_at + 1)
+    with pytest.raises(ValueError, match="expired"):
+        verify_token(token)
+
+
+def test_tampered_signature_is_rejected():
+    token, _ = issue_token(7, "artist")
+    payload, signature = token.split(".")
+    forged = signature[:-1] + ("A" if signature[-1] != "A" else "B")
+    with pytest.raises(ValueError, match="signature"):
+        verify_token(f"{payload}.{forged}")
+
+
+def test_tampered_payload_is_rejected():
+    token, _ = issue_token(7, "artist")
+    other, _ = issue_token(8, "admin")
+    # Another token's claims under this token's signature
+    with pytest.raises(ValueError, match="signature"):
+        verify_token(f"{other.split('.')[0]}.{token.split('.')[1]}")
+
+
+def test_token_signed_with_another_secret_is_rejected(monkeypatch):
+    monkeypatch.setattr(token_service, "_SECRET", b"rotated-secret")
+    token, _ = issue_token(7, "artist")
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="signature"):
+        verify_token(token)
+
+
+@pytest.mark.parametrize("token", ["", "no-dot", "a.b.c", "bad!!.payload", "a.é", "é.b"])
+def test_malformed_token_is_rejected(token):
+    with pytest.raises(ValueError):
+        verify_token(token)
+
+
+def test_missing_secret_fails_instead_of_signing(monkeypatch):
+    monkeypatch.setattr(token_service, "_SECRET", None)
+    with pytest.raises(RuntimeError, match="SESSION_TOKEN_SECRET"):
+        token_service.check_secret()
+    with pytest.raises(RuntimeError):
+        issue_token(7, "artist")
+
+
+@pytest.mark.parametrize("token", ["not.valid", "a.é"])
+def test_required_claims_reject_invalid_token_with_401(token):
+    with pytest.raises(auth.HTTPException) as error:
+        auth.get_token_claims(_bearer(token))
+    assert error.value.status_code == 401
+
+
+def test_optional_claims_treat_invalid_token_as_anonymous():
+    token, _ = issue_token(7, "artist", ttl=-1)
+    assert auth.get_optional_token_claims(_bearer(token)) is None
+    assert auth.get_optional_token_claims(_bearer("a.é")) is None
+    assert auth.get_optional_token_claims(None) is None
+    valid, _ = issue_token(7, "artist")
+    assert auth.get_optional_token_claims(_bearer(valid))["user_id"] == 7
@@ -0,0 +1,17 @@
+ARTIST_ID = 50
+
+
+def test_stream_upload(client):
+    body = b"\xff\xd8 streamed tattoo" * 1000
+    response = client.post(
+        "/image/upload/stream",
+        params={"filename": "tattoo.jpg", "user_id": ARTIST_ID, "description": "Streamed"},
+        headers={"Content-Type": "image/jpeg"},
+        content=body,
+    )
+    assert response.status_code == 200, response.text
+    public_url = response.json()["public_url"]
+
+    newest = client.get(f"/image/images/{ARTIST_ID}", params={"limit": 1}).json()["images"][0]
+    assert (newest["url"], newest["description"]) == (public_url, "Streamed")
+    assert client.get(public_url).content == body